@@ -4,5 +4,35 @@ AnyLog API package for REST and async-based communication.
 
 from .anylog_connector import AnyLogConnector
 from .async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from .batch_writer import BatchWriter
+from .async_batch_writer import BatchWriter as AsyncBatchWriter
+from .async_ingest_pipeline import IngestPipeline
+from .response_cache import ResponseCache
+from .node_group import NodeGroup
+from .async_node_group import NodeGroup as AsyncNodeGroup
+from .results import CommandResult, NodeResult
+from .response import AnyLogResponse
+from .retry import CircuitBreaker, RetryPolicy
+from .connector_pool import ConnectorPool
+from .async_connector_pool import ConnectorPool as AsyncConnectorPool
+from .metrics import ConnectorMetrics
+from .liveness import LivenessMonitor
+from .async_liveness import LivenessMonitor as AsyncLivenessMonitor
+from .spool import DiskSpool
+from .async_spool import DiskSpool as AsyncDiskSpool
+from .policy_cache import PolicyCache
+from .async_policy_cache import PolicyCache as AsyncPolicyCache
+from .schema_cache import SchemaCache
+from .async_schema_cache import SchemaCache as AsyncSchemaCache
+from .topic_publisher import TopicPublisher
+from .async_topic_publisher import TopicPublisher as AsyncTopicPublisher
+from .exceptions import (AnyLogError, AnyLogHTTPError, AnyLogServerError, AnyLogTimeout, AnyLogConnectionError,
+                         AnyLogConnectError, AnyLogCircuitOpenError, AnyLogSpoolFullError, AnyLogValidationError)
 
-__all__ = ["AnyLogConnector", "AsyncAnyLogConnector"]
+__all__ = ["AnyLogConnector", "AsyncAnyLogConnector", "BatchWriter", "AsyncBatchWriter", "IngestPipeline",
+           "ResponseCache", "NodeGroup", "AsyncNodeGroup", "NodeResult", "CommandResult", "AnyLogResponse",
+           "CircuitBreaker", "RetryPolicy", "ConnectorPool", "AsyncConnectorPool", "ConnectorMetrics",
+           "LivenessMonitor", "AsyncLivenessMonitor", "DiskSpool", "AsyncDiskSpool", "PolicyCache",
+           "AsyncPolicyCache", "SchemaCache", "AsyncSchemaCache", "TopicPublisher", "AsyncTopicPublisher",
+           "AnyLogError", "AnyLogHTTPError", "AnyLogServerError", "AnyLogTimeout", "AnyLogConnectionError",
+           "AnyLogConnectError", "AnyLogCircuitOpenError", "AnyLogSpoolFullError", "AnyLogValidationError"]
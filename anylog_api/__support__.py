@@ -3,10 +3,10 @@ This Source Code Form is subject to the terms of the Mozilla Public
 License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/
 """
-import ast
-import re
 import requests
 
+from anylog_api.exceptions import RequestFailure, rest_exception
+
 # Network errors based on: https://github.com/for-GET/know-your-http-well/blob/master/json/status-codes.json
 NETWORK_ERRORS_GENERIC = {
     1: "Informational",
@@ -75,62 +75,35 @@ NETWORK_ERRORS = {
     511: "Network Authentication Required"
 }
 
-def __extract_embedded_json(error):
-    error_output = None
-
-    try:
-        # Try literal eval (e.g. if it's a tuple)
-        error_output = ast.literal_eval(error)
-    except Exception:
-        error_output = error
-
-    # Convert tuple to string if needed
-    if isinstance(error_output, tuple):
-        error_output = str(error_output)
-
-    # Step: extract JSON from within a messy string
-    try:
-        match = re.search(r'\{.*?\}', error_output)
-        if match:
-            json_str = match.group(0)
-            error_output = ast.literal_eval(json_str.strip('"').replace("\\\\", "\\") .replace("\\'", "'"))
-    except Exception as e:
-        raise ValueError(f"Failed to extract valid JSON: {e}")
-
-    return error_output
-
-
 def __raise_rest_error(cmd_type:str, cmd:str, error:str):
     """
     Print Error message
     :args:
         error_type:str - Error Type
         cmd:str - command that failed
-        error:str - error message
+        error - RequestFailure, HTTP status or error message
     :global:
         NETWORK_ERRORS:dict - based on initial error code value print error message
         NETWORK_ERRORS_GENERIC:dict - based on initial error code value print error message
     :params:
         error_msg:str - generated error message
     :raise:
-        error message
+        AnyLogError - subclass based on the failure (AnyLogHTTPError, AnyLogTimeout, AnyLogConnectionError ...)
     """
     error_msg = f'Failed to execute {cmd_type} for "{cmd}" '
-    error = __extract_embedded_json(error)
+    status = error.error if isinstance(error, RequestFailure) else error
 
-    if isinstance(error, int):
-        if error in NETWORK_ERRORS:
-            error_msg += f'(Network Error {error} - {NETWORK_ERRORS[error]})'
-        elif int(str(error)[0]) in NETWORK_ERRORS_GENERIC:
-            error_msg += f'(Network Error {error} - {NETWORK_ERRORS_GENERIC[int(str(error)[0])]})'
+    if isinstance(status, int):
+        if status in NETWORK_ERRORS:
+            error_msg += f'(Network Error {status} - {NETWORK_ERRORS[status]})'
+        elif int(str(status)[0]) in NETWORK_ERRORS_GENERIC:
+            error_msg += f'(Network Error {status} - {NETWORK_ERRORS_GENERIC[int(str(status)[0])]})'
         else:
-            error_msg += f'(Network Error: {error})'
-    elif isinstance(error, dict):
-        error_msg += f"(Error: {error['err_text']})"
-    elif isinstance(error, str):
-        error_msg += f"(Error: {error})"
-    
-    raise requests.RequestException(error_msg)
+            error_msg += f'(Network Error: {status})'
+    else:
+        error_msg += f"(Error: {status})"
+
+    raise rest_exception(message=error_msg, cmd_type=cmd_type, command=cmd, error=error)
 
 
 def __extract_results(cmd:str, r:requests.get, exception:bool=False)->str:
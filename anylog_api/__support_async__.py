@@ -1,5 +1,7 @@
 import aiohttp
 
+from anylog_api.exceptions import RequestFailure, rest_exception
+
 NETWORK_ERRORS_GENERIC={
     1: "Informational",
     2: "Successful",
@@ -61,33 +63,34 @@ def __raise_rest_error(cmd_type:str, cmd:str, error:str):
     :args:
         error_type:str - Error Type
         cmd:str - command that failed
-        error:str - error message
+        error - RequestFailure, HTTP status or error message
     :global:
         NETWORK_ERRORS:dict - based on initial error code value print error message
         NETWORK_ERRORS_GENERIC:dict - based on initial error code value print error message
     :params:
         error_msg:str - generated error message
     :raise:
-        error message
+        AnyLogError - subclass based on the failure (AnyLogHTTPError, AnyLogTimeout, AnyLogConnectionError ...)
     """
     error_msg = f'Failed to execute {cmd_type} for "{cmd}" '
+    status = error.error if isinstance(error, RequestFailure) else error
 
-    try:
-        error = int(error)
-    except ValueError:
-        pass  # Non-integer errors are handled as plain text
+    if isinstance(status, str) and status.isdigit():
+        status = int(status)
+        if not isinstance(error, RequestFailure):
+            error = status
 
-    if isinstance(error, int):
-        if error in NETWORK_ERRORS:
-            error_msg += f'(Network Error {error} - {NETWORK_ERRORS[error]})'
-        elif int(str(error)[0]) in NETWORK_ERRORS_GENERIC:
-            error_msg += f'(Network Error {error} - {NETWORK_ERRORS_GENERIC[int(str(error)[0])]})'
+    if isinstance(status, int):
+        if status in NETWORK_ERRORS:
+            error_msg += f'(Network Error {status} - {NETWORK_ERRORS[status]})'
+        elif int(str(status)[0]) in NETWORK_ERRORS_GENERIC:
+            error_msg += f'(Network Error {status} - {NETWORK_ERRORS_GENERIC[int(str(status)[0])]})'
         else:
-            error_msg += f'(Network Error: {error})'
+            error_msg += f'(Network Error: {status})'
     else:
-        error_msg += f'(Error: {error})'
+        error_msg += f'(Error: {status})'
 
-    raise Exception(error_msg)
+    raise rest_exception(message=error_msg, cmd_type=cmd_type, command=cmd, error=error)
 
 
 async def __extract_results(cmd:str, response:aiohttp.ClientResponse, exception:bool=False)->str:
@@ -114,6 +117,6 @@ async def extract_get_results(command:str, response:aiohttp.ClientResponse, erro
 
 
 async def validate_put_post(cmd_type:str, command:str, response:aiohttp.ClientResponse, error:str=None)->bool:
-    if not response or response.status >= 400:
+    if response is False or (not isinstance(response, (bool, str)) and response.status >= 400):
         __raise_rest_error(cmd_type=cmd_type, cmd=command, error=error)
     return True
@@ -3,44 +3,313 @@ This Source Code Form is subject to the terms of the Mozilla Public
 License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/
 """
+import concurrent.futures
+import functools
+import threading
+import time
+
 import requests
+import requests.adapters
+import urllib3
+import urllib3.exceptions
 import anylog_api.__support__ as support
+import anylog_api.columnar as columnar
+import anylog_api.compression as compression_support
+import anylog_api.export as export
+from anylog_api.codec import encode_payload, get_codec
+from anylog_api.exceptions import (AnyLogCircuitOpenError, AnyLogConnectError, AnyLogConnectionError, AnyLogError,
+                                   AnyLogTimeout, RequestFailure)
+from anylog_api.json_stream import QueryRowParser
+from anylog_api.metrics import ConnectorMetrics
+from anylog_api.response import AnyLogResponse
+from anylog_api.response_cache import ResponseCache
+from anylog_api.results import CommandResult
+from anylog_api.retry import CircuitBreaker, RetryPolicy
+from anylog_api.schema_cache import SchemaCache
+
+
+def _connect_failed(error:requests.RequestException)->bool:
+    """
+    Whether the connection to the node could not be established (refused, DNS failure, connect timeout) - as opposed
+    to failing once the request was sent
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+
+
+class _TrackedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    def __init__(self, *args, tracker:list, **kwargs):
+        super().__init__(*args, **kwargs)
+        tracker.append(self)
+
+
+class _TrackedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    def __init__(self, *args, tracker:list, **kwargs):
+        super().__init__(*args, **kwargs)
+        tracker.append(self)
+
+
+class _PoolTrackingAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter keeping every connection pool its pool manager creates (connection_pools), so their request /
+    connection counters can be read - and still count once a pool was evicted
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.connection_pools = []
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': functools.partial(_TrackedHTTPConnectionPool, tracker=self.connection_pools),
+            'https': functools.partial(_TrackedHTTPSConnectionPool, tracker=self.connection_pools)
+        }
 
 
 class AnyLogConnector:
-    def __init__(self, conn:str, auth:tuple=(), timeout:int=30):
+    def __init__(self, conn:str, auth:tuple=(), timeout:int=30, pool_connections:int=10, pool_maxsize:int=10,
+                 max_retries:int=0, pool_block:bool=False, keep_alive:bool=True, cache:ResponseCache=None,
+                 codec=None, compression:str=None, compression_level:int=6, compression_threshold:int=1024,
+                 decompress_responses:bool=True, retry_policy:RetryPolicy=None, circuit_breaker:CircuitBreaker=None,
+                 metrics:ConnectorMetrics=None, schema_cache:SchemaCache=None):
         """
         The following are the base support for AnyLog via REST
             - GET: extract information from AnyLog (information + queries)
             - POST: Execute or POST command against AnyLog
             - POST_POLICY: POST information to blockchain
+        Requests are sent through a single requests.Session owned by the connector, so TCP connections are kept
+        alive and reused between commands. The session (and its connection pool) is safe to share across threads;
+        call close() - or use the connector as a context manager - once done.
         :url:
             https://github.com/AnyLog-co/documentation/blob/master/using%20rest.md
         :param:
             conn:str - REST connection info
             auth:tuple - Authentication information
             timeout:int - REST timeout
+            pool_connections:int - number of connection pools (one per host) to cache
+            pool_maxsize:int - maximum number of connections kept open per host
+            max_retries:int - number of connection-level retries performed by the HTTP adapter
+            pool_block:bool - whether to block (rather than open an extra connection) when the pool is exhausted
+            keep_alive:bool - whether to keep connections open between requests
+            cache:ResponseCache - optional cache for read-only GET commands
+            codec - JSON codec (name or object) used to encode payloads and decode results, defaults to the fastest
+                    one installed (orjson, ujson, json)
+            compression:str - compress PUT / POST bodies (gzip || deflate), None to send them as-is
+            compression_level:int - compression level (1 fastest - 9 smallest)
+            compression_threshold:int - bodies smaller than this many bytes are never compressed
+            decompress_responses:bool - advertise (and transparently decode) gzip / deflate responses
+            retry_policy:RetryPolicy - retry transient failures (connection errors, 429 / 502 / 503 / 504)
+            circuit_breaker:CircuitBreaker - fail fast while the node is down
+            metrics:ConnectorMetrics - record call counts, errors, bytes and latency per command type
+            schema_cache:SchemaCache - validate (or coerce) PUT rows against the table's columns before sending
         """
         self.conn = conn
         self.auth = auth
         self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.cache = cache
+        self.codec = get_codec(codec)
+        self.compression = compression_support.validate_encoding(compression)
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+        self.decompress_responses = decompress_responses
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.metrics_error = None  # last exception raised by metrics.record - never fails the request itself
+        self.schema_cache = schema_cache
+        self.liveness = None  # LivenessMonitor watching this connector (set by the monitor)
+
+        self.__lock = threading.Lock()
+        self.__adapter = _PoolTrackingAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                                       max_retries=max_retries, pool_block=pool_block)
+        self.__session = requests.Session()
+        self.__session.mount('http://', self.__adapter)
+        self.__session.mount('https://', self.__adapter)
+        if auth:
+            self.__session.auth = auth
+        if keep_alive is False:
+            self.__session.headers['Connection'] = 'close'
+        if decompress_responses is True:
+            self.__session.headers['Accept-Encoding'] = compression_support.ACCEPT_ENCODING
+        else:
+            self.__session.headers['Accept-Encoding'] = 'identity'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def closed(self)->bool:
+        return self.__session is None
+
+    def close(self):
+        """
+        Close the underlying session and every pooled connection. Safe to call more than once.
+        """
+        with self.__lock:
+            if self.__session is not None:
+                self.__session.close()
+                self.__session = None
+
+    def connection_stats(self)->dict:
+        """
+        Report how many connections were opened vs. reused by the pooled session (summed over every connection
+        pool the session created, including pools evicted since)
+        :params:
+            requests:int - number of requests sent
+            new_connections:int - number of TCP connections opened
+        :return:
+            dict with requests, new_connections and reused_connections
+        """
+        requests_count = 0
+        new_connections = 0
+        for pool in list(self.__adapter.connection_pools):
+            requests_count += pool.num_requests
+            new_connections += pool.num_connections
+
+        return {
+            'requests': requests_count,
+            'new_connections': new_connections,
+            'reused_connections': max(requests_count - new_connections, 0)
+        }
 
+    def _encode_body(self, headers:dict, payload):
+        """
+        Serialize (and, if enabled, compress) a PUT / POST body - sets Content-Encoding in headers when compressed
+        """
+        data, encoding = compression_support.compress_payload(payload=encode_payload(self.codec, payload),
+                                                              encoding=self.compression, level=self.compression_level,
+                                                              threshold=self.compression_threshold)
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return data
 
-    def get(self, command:str, destination:str=None)->(bool or str or dict):
+    def _request(self, method:str, headers:dict, data=None, stream:bool=False, retry:bool=True,
+                 timeout:float=None):
+        """
+        Send a request through the pooled session, applying the retry policy and circuit breaker (if set). The
+        outcome is reported to the liveness monitor (if any), so a failing node is marked down immediately.
+        :args:
+            method:str - HTTP method (GET, PUT, POST)
+            headers:dict - REST header information
+            data - request body
+            stream:bool - do not read the body upfront (caller must close the response)
+            retry:bool - apply the retry policy / circuit breaker and report to the liveness monitor (False for a
+                         single, unguarded attempt - e.g. a heartbeat)
+            timeout:float - REST timeout for this request (defaults to the connector's)
+        :params:
+            response:requests.Response - response from REST request
+            error:RequestFailure - if request fails, what went wrong (status, message, body)
+            status - HTTP status of a failed response (exception name for connection errors / timeouts)
+            attempt:int - number of retries done so far
+            node_failure:bool - whether the failure points at the node (connection error, timeout, 5xx)
+        :return:
+            response (False on failure), error
+        """
+        session = self.__session
+        if session is None:
+            return False, RequestFailure(AnyLogConnectionError, 'connector is closed', None, None)
+
+        start = time.perf_counter() if self.metrics is not None else None
+        attempt = 0
+        while True:
+            error = None
+            status = None
+            node_failure = False
+            if retry and self.circuit_breaker is not None and not self.circuit_breaker.allow_request():
+                response = False
+                error = RequestFailure(AnyLogCircuitOpenError, f'Circuit breaker open for {self.conn}', None, None)
+                status = 'CircuitOpen'
+                break
+
+            retry_after = None
+            retryable = False
+            try:
+                response = session.request(method, f'http://{self.conn}', headers=headers, data=data,
+                                           timeout=self.timeout if timeout is None else timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if _connect_failed(e):
+                    error_type = AnyLogConnectError
+                else:
+                    error_type = AnyLogTimeout if isinstance(e, requests.Timeout) else AnyLogConnectionError
+                error = RequestFailure(error_type, str(e), None, None)
+                status = type(e).__name__
+                response = False
+                retryable = True
+            except Exception as e:
+                error = RequestFailure(AnyLogError, str(e), None, None)
+                status = type(e).__name__
+                response = False
+            else:
+                if int(response.status_code) < 200 or int(response.status_code) > 299:
+                    status = int(response.status_code)
+                    retryable = True
+                    retry_after = response.headers.get('Retry-After')
+                    try:
+                        body = response.content
+                    except requests.RequestException:
+                        body = None
+                    error = RequestFailure(AnyLogError, status, status, body)
+                    response.close()
+                    response = False
+
+            http_status = status if isinstance(status, int) else None
+            node_failure = response is False and retryable and (http_status is None or http_status >= 500)
+            if retry and self.circuit_breaker is not None:
+                if node_failure:
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+
+            if response is not False or not retryable or not retry or self.retry_policy is None \
+                    or not self.retry_policy.should_retry(method=method, attempt=attempt, status=http_status,
+                                                          sent=error.error_type is not AnyLogConnectError):
+                break
+
+            time.sleep(self.retry_policy.backoff(attempt=attempt, retry_after=retry_after))
+            attempt += 1
+
+        if retry and self.liveness is not None and status != 'CircuitOpen':
+            if node_failure:
+                self.liveness.mark_down(self, error=error.error)
+            else:
+                self.liveness.mark_seen(self)
+
+        if self.metrics is not None:
+            response_bytes = 0
+            if response is not False:
+                status = response.status_code
+                response_bytes = int(response.headers.get('Content-Length', 0)) if stream else len(response.content)
+            try:
+                self.metrics.record(method=method, command=headers.get('command', 'data'), status=status,
+                                    latency=time.perf_counter() - start, request_bytes=len(data) if data else 0,
+                                    response_bytes=response_bytes, error=None if error is None else str(error.error))
+            except Exception as e:
+                self.metrics_error = e
+
+        return response, error
+
+    def get(self, command:str, destination:str=None, as_response:bool=False,
+            use_cache:bool=True)->(bool or str or dict or AnyLogResponse):
         """
         requests GET command
         :args:
             command:str - command to execute
             destination:str - Remote connection to execute against
+            as_response:bool - return the AnyLogResponse (raw bytes, decoded lazily) instead of the decoded result
+            use_cache:bool - serve the command from the response cache if possible (False to always ask the node -
+                             the fresh result still replaces the cached one)
         :param:
             headers:dict - REST header information
             response:requests.Response - response from REST request
             error - if request fails, generated error message
+            output:AnyLogResponse - result (also what the cache holds, so a cached body is decoded only once)
         :return:
-            if GET generates a result then returns result
+            if GET generates a result then returns result (JSON if valid JSON, else text)
             if GET fails then an exception is raised
         """
-        error = None
         headers = {
             "command": command,
             "User-Agent": "AnyLog/1.23"
@@ -49,18 +318,154 @@ class AnyLogConnector:
         if destination: # set to "network" if you want to `run client ()` without parameters
             headers['destination'] = destination
 
+        output = self.cache.get(command, destination) if self.cache is not None and use_cache is True else None
+        if output is None:
+            response, error = self._request(method='GET', headers=headers)
+            if response is False:
+                support.extract_get_results(command=command, response=response, error=error)
+            output = AnyLogResponse(content=response.content, status=response.status_code, headers=response.headers,
+                                    codec=self.codec)
+            if self.cache is not None:
+                self.cache.set(command, destination, output)
+
+        return output if as_response is True else output.value()
+
+    def _get_result(self, index:int, command:str, destination:str=None, as_response:bool=False)->CommandResult:
+        """
+        Execute get, capturing its result / error and latency
+        """
+        start = time.perf_counter()
         try:
-            response = requests.get(f'http://{self.conn}', headers=headers, auth=self.auth, timeout=self.timeout)
-        except Exception as e:
-            error = str(e)
-            response = False
-        else:
-            if int(response.status_code) < 200 or int(response.status_code) > 299:
-                error = int(response.status_code)
-                response = False
+            output = self.get(command=command, destination=destination, as_response=as_response)
+        except Exception as error:
+            return CommandResult(index=index, command=command, result=None, error=error,
+                                 latency=time.perf_counter() - start)
+        return CommandResult(index=index, command=command, result=output, error=None,
+                             latency=time.perf_counter() - start)
 
-        return support.extract_get_results(command=command, response=response, error=error)
+    def iter_many(self, commands:list, destination:str=None, max_concurrency:int=10, as_response:bool=False):
+        """
+        Execute many GET commands over a thread pool (sharing the connector's pooled session), at most
+        max_concurrency at a time, yielding each result as soon as it completes
+        :args:
+            commands:list - commands to execute
+            destination:str - Remote connection to execute against
+            max_concurrency:int - maximum number of commands in flight (keep it <= pool_maxsize to reuse connections)
+            as_response:bool - results as AnyLogResponse
+        :yield:
+            CommandResult (index gives the position of the command) - errors are captured, not raised
+        """
+        commands = list(commands)
+        if not commands:
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(min(max_concurrency, len(commands)), 1),
+                                                   thread_name_prefix='anylog-get-many') as executor:
+            futures = [executor.submit(self._get_result, index, command, destination, as_response)
+                       for index, command in enumerate(commands)]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:  # consumer stopped early - drop what has not started
+                    future.cancel()
+
+    def get_many(self, commands:list, destination:str=None, max_concurrency:int=10, as_response:bool=False)->list:
+        """
+        Execute many GET commands concurrently (see iter_many)
+        :return:
+            list of CommandResult, in the order of commands
+        """
+        return sorted(self.iter_many(commands=commands, destination=destination, max_concurrency=max_concurrency,
+                                     as_response=as_response), key=lambda result: result.index)
+
+    def ping(self, timeout:float=None)->AnyLogResponse:
+        """
+        Execute `get status where format=json` once, bypassing the cache, retry policy and circuit breaker - used
+        for heartbeats
+        :args:
+            timeout:float - REST timeout (defaults to the connector's)
+        :params:
+            headers:dict - REST header information
+            response:requests.Response - response from REST request
+            error - if request fails, generated error message
+        :return:
+            AnyLogResponse
+            if request fails then an exception is raised
+        """
+        headers = {
+            "command": "get status where format=json",
+            "User-Agent": "AnyLog/1.23"
+        }
+        response, error = self._request(method='GET', headers=headers, retry=False, timeout=timeout)
+        if response is False:
+            support.extract_get_results(command=headers['command'], response=response, error=error)
+        return AnyLogResponse(content=response.content, status=response.status_code, headers=response.headers,
+                              codec=self.codec)
+
+
+    def query_iter(self, command:str, destination:str=None, chunk_size:int=65536):
+        """
+        Execute a `sql ... format=json` query and yield the rows one at a time as the response is read
+        :args:
+            command:str - query to execute
+            destination:str - Remote connection to execute against
+            chunk_size:int - number of bytes read from the socket at a time
+        :params:
+            headers:dict - REST header information
+            response:requests.Response - (streamed) response from REST request
+            parser:QueryRowParser - incremental parser for the `Query` list
+        :yield:
+            rows (dict) of the result set - memory stays constant regardless of the size of the result
+        """
+        headers = {
+            "command": command,
+            "User-Agent": "AnyLog/1.23"
+        }
+        if destination:
+            headers['destination'] = destination
+
+        response, error = self._request(method='GET', headers=headers, stream=True)
+        if response is False:
+            support.extract_get_results(command=command, response=response, error=error)
+            return
+
+        parser = QueryRowParser(codec=self.codec)
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                yield from parser.feed(chunk)
+            parser.close()
+        finally:
+            response.close()
 
+    def query_columns(self, command:str, destination:str=None, timestamp_columns:list=None)->dict:
+        """
+        Execute a `sql ... format=json` query and return the results as one NumPy array per column, converting
+        the rows while they are streamed (requires numpy)
+        :args:
+            command:str - query to execute
+            destination:str - Remote connection to execute against
+            timestamp_columns:list - columns to convert to datetime64 (None to detect them)
+        :return:
+            dict of column name to numpy.ndarray
+        """
+        return columnar.to_columns(rows=self.query_iter(command=command, destination=destination),
+                                   timestamp_columns=timestamp_columns)
+
+    def export_query(self, command:str, path:str, format:str=None, destination:str=None, **kwargs)->int:
+        """
+        Stream the rows of a `sql ... format=json` query straight into a CSV / JSONL / Parquet file, in constant
+        memory - see export.export_query
+        :args:
+            command:str - query to execute
+            path:str - file to write
+            format:str - csv || jsonl || parquet (None to pick it from the file extension)
+            destination:str - Remote connection to execute against
+            kwargs - batch_size, queue_size and format specific options
+        :return:
+            number of rows written
+        """
+        return export.export_query(self, command=command, path=path, format=format, destination=destination,
+                                   **kwargs)
 
     def put(self, dbms:str, table:str, payload, mode:str='streaming')->bool:
         """
@@ -70,17 +475,22 @@ class AnyLogConnector:
             table:str - specific table to store data in
             mode:str - processing data mode (file || streaming)
                 --> If invalid raises ValueError on mode
-            payload - serialized JSON data to store
+            payload - data to store, either serialized JSON or a list / dict (encoded with the connector's codec)
         :param:
             headers:dict - REST header information
             response:requests.Response - response from REST request
             error - if request fails, generated error message
         :return:
             if PUT succeed returns True, else returns False
+        :raise:
+            AnyLogValidationError if a schema_cache is set (strict) and rows do not fit the table's columns
         """
-        error = None
         if mode.lower() not in ['streaming', 'file']:
             raise ValueError(f'Invalid mode option {mode}. Valid options streaming, file')
+        if self.schema_cache is not None:
+            payload = self.schema_cache.validate(self, dbms=dbms, table=table, payload=payload)
+            if not payload:  # every row was dropped by the schema check - nothing to send
+                return True
 
         headers = {
             'type': 'json',
@@ -89,17 +499,7 @@ class AnyLogConnector:
             'mode': mode.lower(),
             'Content-Type': 'text/plain'
         }
-        try:
-            response = requests.put(f'http://{self.conn}', auth=self.auth, timeout=self.timeout, headers=headers,
-                             data=payload)
-        except Exception as e:
-            error = str(e)
-            response = False
-        else:
-            if int(response.status_code) < 200 or int(response.status_code) > 299:
-                error = str(response.status_code)
-                response = False
-
+        response, error = self._request(method='PUT', headers=headers, data=self._encode_body(headers, payload))
         return support.validate_put_post(cmd_type='PUT', command='data', response=response, error=error)
 
 
@@ -115,7 +515,7 @@ class AnyLogConnector:
             command:str -  command to execute
             topic:str - when sending data via POST, the associated table name
              destination:sstr - Remote connection to execute against
-            payload - serialized JSON data to store
+            payload - data to store, either serialized JSON or a list / dict (encoded with the connector's codec)
         :param:
             headers:dict - REST header information
             response:requests.Response - response from REST request
@@ -123,7 +523,6 @@ class AnyLogConnector:
         :return:
             if POST succeed returns True, else returns False
         """
-        error = None
         headers = {
             "command": command,
             "User-Agent": "AnyLog/1.23"
@@ -134,17 +533,9 @@ class AnyLogConnector:
         if destination:
             headers['destination'] = destination
 
-        try:
-            response = requests.post(f'http://{self.conn}', headers=headers, data=payload, auth=self.auth,
-                                     timeout=self.timeout)
-        except Exception as e:
-            error = str(e)
-            response = False
-        else:
-            if int(response.status_code) < 200 or int(response.status_code) > 299:
-                error = str(response.status_code)
-                response = False
-
+        response, error = self._request(method='POST', headers=headers, data=self._encode_body(headers, payload))
+        if self.cache is not None and command.strip().lower().startswith('blockchain'):
+            self.cache.invalidate('blockchain get *')
         return support.validate_put_post(cmd_type='POST', command='data', response=response, error=error)
 
 def validate_type(anylog_conn):
@@ -3,46 +3,288 @@ This Source Code Form is subject to the terms of the Mozilla Public
 License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/
 """
-import ast
+import asyncio
+import time
 
 import aiohttp
 import anylog_api.__support_async__ as support
+import anylog_api.async_export as export
+import anylog_api.columnar as columnar
+import anylog_api.compression as compression_support
+from anylog_api.codec import encode_payload, get_codec
+from anylog_api.exceptions import (AnyLogCircuitOpenError, AnyLogConnectError, AnyLogConnectionError, AnyLogError,
+                                   AnyLogTimeout, RequestFailure)
+from anylog_api.json_stream import QueryRowParser
+from anylog_api.metrics import ConnectorMetrics
+from anylog_api.response import AnyLogResponse
+from anylog_api.response_cache import ResponseCache
+from anylog_api.results import CommandResult
+from anylog_api.retry import CircuitBreaker, RetryPolicy
+from anylog_api.async_schema_cache import SchemaCache
+
+def _error_type(error:Exception)->type:
+    """
+    Exception class for a failed connection - AnyLogConnectError when the connection could not be established
+    (refused, DNS failure, connect timeout), as opposed to failing once the request was sent
+    """
+    if isinstance(error, (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError)):
+        return AnyLogConnectError
+    return AnyLogTimeout if isinstance(error, asyncio.TimeoutError) else AnyLogConnectionError
+
 
 class AnyLogConnector:
-    def __init__(self, conn:str, auth:tuple=(), timeout:int=30):
+    def __init__(self, conn:str, auth:tuple=(), timeout:int=30, limit:int=100, limit_per_host:int=0,
+                 keepalive_timeout:float=15, ttl_dns_cache:int=10, cache:ResponseCache=None,
+                 codec=None, compression:str=None, compression_level:int=6, compression_threshold:int=1024,
+                 decompress_responses:bool=True, retry_policy:RetryPolicy=None, circuit_breaker:CircuitBreaker=None,
+                 metrics:ConnectorMetrics=None, schema_cache:SchemaCache=None):
         """
         The following are the base support for AnyLog via REST
             - GET:extract information from AnyLog (information + queries)
             - POST:Execute or POST command against AnyLog
             - POST_POLICY:POST information to blockchain
+        A single aiohttp.ClientSession is created lazily (on first request, inside the running loop) and reused by
+        every call, so concurrent coroutines share a bounded pool of keep-alive sockets. Use `async with` or
+        `await close()` to release it.
         :url:
             https://github.com/AnyLog-co/documentation/blob/master/using%20rest.md
         :param:
             conn:str - REST connection info
             auth:tuple - Authentication information
             timeout:int - REST timeout
+            limit:int - total number of simultaneous connections (0 for unlimited)
+            limit_per_host:int - number of simultaneous connections to the same endpoint (0 for unlimited)
+            keepalive_timeout:float - seconds an idle connection is kept open for reuse
+            ttl_dns_cache:int - seconds DNS lookups are cached (None to cache forever)
+            cache:ResponseCache - optional cache for read-only GET commands
+            codec - JSON codec (name or object) used to encode payloads and decode results, defaults to the fastest
+                    one installed (orjson, ujson, json)
+            compression:str - compress PUT / POST bodies (gzip || deflate), None to send them as-is
+            compression_level:int - compression level (1 fastest - 9 smallest)
+            compression_threshold:int - bodies smaller than this many bytes are never compressed
+            decompress_responses:bool - advertise (and transparently decode) gzip / deflate responses
+            retry_policy:RetryPolicy - retry transient failures (connection errors, 429 / 502 / 503 / 504)
+            circuit_breaker:CircuitBreaker - fail fast while the node is down
+            metrics:ConnectorMetrics - record call counts, errors, bytes and latency per command type
+            schema_cache:SchemaCache - validate (or coerce) PUT rows against the table's columns before sending
         """
         self.conn=conn
         self.auth=None
         if auth:
             self.auth=aiohttp.BasicAuth(*auth)
         self.timeout=timeout
+        self.limit=limit
+        self.limit_per_host=limit_per_host
+        self.keepalive_timeout=keepalive_timeout
+        self.ttl_dns_cache=ttl_dns_cache
+        self.cache=cache
+        self.codec=get_codec(codec)
+        self.compression=compression_support.validate_encoding(compression)
+        self.compression_level=compression_level
+        self.compression_threshold=compression_threshold
+        self.decompress_responses=decompress_responses
+        self.retry_policy=retry_policy
+        self.circuit_breaker=circuit_breaker
+        self.metrics=metrics
+        self.metrics_error=None  # last exception raised by metrics.record - never fails the request itself
+        self.schema_cache=schema_cache
+        self.liveness=None  # LivenessMonitor watching this connector (set by the monitor)
+        self.__session=None
+        self.__loop=None
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def closed(self)->bool:
+        return self.__session is None or self.__session.closed
+
+    async def _get_session(self)->aiohttp.ClientSession:
+        """
+        Return the shared session, creating it (and its TCPConnector) on first use
+        :note:
+            - there is no await between the check and the assignment, so concurrent callers never create two sessions
+            - a session is bound to the event loop it was created on; when the connector is reused from another loop
+              (e.g. a second asyncio.run) the stale session is abandoned and a new one is built on the running loop
+        """
+        loop=asyncio.get_running_loop()
+        if self.__session is not None and self.__loop is not loop:
+            self.__abandon_session()
+        if self.__session is None or self.__session.closed:
+            connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                           keepalive_timeout=self.keepalive_timeout,
+                                           ttl_dns_cache=self.ttl_dns_cache, use_dns_cache=True)
+            accept_encoding=compression_support.ACCEPT_ENCODING if self.decompress_responses else 'identity'
+            self.__session=aiohttp.ClientSession(auth=self.auth, connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                 headers={'Accept-Encoding':accept_encoding},
+                                                 auto_decompress=self.decompress_responses)
+            self.__loop=loop
+        return self.__session
+
+    def __abandon_session(self):
+        """
+        Drop a session created on another event loop without awaiting on it
+        :note:
+            session.close() would schedule work on the loop that owns the sockets, which asyncio.run has usually
+            closed by now - the connector is closed synchronously instead (idle sockets of a closed loop are released
+            when collected)
+        """
+        session=self.__session
+        self.__session=None
+        self.__loop=None
+        connector=session.connector
+        session.detach()
+        if connector is not None and not connector.closed:
+            connector._close()
+
+    async def close(self):
+        """
+        Close the shared session and its connection pool. Safe to call more than once.
+        """
+        if self.__session is not None and self.__loop is not asyncio.get_running_loop():
+            self.__abandon_session()
+        elif self.__session is not None:
+            session=self.__session
+            self.__session=None
+            self.__loop=None
+            await session.close()
+
+    def _encode_body(self, headers:dict, payload):
+        """
+        Serialize (and, if enabled, compress) a PUT / POST body - sets Content-Encoding in headers when compressed
+        """
+        data, encoding=compression_support.compress_payload(payload=encode_payload(self.codec, payload),
+                                                            encoding=self.compression, level=self.compression_level,
+                                                            threshold=self.compression_threshold)
+        if encoding is not None:
+            headers['Content-Encoding']=encoding
+        return data
+
+    async def _request(self, method:str, headers:dict, data=None, stream:bool=False, retry:bool=True,
+                       timeout:float=None):
+        """
+        Send a request through the shared session, applying the retry policy and circuit breaker (if set). The
+        outcome is reported to the liveness monitor (if any), so a failing node is marked down immediately.
+        :args:
+            method:str - HTTP method (GET, PUT, POST)
+            headers:dict - REST header information
+            data - request body
+            stream:bool - do not read the body upfront - body is the aiohttp.ClientResponse (caller must release
+                          it), and the timeout bounds connecting and each read rather than the whole download
+            retry:bool - apply the retry policy / circuit breaker and report to the liveness monitor (False for a
+                         single, unguarded attempt - e.g. a heartbeat)
+            timeout:float - REST timeout for this request (defaults to the connector's)
+        :params:
+            status - HTTP status (exception name for connection errors / timeouts)
+            body:AnyLogResponse - response (raw bytes, decoded lazily), aiohttp.ClientResponse when streaming
+            error:RequestFailure - if request fails, what went wrong (status, message, body)
+            attempt:int - number of retries done so far
+            node_failure:bool - whether the failure points at the node (connection error, timeout, 5xx)
+        :return:
+            body (False on failure), error
+        """
+        start=time.perf_counter() if self.metrics is not None else None
+        request_kwargs={'timeout':aiohttp.ClientTimeout(total=timeout)} if timeout is not None else {}
+        if stream:  # the whole body may take far longer than timeout to arrive - only bound connecting and each read
+            read_timeout=self.timeout if timeout is None else timeout
+            request_kwargs['timeout']=aiohttp.ClientTimeout(total=None, sock_connect=read_timeout,
+                                                            sock_read=read_timeout)
+        response_bytes=0
+        attempt=0
+        while True:
+            body=False
+            error=None
+            status=None
+            node_failure=False
+            if retry and self.circuit_breaker is not None and not self.circuit_breaker.allow_request():
+                error=RequestFailure(AnyLogCircuitOpenError, f'Circuit breaker open for {self.conn}', None, None)
+                status='CircuitOpen'
+                break
+
+            retry_after=None
+            retryable=False
+            try:
+                session=await self._get_session()
+                response=await session.request(method, f'http://{self.conn}', headers=headers, data=data,
+                                               **request_kwargs)
+                try:
+                    status=response.status
+                    if response.status < 200 or response.status > 299:
+                        error=RequestFailure(AnyLogError, status, status, await response.read())
+                        retryable=True
+                        retry_after=response.headers.get('Retry-After')
+                    elif stream:
+                        body=response
+                        response_bytes=response.content_length or 0
+                    else:
+                        body=AnyLogResponse(content=await response.read(), status=response.status,
+                                            headers=response.headers, codec=self.codec)
+                        response_bytes=len(body.content)
+                finally:
+                    if body is not response:
+                        response.release()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error_type=_error_type(e)
+                error=RequestFailure(error_type, str(e) or type(e).__name__, None, None)
+                status=type(e).__name__
+                retryable=True
+            except Exception as e:
+                error=RequestFailure(AnyLogError, str(e), None, None)
+                status=type(e).__name__
+
+            http_status=status if isinstance(status, int) else None
+            node_failure=body is False and retryable and (http_status is None or http_status >= 500)
+            if retry and self.circuit_breaker is not None:
+                if node_failure:
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
 
-    async def get(self, command:str, destination:str=None):
+            if body is not False or not retryable or not retry or self.retry_policy is None \
+                    or not self.retry_policy.should_retry(method=method, attempt=attempt, status=http_status,
+                                                          sent=error.error_type is not AnyLogConnectError):
+                break
+
+            await asyncio.sleep(self.retry_policy.backoff(attempt=attempt, retry_after=retry_after))
+            attempt+=1
+
+        if retry and self.liveness is not None and status != 'CircuitOpen':
+            if node_failure:
+                self.liveness.mark_down(self, error=error.error)
+            else:
+                self.liveness.mark_seen(self)
+
+        if self.metrics is not None:
+            try:
+                self.metrics.record(method=method, command=headers.get('command', 'data'), status=status,
+                                    latency=time.perf_counter() - start, request_bytes=len(data) if data else 0,
+                                    response_bytes=response_bytes, error=None if error is None else str(error.error))
+            except Exception as e:
+                self.metrics_error=e
+        return body, error
+
+    async def get(self, command:str, destination:str=None, as_response:bool=False, use_cache:bool=True):
         """
         requests GET command
         :args:
             command:str - command to execute
             destination:str - Remote connection to execute against
+            as_response:bool - return the AnyLogResponse (raw bytes, decoded lazily) instead of the text
+            use_cache:bool - serve the command from the response cache if possible (False to always ask the node -
+                             the fresh result still replaces the cached one)
         :param:
             headers:dict - REST header information
-            response:requests.Response - response from REST request
+            output:AnyLogResponse - result (also what the cache holds, so a cached body is decoded only once)
             error - if request fails, generated error message
         :return:
-            if GET generates a result then returns result
+            if GET generates a result then returns result (as text)
             if GET fails then an exception is raised
         """
-        error=None
         headers={
             "command":command,
             "User-Agent":"AnyLog/1.23"
@@ -50,17 +292,159 @@ class AnyLogConnector:
         if destination:
             headers['destination']=destination
 
+        output=self.cache.get(command, destination) if self.cache is not None and use_cache is True else None
+        if output is None:
+            output, error=await self._request('GET', headers=headers)
+            if output is False:
+                return await support.extract_get_results(command=command, response=False, error=error)
+            if self.cache is not None:
+                self.cache.set(command, destination, output)
+
+        return output if as_response else output.text
+
+    async def _get_result(self, semaphore:asyncio.Semaphore, index:int, command:str, destination:str=None,
+                          as_response:bool=False)->CommandResult:
+        """
+        Execute get (once a semaphore slot is free), capturing its result / error and latency
+        """
+        async with semaphore:
+            start=time.perf_counter()
+            try:
+                output=await self.get(command=command, destination=destination, as_response=as_response)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                return CommandResult(index=index, command=command, result=None, error=error,
+                                     latency=time.perf_counter() - start)
+        return CommandResult(index=index, command=command, result=output, error=None,
+                             latency=time.perf_counter() - start)
+
+    async def iter_many(self, commands:list, destination:str=None, max_concurrency:int=10, as_response:bool=False):
+        """
+        Execute many GET commands over the shared session, at most max_concurrency at a time, yielding each result
+        as soon as it completes
+            async for result in anylog_conn.iter_many(commands): ...
+        :args:
+            commands:list - commands to execute
+            destination:str - Remote connection to execute against
+            max_concurrency:int - maximum number of commands in flight
+            as_response:bool - results as AnyLogResponse
+        :yield:
+            CommandResult (index gives the position of the command) - errors are captured, not raised
+        """
+        semaphore=asyncio.Semaphore(max(max_concurrency, 1))
+        tasks=[asyncio.ensure_future(self._get_result(semaphore, index, command, destination, as_response))
+               for index, command in enumerate(commands)]
         try:
-            async with aiohttp.ClientSession(auth=self.auth) as session:
-                async with session.get(f'http://{self.conn}', headers=headers, timeout=self.timeout) as response:
-                    if response.status < 200 or response.status > 299:
-                        error=response.status
-                        return await support.extract_get_results(command=command, response=response, error=str(error))
-                    return await response.text()
-        except Exception as e:
-            error=str(e)
-            response = False
-            return await support.extract_get_results(command=command, response=False, error=str(error))
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:  # consumer stopped early
+                task.cancel()
+
+    async def get_many(self, commands:list, destination:str=None, max_concurrency:int=10,
+                       as_response:bool=False)->list:
+        """
+        Execute many GET commands concurrently (see iter_many)
+        :return:
+            list of CommandResult, in the order of commands
+        """
+        semaphore=asyncio.Semaphore(max(max_concurrency, 1))
+        return list(await asyncio.gather(*[self._get_result(semaphore, index, command, destination, as_response)
+                                           for index, command in enumerate(commands)]))
+
+    async def ping(self, timeout:float=None)->AnyLogResponse:
+        """
+        Execute `get status where format=json` once, bypassing the cache, retry policy and circuit breaker - used
+        for heartbeats
+        :args:
+            timeout:float - REST timeout (defaults to the connector's)
+        :params:
+            headers:dict - REST header information
+            error - if request fails, generated error message
+        :return:
+            AnyLogResponse
+            if request fails then an exception is raised
+        """
+        headers={
+            "command":"get status where format=json",
+            "User-Agent":"AnyLog/1.23"
+        }
+        output, error=await self._request('GET', headers=headers, retry=False, timeout=timeout)
+        if output is False:
+            await support.extract_get_results(command=headers['command'], response=False, error=error)
+        return output
+
+    async def query_stream(self, command:str, destination:str=None, chunk_size:int=65536):
+        """
+        Execute a `sql ... format=json` query and yield the rows one at a time as the response is read
+            async for row in anylog_conn.query_stream(command=sql_cmd, destination='network'): ...
+        :args:
+            command:str - query to execute
+            destination:str - Remote connection to execute against
+            chunk_size:int - maximum number of bytes read from the socket at a time
+        :params:
+            headers:dict - REST header information
+            parser:QueryRowParser - incremental parser for the `Query` list
+        :yield:
+            rows (dict) of the result set - memory stays constant regardless of the size of the result
+        """
+        headers={
+            "command":command,
+            "User-Agent":"AnyLog/1.23"
+        }
+        if destination:
+            headers['destination']=destination
+
+        response, error=await self._request('GET', headers=headers, stream=True)
+        if response is False:
+            await support.extract_get_results(command=command, response=False, error=error)
+            return
+
+        parser=QueryRowParser(codec=self.codec)
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                for row in parser.feed(chunk):
+                    yield row
+            parser.close()
+        except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+            await support.extract_get_results(command=command, response=False,
+                                              error=RequestFailure(_error_type(e), str(e) or type(e).__name__,
+                                                                   None, None))
+        finally:
+            response.release()
+
+    async def query_columns(self, command:str, destination:str=None, timestamp_columns:list=None)->dict:
+        """
+        Execute a `sql ... format=json` query and return the results as one NumPy array per column, converting
+        the rows while they are streamed (requires numpy)
+        :args:
+            command:str - query to execute
+            destination:str - Remote connection to execute against
+            timestamp_columns:list - columns to convert to datetime64 (None to detect them)
+        :return:
+            dict of column name to numpy.ndarray
+        """
+        builder=columnar.ColumnBuilder(timestamp_columns=timestamp_columns)
+        async for row in self.query_stream(command=command, destination=destination):
+            builder.append(row)
+        return builder.finish()
+
+    async def export_query(self, command:str, path:str, format:str=None, destination:str=None, **kwargs)->int:
+        """
+        Stream the rows of a `sql ... format=json` query straight into a CSV / JSONL / Parquet file, in constant
+        memory - see async_export.export_query
+        :args:
+            command:str - query to execute
+            path:str - file to write
+            format:str - csv || jsonl || parquet (None to pick it from the file extension)
+            destination:str - Remote connection to execute against
+            kwargs - batch_size, queue_size and format specific options
+        :return:
+            number of rows written
+        """
+        return await export.export_query(self, command=command, path=path, format=format, destination=destination,
+                                         **kwargs)
 
     async def put(self, dbms:str, table:str, payload, mode:str='streaming')->bool:
         """
@@ -70,16 +454,22 @@ class AnyLogConnector:
             table:str - specific table to store data in
             mode:str - processing data mode (file || streaming)
                 --> If invalid raises ValueError on mode
-            payload - serialized JSON data to store
+            payload - data to store, either serialized JSON or a list / dict (encoded with the connector's codec)
         :param:
             headers:dict - REST header information
             response:requests.Response - response from REST request
             error - if request fails, generated error message
         :return:
             if PUT succeed returns True, else returns False
+        :raise:
+            AnyLogValidationError if a schema_cache is set (strict) and rows do not fit the table's columns
         """
         if mode.lower() not in ['streaming', 'file']:
             raise ValueError(f'Invalid mode option {mode}. Valid options:streaming, file')
+        if self.schema_cache is not None:
+            payload=await self.schema_cache.validate(self, dbms=dbms, table=table, payload=payload)
+            if not payload:  # every row was dropped by the schema check - nothing to send
+                return True
 
         headers={
             'type':'json',
@@ -89,14 +479,8 @@ class AnyLogConnector:
             'Content-Type':'text/plain'
         }
 
-        try:
-            async with aiohttp.ClientSession(auth=self.auth) as session:
-                async with session.put(f'http://{self.conn}', headers=headers, data=payload, timeout=self.timeout) as response:
-                    if response.status < 200 or response.status > 299:
-                        return support.validate_put_post('PUT', 'data', False, str(response.status))
-                    return True
-        except Exception as e:
-            return support.validate_put_post('PUT', 'data', False, str(e))
+        output, error=await self._request('PUT', headers=headers, data=self._encode_body(headers, payload))
+        return await support.validate_put_post('PUT', 'data', output, error)
 
     async def post(self, command:str, topic:str=None, destination:str=None, payload=None)->bool:
         """
@@ -110,7 +494,7 @@ class AnyLogConnector:
             command:str -  command to execute
             topic:str - when sending data via POST, the associated table name
              destination:sstr - Remote connection to execute against
-            payload - serialized JSON data to store
+            payload - data to store, either serialized JSON or a list / dict (encoded with the connector's codec)
         :param:
             headers:dict - REST header information
             response:requests.Response - response from REST request
@@ -127,14 +511,10 @@ class AnyLogConnector:
         if destination:
             headers['destination']=destination
 
-        try:
-            async with aiohttp.ClientSession(auth=self.auth) as session:
-                async with session.post(f'http://{self.conn}', headers=headers, data=payload, timeout=self.timeout) as response:
-                    if response.status < 200 or response.status > 299:
-                        return support.validate_put_post('POST', 'data', False, str(response.status))
-                    return True
-        except Exception as e:
-            return support.validate_put_post('POST', 'data', False, str(e))
+        output, error=await self._request('POST', headers=headers, data=self._encode_body(headers, payload))
+        if self.cache is not None and command.strip().lower().startswith('blockchain'):
+            self.cache.invalidate('blockchain get *')
+        return await support.validate_put_post('POST', 'data', output, error)
 
 
 def validate_type(anylog_conn):
@@ -156,15 +536,18 @@ async def check_status(anylog_conn:AnyLogConnector)->bool:
     :args:
         anylog_conn - connection to AnyLog
     :params:
-        status:bool
-        output:str - REST request results
+        response:AnyLogResponse - REST request results
+        output:dict - decoded status
     :return:
         True - if accessible
         False - else
     """
     validate_type(anylog_conn=anylog_conn)
-    output=await anylog_conn.get("get status where format=json")
-    output =ast.literal_eval(output)
+    response=await anylog_conn.get("get status where format=json", as_response=True)
+    try:
+        output=response.json()
+    except ValueError:
+        return False
     if isinstance(output, dict) and 'Status' in output and 'running' in output['Status'] and 'not running' not in output['Status']:
         return True
     return False
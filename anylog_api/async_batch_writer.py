@@ -0,0 +1,251 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import time
+
+import anylog_api.async_anylog_connector as anylog_connector
+from anylog_api.exceptions import AnyLogSpoolFullError
+from anylog_api.batch_writer import MAX_RETRY_DELAY
+from anylog_api.spool import SPOOL_ERRORS
+
+
+class _Buffer:
+    """
+    Pending rows for a single destination, kept pre-serialized so a flush only needs to join them
+    """
+    __slots__ = ('parts', 'size', 'created', 'failures')
+
+    def __init__(self):
+        self.parts=[]
+        self.size=2  # enclosing brackets
+        self.created=time.monotonic()
+        self.failures=0  # consecutive failed sends - backs off the linger retry
+
+
+class BatchWriter:
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, max_rows:int=1000, max_bytes:int=1048576,
+                 linger:float=1.0, mode:str='streaming', spool=None):
+        """
+        Buffer individual rows per (dbms, table) and send them as a single PUT once a threshold is reached
+            - max_rows: number of rows buffered for a table
+            - max_bytes: size of the serialized payload for a table
+            - linger: seconds since the first row of the batch was added (checked by a background task)
+        Rows that fail to send are kept in the buffer and retried on the next flush, so close() either delivers
+        everything or raises. With a spool, batches that fail because the node is unreachable / failing are written
+        to disk instead (and delivered later by spool.replay()), so the buffer does not grow during an outage.
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            max_rows:int - flush once a table has this many rows
+            max_bytes:int - flush once a table's payload reaches this many bytes
+            linger:float - maximum seconds a row waits before being sent (None / 0 to disable)
+            mode:str - processing data mode (file || streaming)
+            spool:DiskSpool - optional on-disk spool for batches that could not be delivered
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        if mode.lower() not in ['streaming', 'file']:
+            raise ValueError(f'Invalid mode option {mode}. Valid options:streaming, file')
+
+        self.anylog_conn=anylog_conn
+        self.max_rows=max_rows
+        self.max_bytes=max_bytes
+        self.linger=linger
+        self.mode=mode.lower()
+        self.spool=spool
+
+        self.rows_sent=0
+        self.rows_spooled=0
+        self.batches_sent=0
+        self.last_error=None
+
+        self._buffers={}
+        self._send_lock=None
+        self._stop_event=None
+        self._closed=False
+        self._task=None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def pending_rows(self)->int:
+        return sum(len(buffer.parts) for buffer in self._buffers.values())
+
+    def _serialize(self, row)->bytes:
+        return self.anylog_conn.codec.dumps(row)
+
+    def _spool(self, key:tuple, payload:bytes):
+        """
+        Write a batch that could not be sent to the spool
+        """
+        dbms, table=key
+        self.spool.append_put(dbms=dbms, table=table, payload=payload, mode=self.mode)
+
+    async def _send(self, key:tuple, payload:bytes)->bool:
+        """
+        Send a single batch
+        :args:
+            key:tuple - (dbms, table)
+            payload:bytes - serialized JSON list of rows
+        """
+        dbms, table=key
+        return await self.anylog_conn.put(dbms=dbms, table=table, payload=payload, mode=self.mode)
+
+    def __start(self):
+        """
+        Create the loop-bound primitives on first use (inside the running loop)
+        """
+        if self._send_lock is None:
+            self._send_lock=asyncio.Lock()
+            self._stop_event=asyncio.Event()
+        if self.linger and self._task is None and not self._closed:
+            self._task=asyncio.ensure_future(self.__linger_loop())
+
+    async def _add(self, key:tuple, rows:list):
+        """
+        Serialize rows into the buffer for key, flushing it if a size threshold is crossed
+        """
+        if self._closed:
+            raise ValueError('BatchWriter is closed')
+        self.__start()
+
+        buffer=self._buffers.get(key)
+        if buffer is None:
+            buffer=self._buffers[key]=_Buffer()
+        for row in rows:
+            part=self._serialize(row)
+            buffer.parts.append(part)
+            buffer.size+=len(part) + 1
+
+        if len(buffer.parts) >= self.max_rows or buffer.size >= self.max_bytes:
+            await self._flush_keys(keys=[key])
+
+    async def add(self, dbms:str, table:str, row:dict):
+        """
+        Buffer a single row
+        :args:
+            dbms:str - logical database name
+            table:str - table to store data in
+            row:dict - row to store
+        """
+        await self._add(key=(dbms, table), rows=[row])
+
+    async def add_rows(self, dbms:str, table:str, rows:list):
+        """
+        Buffer several rows for the same table
+        :args:
+            dbms:str - logical database name
+            table:str - table to store data in
+            rows:list - rows to store
+        """
+        await self._add(key=(dbms, table), rows=rows)
+
+    def __spool(self, key:tuple, payload:bytes, error:Exception)->bool:
+        """
+        Spool a batch whose node is unreachable / failing
+        :return:
+            whether the batch was spooled
+        """
+        if self.spool is None or not isinstance(error, SPOOL_ERRORS):
+            return False
+        try:
+            self._spool(key, payload)
+        except (AnyLogSpoolFullError, OSError):
+            return False
+        return True
+
+    def __restore(self, key:tuple, buffer:_Buffer):
+        """
+        Put the rows of a batch that was not sent back, ahead of anything added meanwhile - the linger retry of the
+        batch is backed off (see __wait)
+        """
+        buffer.failures+=1
+        buffer.created=time.monotonic()
+        newer=self._buffers.get(key)
+        if newer is not None:
+            buffer.parts.extend(newer.parts)
+            buffer.size+=newer.size - 2
+        self._buffers[key]=buffer
+
+    async def _flush_keys(self, keys:list):
+        """
+        Send the buffers for keys. On failure the batch is spooled (if possible), else the rows are put back (ahead
+        of anything added meanwhile) and the error is raised. Rows of a send that is cancelled are put back too.
+        """
+        self.__start()
+        async with self._send_lock:
+            for key in keys:
+                buffer=self._buffers.pop(key, None)
+                if buffer is None or not buffer.parts:
+                    continue
+
+                payload=b'[' + b','.join(buffer.parts) + b']'
+                try:
+                    await self._send(key, payload)
+                except Exception as error:
+                    self.last_error=error
+                    if self.__spool(key, payload, error):
+                        self.rows_spooled+=len(buffer.parts)
+                        continue
+                    self.__restore(key, buffer)
+                    raise
+                except BaseException:  # cancelled - the node may or may not have the rows, keep them to resend
+                    self.__restore(key, buffer)
+                    raise
+                self.rows_sent+=len(buffer.parts)
+                self.batches_sent+=1
+
+    async def flush(self, dbms:str=None, table:str=None):
+        """
+        Send buffered rows - either for a specific table or (default) for everything
+        :args:
+            dbms:str - logical database name
+            table:str - table to flush
+        """
+        keys=[key for key in self._buffers if (dbms is None or key[0] == dbms) and (table is None or key[1] == table)]
+        await self._flush_keys(keys=keys)
+
+    def __wait(self, buffer:_Buffer)->float:
+        """
+        Seconds a buffer waits before the linger flush - linger, doubled after every failed send of the batch (up
+        to MAX_RETRY_DELAY), so a node that is down is not retried every linger / 4 seconds
+        """
+        if not buffer.failures:
+            return self.linger
+        return max(min(self.linger * 2 ** buffer.failures, MAX_RETRY_DELAY), self.linger)
+
+    async def __linger_loop(self):
+        """
+        Flush buffers whose oldest row has waited longer than linger (longer after failed sends, see __wait)
+        """
+        interval=max(self.linger / 4, 0.01)
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            now=time.monotonic()
+            keys=[key for key, buffer in self._buffers.items() if now - buffer.created >= self.__wait(buffer)]
+            if keys:
+                try:
+                    await self._flush_keys(keys=keys)
+                except Exception:
+                    pass  # rows stay buffered (see last_error) and are retried once their backoff passed
+
+    async def close(self):
+        """
+        Stop the linger task - letting a flush in progress complete - and flush everything still buffered. If the
+        final flush fails the rows are kept and close() (or flush()) can be called again.
+        """
+        self._closed=True
+        if self._task is not None:
+            self._stop_event.set()
+            await self._task
+            self._task=None
+        await self.flush()
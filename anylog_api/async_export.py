@@ -0,0 +1,102 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import functools
+import os
+
+from anylog_api.export import open_writer, resolve_format
+
+
+async def export_rows(rows, path:str, format:str=None, batch_size:int=1000, queue_size:int=8, **writer_kwargs)->int:
+    """
+    Write rows to a file - the loop consumes rows (e.g. parses the HTTP response) while batches are written in the
+    default executor, with at most queue_size batches in between. The file is written under a temporary name and
+    only renamed to path once complete.
+    :args:
+        rows - async iterable of rows (dict)
+        path:str - file to write
+        format:str - csv || jsonl || parquet (None to pick it from the file extension)
+        batch_size:int - rows handed to the writer at a time
+        queue_size:int - maximum number of batches waiting to be written
+        writer_kwargs - format specific options
+    :return:
+        number of rows written
+    """
+    loop=asyncio.get_running_loop()
+    part_path=f'{path}.part'
+    format=resolve_format(path, format)
+    writer=await loop.run_in_executor(None, functools.partial(open_writer, part_path, format=format, **writer_kwargs))
+    batches=asyncio.Queue(maxsize=queue_size)
+    errors=[]
+
+    async def write():
+        while True:
+            batch=await batches.get()
+            if batch is None:
+                return
+            if not errors:  # after a failure keep draining, so the producer never blocks
+                try:
+                    await loop.run_in_executor(None, writer.write, batch)
+                except Exception as error:
+                    errors.append(error)
+
+    task=asyncio.ensure_future(write())
+    count=0
+    completed=False
+    try:
+        batch=[]
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await batches.put(batch)
+                count+=len(batch)
+                batch=[]
+                if errors:
+                    break
+        if batch:
+            await batches.put(batch)
+            count+=len(batch)
+        completed=True
+    finally:
+        await batches.put(None)
+        await task
+        try:
+            await loop.run_in_executor(None, writer.close)
+        except Exception as error:
+            errors.append(error)
+        if completed and not errors:
+            os.replace(part_path, path)
+        elif os.path.exists(part_path):
+            os.remove(part_path)
+
+    if errors:
+        raise errors[0]
+    return count
+
+
+async def export_query(anylog_conn, command:str, path:str, format:str=None, destination:str=None,
+                       batch_size:int=1000, queue_size:int=8, **writer_kwargs)->int:
+    """
+    Stream the rows of a `sql ... format=json` query straight into a file (constant memory) - the response is
+    parsed incrementally (AnyLogConnector.query_stream) while the rows already parsed are written
+    :args:
+        anylog_conn:AnyLogConnector - connection to AnyLog
+        command:str - query to execute
+        path:str - file to write
+        format:str - csv || jsonl || parquet (None to pick it from the file extension)
+        destination:str - Remote connection to execute against
+        batch_size:int - rows handed to the writer at a time
+        queue_size:int - maximum number of batches waiting to be written
+        writer_kwargs - format specific options (columns for csv, codec for jsonl, schema / compression for parquet)
+    :return:
+        number of rows written
+    """
+    rows=anylog_conn.query_stream(command=command, destination=destination)
+    try:
+        return await export_rows(rows, path=path, format=format, batch_size=batch_size, queue_size=queue_size,
+                                 **writer_kwargs)
+    finally:  # release the response when the writer failed before every row was read
+        await rows.aclose()
@@ -0,0 +1,194 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import collections
+import logging
+import time
+
+import anylog_api.async_anylog_connector as anylog_connector
+
+logger=logging.getLogger(__name__)
+
+
+class IngestPipeline:
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, workers:int=4, queue_size:int=1000,
+                 mode:str='streaming', on_error=None, rate_window:float=10):
+        """
+        Producer / consumer ingest on top of the async connector
+            - producers `await enqueue()` rows, lists of rows or serialized payloads
+            - `workers` tasks drain the (bounded) queue concurrently, each sending one PUT / POST at a time
+            - once `queue_size` items are pending, enqueue() blocks until a worker frees a slot (backpressure)
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            workers:int - number of concurrent PUT / POST workers
+            queue_size:int - maximum number of pending items
+            mode:str - processing data mode for PUT (file || streaming)
+            on_error - optional callable(item:dict, error:Exception) invoked when an item fails to send (exceptions
+                       it raises are logged and ignored)
+            rate_window:float - seconds used to compute rows_per_second
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        if mode.lower() not in ['streaming', 'file']:
+            raise ValueError(f'Invalid mode option {mode}. Valid options:streaming, file')
+        if workers < 1:
+            raise ValueError(f'Invalid number of workers {workers}, must be at least 1')
+
+        self.anylog_conn=anylog_conn
+        self.workers=workers
+        self.queue_size=queue_size
+        self.mode=mode.lower()
+        self.on_error=on_error
+        self.rate_window=rate_window
+
+        self.in_flight=0
+        self.rows_sent=0
+        self.batches_sent=0
+        self.errors=0
+        self.last_error=None
+
+        self._queue=None
+        self._tasks=[]
+        self._started=None
+        self._sent_history=collections.deque()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        """
+        Create the queue and worker tasks (inside the running loop)
+        """
+        if self._tasks:
+            return
+        self._queue=asyncio.Queue(maxsize=self.queue_size)
+        self._started=time.monotonic()
+        self._tasks=[asyncio.ensure_future(self.__worker()) for _ in range(self.workers)]
+
+    async def _enqueue(self, item:dict):
+        if not self._tasks:
+            await self.start()
+        await self._queue.put(item)
+
+    async def enqueue(self, dbms:str, table:str, payload):
+        """
+        Queue data to be sent via PUT - blocks while the queue is full
+        :args:
+            dbms:str - logical database name
+            table:str - table to store data in
+            payload - a row (dict), a list of rows or a serialized JSON payload
+        """
+        await self._enqueue({'dbms': dbms, 'table': table, 'payload': payload})
+
+    async def enqueue_topic(self, topic:str, payload):
+        """
+        Queue data to be sent via POST to a REST message client topic - blocks while the queue is full
+        :args:
+            topic:str - message client topic
+            payload - a row (dict), a list of rows or a serialized JSON payload
+        """
+        await self._enqueue({'topic': topic, 'payload': payload})
+
+    async def __send(self, item:dict)->int:
+        """
+        Send a single queued item, returning the number of rows it contained (0 when already serialized)
+        """
+        payload=item['payload']
+        rows=0
+        if isinstance(payload, dict):
+            payload=[payload]
+        if isinstance(payload, list):
+            rows=len(payload)
+
+        if 'topic' in item:
+            await self.anylog_conn.post(command='data', topic=item['topic'], payload=payload)
+        else:
+            await self.anylog_conn.put(dbms=item['dbms'], table=item['table'], payload=payload, mode=self.mode)
+        return rows
+
+    async def __worker(self):
+        while True:
+            item=await self._queue.get()
+            self.in_flight+=1
+            try:
+                rows=await self.__send(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.errors+=1
+                self.last_error=error
+                if self.on_error is not None:
+                    try:
+                        self.on_error(item, error)
+                    except Exception:  # a failing callback must not stop the worker (close() would never return)
+                        logger.exception('on_error callback failed for %s', item.get('topic') or item.get('table'))
+            else:
+                self.rows_sent+=rows
+                self.batches_sent+=1
+                now=time.monotonic()
+                self._sent_history.append((now, rows))
+                self.__prune(now)
+            finally:
+                self.in_flight-=1
+                self._queue.task_done()
+
+    @property
+    def queue_depth(self)->int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def __prune(self, now:float):
+        """
+        Drop sends older than rate_window - done on every send, so the history holds at most one window
+        """
+        while self._sent_history and now - self._sent_history[0][0] > self.rate_window:
+            self._sent_history.popleft()
+
+    @property
+    def rows_per_second(self)->float:
+        """
+        Rows sent per second over the last rate_window seconds
+        """
+        now=time.monotonic()
+        self.__prune(now)
+        if not self._sent_history or self._started is None:
+            return 0.0
+        window=min(self.rate_window, now - self._started) or self.rate_window
+        return sum(rows for _, rows in self._sent_history) / window
+
+    def stats(self)->dict:
+        """
+        Live pipeline statistics
+        :return:
+            dict with queue_depth, in_flight, rows_sent, batches_sent, errors and rows_per_second
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'rows_sent': self.rows_sent,
+            'batches_sent': self.batches_sent,
+            'errors': self.errors,
+            'rows_per_second': self.rows_per_second
+        }
+
+    async def join(self):
+        """
+        Wait until every queued item has been processed
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        """
+        Drain the queue, then stop the workers
+        """
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks=[]
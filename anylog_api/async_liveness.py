@@ -0,0 +1,177 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import time
+
+import anylog_api.async_anylog_connector as anylog_connector
+from anylog_api.liveness import NodeLiveness, is_running
+
+
+class LivenessMonitor:
+    def __init__(self, connectors:list, interval:float=10, timeout:float=None, failure_threshold:int=1):
+        """
+        Heartbeat monitor - a background task polls `get status where format=json` on every connector (concurrently)
+        each interval seconds and keeps the result, so callers check liveness in O(1) instead of awaiting
+        check_status (a network round trip) before every operation
+            monitor = await LivenessMonitor(connectors=[anylog_conn], interval=5).start()
+            if monitor.is_alive(anylog_conn): ...
+        Connectors report to the monitor as well: a request failing with a connection error, timeout or 5xx marks
+        the node down immediately, and any successful request marks it as seen.
+        :args:
+            connectors:list - AnyLogConnector(s) to watch
+            interval:float - seconds between probes
+            timeout:float - REST timeout of a probe (defaults to interval)
+            failure_threshold:int - consecutive failed probes before a node is considered down
+        """
+        if isinstance(connectors, anylog_connector.AnyLogConnector):
+            connectors=[connectors]
+
+        self.interval=interval
+        self.timeout=interval if timeout is None else timeout
+        self.failure_threshold=max(failure_threshold, 1)
+
+        self.__nodes={}
+        self.__task=None
+        for anylog_conn in connectors:
+            self.add(anylog_conn)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @property
+    def connectors(self)->list:
+        return list(self.__nodes)
+
+    @property
+    def running(self)->bool:
+        return self.__task is not None and not self.__task.done()
+
+    def add(self, anylog_conn:anylog_connector.AnyLogConnector):
+        """
+        Start watching a connector (it reports its failures / successes to the monitor from now on)
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        if anylog_conn not in self.__nodes:
+            self.__nodes[anylog_conn]=NodeLiveness()
+        anylog_conn.liveness=self
+
+    def remove(self, anylog_conn:anylog_connector.AnyLogConnector):
+        self.__nodes.pop(anylog_conn, None)
+        if anylog_conn.liveness is self:
+            anylog_conn.liveness=None
+
+    def is_alive(self, anylog_conn:anylog_connector.AnyLogConnector)->bool:
+        """
+        Whether the node was alive when last probed / used - no network I/O
+        :raise:
+            KeyError if the connector is not watched
+        """
+        return self.__nodes[anylog_conn].alive is True
+
+    def state(self, anylog_conn:anylog_connector.AnyLogConnector)->dict:
+        """
+        Last known state of a node (see NodeLiveness)
+        """
+        return self.__nodes[anylog_conn].as_dict()
+
+    def stats(self)->dict:
+        """
+        :return:
+            dict of conn -> last known state
+        """
+        return {anylog_conn.conn: node.as_dict() for anylog_conn, node in self.__nodes.items()}
+
+    def mark_seen(self, anylog_conn:anylog_connector.AnyLogConnector, latency:float=None):
+        """
+        Record that the node answered
+        """
+        node=self.__nodes.get(anylog_conn)
+        if node is None:
+            return
+        node.last_seen=time.time()
+        if latency is not None:
+            node.latency=latency
+        node.failures=0
+        node.alive=True
+
+    def mark_down(self, anylog_conn:anylog_connector.AnyLogConnector, error=None):
+        """
+        Record a failed request - the node is considered down until it answers again
+        """
+        node=self.__nodes.get(anylog_conn)
+        if node is None:
+            return
+        node.failures+=1
+        node.last_error=None if error is None else str(error)
+        node.alive=False
+
+    async def __probe(self, anylog_conn:anylog_connector.AnyLogConnector, node:NodeLiveness)->bool:
+        start=time.perf_counter()
+        try:
+            response=await anylog_conn.ping(timeout=self.timeout)
+            running=is_running(response.json())
+            error=None if running else 'node is not running'
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            running=False
+            error=e
+
+        node.last_checked=time.time()
+        if running:
+            self.mark_seen(anylog_conn, latency=time.perf_counter() - start)
+        else:
+            node.failures+=1
+            node.last_error=str(error)
+            if node.failures >= self.failure_threshold:
+                node.alive=False
+        return node.alive is True
+
+    async def check(self, anylog_conn:anylog_connector.AnyLogConnector=None):
+        """
+        Probe now - either a single connector or (default) all of them concurrently
+        :return:
+            bool for a single connector, else dict of conn -> alive
+        """
+        if anylog_conn is not None:
+            return await self.__probe(anylog_conn, self.__nodes[anylog_conn])
+        nodes=list(self.__nodes.items())
+        alive=await asyncio.gather(*[self.__probe(anylog_conn, node) for anylog_conn, node in nodes])
+        return {anylog_conn.conn: status for (anylog_conn, _), status in zip(nodes, alive)}
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    async def start(self):
+        """
+        Probe every node once, then keep probing in a background task
+        """
+        if not self.running:
+            await self.check()
+            self.__task=asyncio.ensure_future(self.__run())
+        return self
+
+    async def stop(self, detach:bool=False):
+        """
+        Stop the heartbeat task
+        :args:
+            detach:bool - also stop connectors from reporting to the monitor
+        """
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task=None
+        if detach is True:
+            for anylog_conn in self.connectors:
+                self.remove(anylog_conn)
@@ -0,0 +1,106 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import time
+
+import anylog_api.async_anylog_connector as anylog_connector
+from anylog_api.results import NodeResult
+
+
+class NodeGroup:
+    def __init__(self, connectors:list, max_concurrency:int=None, timeout:float=None):
+        """
+        Execute the same command against many nodes concurrently (bounded gather), so a fleet-wide sweep takes as
+        long as the slowest node rather than the sum of all of them
+        :args:
+            connectors:list - AnyLogConnector per node
+            max_concurrency:int - maximum number of nodes queried at once (defaults to all of them)
+            timeout:float - default per-node timeout in seconds (None to wait for every node)
+        """
+        for anylog_conn in connectors:
+            anylog_connector.validate_type(anylog_conn=anylog_conn)
+
+        self.connectors=list(connectors)
+        self.max_concurrency=max_concurrency
+        self.timeout=timeout
+
+    @classmethod
+    def from_endpoints(cls, endpoints:list, max_concurrency:int=None, timeout:float=None, **connector_kwargs):
+        """
+        Build a group from a list of REST connections (ip:port)
+        :args:
+            endpoints:list - REST connection info per node
+            max_concurrency:int - maximum number of nodes queried at once
+            timeout:float - default per-node timeout
+            connector_kwargs - arguments passed to every AnyLogConnector
+        """
+        return cls(connectors=[anylog_connector.AnyLogConnector(conn=conn, **connector_kwargs) for conn in endpoints],
+                   max_concurrency=max_concurrency, timeout=timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self, close_connectors:bool=True):
+        """
+        Close every connector in the group
+        :args:
+            close_connectors:bool - close the connectors (False to leave them open, e.g. when shared with other code)
+        """
+        if close_connectors is True:
+            await asyncio.gather(*[anylog_conn.close() for anylog_conn in self.connectors])
+
+    async def run(self, func, timeout:float=None, **kwargs)->dict:
+        """
+        Execute await func(anylog_conn=<connector>, **kwargs) against every node
+        :args:
+            func - coroutine function such as async_anylog_connector.get_status
+            timeout:float - per-node timeout in seconds, measured from when the call starts
+            kwargs - additional arguments for func
+        :return:
+            dict of conn -> NodeResult, in the order of the connectors
+        """
+        timeout=self.timeout if timeout is None else timeout
+        semaphore=asyncio.Semaphore(self.max_concurrency or max(len(self.connectors), 1))
+
+        async def call(anylog_conn:anylog_connector.AnyLogConnector)->NodeResult:
+            async with semaphore:
+                start=time.monotonic()
+                try:
+                    result=await asyncio.wait_for(func(anylog_conn=anylog_conn, **kwargs), timeout)
+                except asyncio.TimeoutError:
+                    error=TimeoutError(f'{anylog_conn.conn} did not respond within {timeout} seconds')
+                    return NodeResult(conn=anylog_conn.conn, result=None, error=error, latency=time.monotonic() - start)
+                except Exception as error:
+                    return NodeResult(conn=anylog_conn.conn, result=None, error=error, latency=time.monotonic() - start)
+                return NodeResult(conn=anylog_conn.conn, result=result, error=None, latency=time.monotonic() - start)
+
+        results=await asyncio.gather(*[call(anylog_conn) for anylog_conn in self.connectors])
+        return {result.conn: result for result in results}
+
+    async def get(self, command:str, destination:str=None, timeout:float=None)->dict:
+        """
+        Execute a GET command against every node
+        :args:
+            command:str - command to execute
+            destination:str - Remote connection to execute against
+            timeout:float - per-node timeout in seconds
+        :return:
+            dict of conn -> NodeResult
+        """
+        async def get(anylog_conn):
+            return await anylog_conn.get(command=command, destination=destination)
+        return await self.run(func=get, timeout=timeout)
+
+    async def check_status(self, timeout:float=None)->dict:
+        """
+        Health sweep - whether each node is running
+        :return:
+            dict of conn -> NodeResult (result is True / False)
+        """
+        return await self.run(func=anylog_connector.check_status, timeout=timeout)
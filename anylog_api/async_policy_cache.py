@@ -0,0 +1,85 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import time
+
+import anylog_api.async_anylog_connector as anylog_connector
+from anylog_api.policy_cache import INDEX_KEYS, _PolicyIndex
+
+
+class PolicyCache(_PolicyIndex):
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, refresh_interval:float=60,
+                 destination:str=None, keys:tuple=INDEX_KEYS):
+        """
+        Client side copy of the blockchain (metadata) policies for the async connector - same indexes and lookups
+        as policy_cache.PolicyCache (lookups are plain, non-blocking calls), refreshed by a background task every
+        refresh_interval seconds or on demand with `await refresh()`
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            refresh_interval:float - seconds between refreshes of the background task
+            destination:str - Remote connection to execute against
+            keys:tuple - policy attributes to index
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        super().__init__(keys=keys)
+        self.anylog_conn=anylog_conn
+        self.refresh_interval=refresh_interval
+        self.destination=destination
+        self.__task=None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @property
+    def stale(self)->bool:
+        return self.last_refresh is None or time.time() - self.last_refresh >= self.refresh_interval
+
+    @property
+    def running(self)->bool:
+        return self.__task is not None and not self.__task.done()
+
+    async def refresh(self)->dict:
+        """
+        Pull the ledger now and apply the changes
+        :return:
+            dict with the number of policies added, updated and removed
+        """
+        response=await self.anylog_conn.get(command='blockchain get *', destination=self.destination,
+                                            as_response=True, use_cache=False)
+        policies=response.json()
+        return self._update(policies if isinstance(policies, list) else [policies])
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # keep serving the last good copy, retry on the next interval
+
+    async def start(self):
+        """
+        Pull the ledger (if never pulled), then keep it fresh in a background task
+        """
+        if self.last_refresh is None:
+            await self.refresh()
+        if not self.running:
+            self.__task=asyncio.ensure_future(self.__run())
+        return self
+
+    async def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task=None
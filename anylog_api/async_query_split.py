@@ -0,0 +1,40 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+import datetime
+
+import anylog_api.async_anylog_connector as anylog_connector
+from anylog_api.query_split import build_sub_queries, merge_results
+
+
+async def query_split(anylog_conn:anylog_connector.AnyLogConnector, command:str, destination:str='network',
+                      parts:int=4, max_concurrency:int=4, now:datetime.datetime=None)->list:
+    """
+    Execute a long period() query as parts sub-queries over consecutive time ranges, at most max_concurrency at a
+    time, and combine their rows in the query's order (see query_split.merge_results). The range is fixed to
+    [date-time - interval, date-time] rather than anchored on the latest reading as period() is - see
+    query_split.build_sub_queries.
+    :args:
+        anylog_conn:AnyLogConnector - connection to AnyLog
+        command:str - sql command (format=json) with a period() condition
+        destination:str - Remote connection to execute against
+        parts:int - number of sub-queries
+        max_concurrency:int - maximum number of sub-queries in flight
+        now:datetime.datetime - value of now() (defaults to the current UTC time)
+    :return:
+        list of rows
+    """
+    anylog_connector.validate_type(anylog_conn=anylog_conn)
+    sub_queries=build_sub_queries(command, parts=parts, now=now)
+    semaphore=asyncio.Semaphore(max(max_concurrency, 1))
+
+    async def execute(sub_query:str)->list:
+        async with semaphore:
+            response=await anylog_conn.get(command=sub_query, destination=destination, as_response=True)
+        return response.rows()
+
+    results=await asyncio.gather(*[execute(sub_query) for sub_query in sub_queries])
+    return merge_results(command, list(results))
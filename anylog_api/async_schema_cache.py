@@ -0,0 +1,66 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+
+from anylog_api.exceptions import is_client_error
+from anylog_api.schema_cache import TableSchema, _SchemaCache, parse_columns
+
+
+class SchemaCache(_SchemaCache):
+    def __init__(self, ttl:float=300, strictness:str='strict'):
+        """
+        Column types of the tables data is PUT into, for the async connector - same checks as
+        schema_cache.SchemaCache, with the schema lookup as a coroutine
+            schema_cache = SchemaCache(ttl=600, strictness='coerce')
+            anylog_conn = AnyLogConnector(conn, schema_cache=schema_cache)
+        :args:
+            ttl:float - seconds a table's schema is reused before being fetched again
+            strictness:str - strict (raise AnyLogValidationError) || drop (remove bad rows) ||
+                             coerce (convert values to the column type, remove the rows that cannot be)
+        """
+        super().__init__(ttl=ttl, strictness=strictness)
+        self.__pending={}  # (dbms, table) -> lookup in progress, shared by concurrent callers
+
+    async def __fetch(self, anylog_conn, dbms:str, table:str)->TableSchema:
+        try:
+            response=await anylog_conn.get(command=self._columns_command(dbms, table), as_response=True)
+            output=response.value()
+        except Exception as error:
+            if not is_client_error(error):
+                raise
+            output=None
+        schema=parse_columns(output)
+        self._store(dbms, table, schema)
+        return schema
+
+    async def schema(self, anylog_conn, dbms:str, table:str)->TableSchema:
+        """
+        Schema of a table, None if the table does not exist (yet)
+        """
+        found, schema=self._cached(dbms, table)
+        if found:
+            return schema
+        key=(dbms.lower(), table.lower())
+        if key not in self.__pending:  # one lookup per table, even with many concurrent puts
+            self.__pending[key]=asyncio.ensure_future(self.__fetch(anylog_conn, dbms, table))
+            self.__pending[key].add_done_callback(lambda _: self.__pending.pop(key, None))
+        return await asyncio.shield(self.__pending[key])
+
+    async def validate(self, anylog_conn, dbms:str, table:str, payload):
+        """
+        Check a PUT payload against the table's schema
+        :args:
+            anylog_conn:AnyLogConnector - connection used to fetch the schema (and decode serialized payloads)
+            dbms:str - logical database name
+            table:str - table the rows are stored in
+            payload - list / dict of rows or serialized JSON
+        :raise:
+            AnyLogValidationError if strictness is strict and a row does not fit the schema
+        :return:
+            payload to send (the original payload when it needs no change, else a list of rows)
+        """
+        return self._check(await self.schema(anylog_conn, dbms, table), dbms=dbms, table=table,
+                           codec=anylog_conn.codec, payload=payload)
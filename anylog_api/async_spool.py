@@ -0,0 +1,84 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import anylog_api.async_anylog_connector as anylog_connector
+import anylog_api.spool as spool
+from anylog_api.exceptions import is_client_error
+
+
+class DiskSpool(spool.DiskSpool):
+    """
+    Write-ahead spool for the async connector - same on-disk format as spool.DiskSpool (segments written by one can
+    be replayed by the other), with put / post / replay as coroutines. Frames are appended synchronously: a
+    buffered write of a single frame does not block the loop for any meaningful time.
+    """
+
+    async def _deliver(self, anylog_conn:anylog_connector.AnyLogConnector, metadata:dict, payload:bytes):
+        if metadata['method'] == 'put':
+            return await anylog_conn.put(dbms=metadata['dbms'], table=metadata['table'], payload=payload,
+                                         mode=metadata['mode'])
+        return await anylog_conn.post(command=metadata['command'], topic=metadata['topic'],
+                                      destination=metadata['destination'], payload=payload)
+
+    async def replay(self, anylog_conn:anylog_connector.AnyLogConnector, max_batch_bytes:int=4194304)->int:
+        """
+        Deliver everything spooled so far, oldest first - stops (and raises) on the first failure; what was
+        delivered up to that point is not sent again. Batches the node rejects (4xx) are dropped rather than
+        blocking the spool forever (see frames_rejected / last_error), unreadable frames are quarantined (see
+        frames_corrupt). A segment is deleted once every frame in it was delivered, rejected or quarantined.
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            max_batch_bytes:int - maximum size of a merged request
+        :return:
+            number of frames delivered
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        delivered=0
+        for segment in self._sealed_segments():
+            for (metadata, payload), frames, offset in self._batches(segment, max_batch_bytes=max_batch_bytes):
+                if metadata is None:
+                    self._quarantine(segment, payload)
+                    self._commit(segment, offset)
+                    continue
+                try:
+                    await self._deliver(anylog_conn, metadata, payload)
+                except Exception as error:
+                    if not is_client_error(error):
+                        raise
+                    self.frames_rejected+=frames
+                    self.last_error=error
+                else:
+                    delivered+=frames
+                    self.frames_replayed+=frames
+                self._commit(segment, offset)
+            with self._lock:
+                self._remove_segment(segment)
+        return delivered
+
+    async def put(self, anylog_conn:anylog_connector.AnyLogConnector, dbms:str, table:str, payload,
+                  mode:str='streaming')->bool:
+        """
+        PUT, spooling the payload if the node is unreachable / failing (connection error, timeout, 5xx)
+        :return:
+            True if delivered, False if spooled
+        """
+        try:
+            return await anylog_conn.put(dbms=dbms, table=table, payload=payload, mode=mode)
+        except spool.SPOOL_ERRORS:
+            self.append_put(dbms=dbms, table=table, payload=payload, mode=mode)
+            return False
+
+    async def post(self, anylog_conn:anylog_connector.AnyLogConnector, command:str, topic:str=None,
+                   destination:str=None, payload=None)->bool:
+        """
+        POST, spooling the payload if the node is unreachable / failing (connection error, timeout, 5xx)
+        :return:
+            True if delivered, False if spooled
+        """
+        try:
+            return await anylog_conn.post(command=command, topic=topic, destination=destination, payload=payload)
+        except spool.SPOOL_ERRORS:
+            self.append_post(command=command, topic=topic, destination=destination, payload=payload)
+            return False
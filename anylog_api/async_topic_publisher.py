@@ -0,0 +1,112 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import asyncio
+
+import anylog_api.async_anylog_connector as anylog_connector
+from anylog_api.async_batch_writer import BatchWriter
+from anylog_api.topic_publisher import _ServerCheck, parse_msg_client
+
+
+class TopicPublisher(_ServerCheck, BatchWriter):
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, max_rows:int=1000, max_bytes:int=1048576,
+                 linger:float=1.0, spool=None, monitor_interval:float=None):
+        """
+        Publish records to a REST message client for the async connector - same batching per topic as
+        topic_publisher.TopicPublisher, with the linger flush and the `get msg client` checks run as background
+        tasks (started on the first add)
+            async with TopicPublisher(anylog_conn, monitor_interval=30) as publisher:
+                await publisher.add('dummy-anylog', {'dbms': 'test', 'table': 'rand_data', 'value': 1.5})
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            max_rows:int - flush once a topic has this many records
+            max_bytes:int - flush once a topic's payload reaches this many bytes
+            linger:float - maximum seconds a record waits before being sent (None / 0 to disable)
+            spool:DiskSpool - optional on-disk spool for batches that could not be delivered
+            monitor_interval:float - seconds between `get msg client` checks (None to disable)
+        :params:
+            server_counters:dict - last message counters reported by the node (messages, success, errors)
+            server_stalled:bool - records were sent but the node's message count has not advanced since, or its
+                                  error count went up - None until two checks were made
+        """
+        super().__init__(anylog_conn=anylog_conn, max_rows=max_rows, max_bytes=max_bytes, linger=linger, spool=spool)
+        self.monitor_interval=monitor_interval
+        self.__monitor=None
+
+    def _spool(self, key:str, payload:bytes):
+        self.spool.append_post(command='data', topic=key, payload=payload)
+
+    async def _send(self, key:str, payload:bytes)->bool:
+        """
+        Send a single batch
+        :args:
+            key:str - topic
+            payload:bytes - serialized JSON list of records
+        """
+        return await self.anylog_conn.post(command='data', topic=key, payload=payload)
+
+    async def _add(self, key:str, rows:list):
+        if self.monitor_interval and self.__monitor is None and not self._closed:
+            self.__monitor=asyncio.ensure_future(self.__monitor_loop())
+        await super()._add(key=key, rows=rows)
+
+    async def add(self, topic:str, record:dict):
+        """
+        Buffer a single record
+        :args:
+            topic:str - message client topic
+            record:dict - record to publish
+        """
+        await self._add(key=topic, rows=[record])
+
+    async def add_rows(self, topic:str, records:list):
+        """
+        Buffer several records for the same topic
+        :args:
+            topic:str - message client topic
+            records:list - records to publish
+        """
+        await self._add(key=topic, rows=records)
+
+    async def flush(self, topic:str=None):
+        """
+        Send buffered records - either for a specific topic or (default) for everything
+        :args:
+            topic:str - topic to flush
+        """
+        await self._flush_keys(keys=[key for key in self._buffers if topic is None or key == topic])
+
+    async def check_server(self)->bool:
+        """
+        Read `get msg client` now and compare its counters with the previous check
+        :return:
+            server_stalled
+        """
+        response=await self.anylog_conn.get(command='get msg client', as_response=True)
+        return self._compare(parse_msg_client(response.text))
+
+    async def __monitor_loop(self):
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            try:
+                await self.check_server()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.last_error=error
+
+    async def close(self):
+        """
+        Stop the background tasks and flush everything still buffered. If the final flush fails the records are
+        kept and close() (or flush()) can be called again.
+        """
+        if self.__monitor is not None:
+            self.__monitor.cancel()
+            try:
+                await self.__monitor
+            except asyncio.CancelledError:
+                pass
+            self.__monitor=None
+        await super().close()
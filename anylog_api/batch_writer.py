@@ -0,0 +1,238 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import threading
+import time
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.exceptions import AnyLogSpoolFullError
+from anylog_api.spool import SPOOL_ERRORS
+
+MAX_RETRY_DELAY = 60  # seconds - cap of the linger retry backoff of a batch that failed to send
+
+
+class _Buffer:
+    """
+    Pending rows for a single destination, kept pre-serialized so a flush only needs to join them
+    """
+    __slots__ = ('parts', 'size', 'created', 'failures')
+
+    def __init__(self):
+        self.parts = []
+        self.size = 2  # enclosing brackets
+        self.created = time.monotonic()
+        self.failures = 0  # consecutive failed sends - backs off the linger retry
+
+
+class BatchWriter:
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, max_rows:int=1000, max_bytes:int=1048576,
+                 linger:float=1.0, mode:str='streaming', spool=None):
+        """
+        Buffer individual rows per (dbms, table) and send them as a single PUT once a threshold is reached
+            - max_rows: number of rows buffered for a table
+            - max_bytes: size of the serialized payload for a table
+            - linger: seconds since the first row of the batch was added (checked by a background thread)
+        Rows that fail to send are kept in the buffer and retried on the next flush, so close() either delivers
+        everything or raises. With a spool, batches that fail because the node is unreachable / failing are written
+        to disk instead (and delivered later by spool.replay()), so the buffer does not grow during an outage.
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            max_rows:int - flush once a table has this many rows
+            max_bytes:int - flush once a table's payload reaches this many bytes
+            linger:float - maximum seconds a row waits before being sent (None / 0 to disable)
+            mode:str - processing data mode (file || streaming)
+            spool:DiskSpool - optional on-disk spool for batches that could not be delivered
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        if mode.lower() not in ['streaming', 'file']:
+            raise ValueError(f'Invalid mode option {mode}. Valid options streaming, file')
+
+        self.anylog_conn = anylog_conn
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.linger = linger
+        self.mode = mode.lower()
+        self.spool = spool
+
+        self.rows_sent = 0
+        self.rows_spooled = 0
+        self.batches_sent = 0
+        self.last_error = None
+
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._stop_event = threading.Event()
+        self._thread = None
+        if linger:
+            self._thread = threading.Thread(target=self.__linger_loop, name='anylog-batch-writer', daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def pending_rows(self)->int:
+        with self._lock:
+            return sum(len(buffer.parts) for buffer in self._buffers.values())
+
+    def _serialize(self, row)->bytes:
+        return self.anylog_conn.codec.dumps(row)
+
+    def _spool(self, key:tuple, payload:bytes):
+        """
+        Write a batch that could not be sent to the spool
+        """
+        dbms, table = key
+        self.spool.append_put(dbms=dbms, table=table, payload=payload, mode=self.mode)
+
+    def _send(self, key:tuple, payload:bytes)->bool:
+        """
+        Send a single batch
+        :args:
+            key:tuple - (dbms, table)
+            payload:bytes - serialized JSON list of rows
+        """
+        dbms, table = key
+        return self.anylog_conn.put(dbms=dbms, table=table, payload=payload, mode=self.mode)
+
+    def _add(self, key:tuple, rows:list):
+        """
+        Serialize rows into the buffer for key, flushing it if a size threshold is crossed
+        """
+        if self._closed:
+            raise ValueError('BatchWriter is closed')
+
+        parts = [self._serialize(row) for row in rows]
+        ready = False
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = _Buffer()
+            for part in parts:
+                buffer.size += len(part) + 1
+            buffer.parts.extend(parts)
+            if len(buffer.parts) >= self.max_rows or buffer.size >= self.max_bytes:
+                ready = True
+
+        if ready:
+            self._flush_keys(keys=[key])
+
+    def add(self, dbms:str, table:str, row:dict):
+        """
+        Buffer a single row
+        :args:
+            dbms:str - logical database name
+            table:str - table to store data in
+            row:dict - row to store
+        """
+        self._add(key=(dbms, table), rows=[row])
+
+    def add_rows(self, dbms:str, table:str, rows:list):
+        """
+        Buffer several rows for the same table
+        :args:
+            dbms:str - logical database name
+            table:str - table to store data in
+            rows:list - rows to store
+        """
+        self._add(key=(dbms, table), rows=rows)
+
+    def __spool(self, key:tuple, payload:bytes, error:Exception)->bool:
+        """
+        Spool a batch whose node is unreachable / failing
+        :return:
+            whether the batch was spooled
+        """
+        if self.spool is None or not isinstance(error, SPOOL_ERRORS):
+            return False
+        try:
+            self._spool(key, payload)
+        except (AnyLogSpoolFullError, OSError):
+            return False
+        return True
+
+    def _flush_keys(self, keys:list):
+        """
+        Send the buffers for keys. On failure the batch is spooled (if possible), else the rows are put back (ahead
+        of anything added meanwhile, with the linger retry backed off) and the error is raised.
+        """
+        with self._send_lock:
+            for key in keys:
+                with self._lock:
+                    buffer = self._buffers.pop(key, None)
+                if buffer is None or not buffer.parts:
+                    continue
+
+                payload = b'[' + b','.join(buffer.parts) + b']'
+                try:
+                    self._send(key, payload)
+                except Exception as error:
+                    self.last_error = error
+                    if self.__spool(key, payload, error):
+                        self.rows_spooled += len(buffer.parts)
+                        continue
+                    buffer.failures += 1  # backs off the linger retry (see __wait)
+                    buffer.created = time.monotonic()
+                    with self._lock:
+                        newer = self._buffers.get(key)
+                        if newer is not None:
+                            buffer.parts.extend(newer.parts)
+                            buffer.size += newer.size - 2
+                        self._buffers[key] = buffer
+                    raise
+                self.rows_sent += len(buffer.parts)
+                self.batches_sent += 1
+
+    def flush(self, dbms:str=None, table:str=None):
+        """
+        Send buffered rows - either for a specific table or (default) for everything
+        :args:
+            dbms:str - logical database name
+            table:str - table to flush
+        """
+        with self._lock:
+            keys = [key for key in self._buffers
+                    if (dbms is None or key[0] == dbms) and (table is None or key[1] == table)]
+        self._flush_keys(keys=keys)
+
+    def __wait(self, buffer:_Buffer)->float:
+        """
+        Seconds a buffer waits before the linger flush - linger, doubled after every failed send of the batch (up
+        to MAX_RETRY_DELAY), so a node that is down is not retried every linger / 4 seconds
+        """
+        if not buffer.failures:
+            return self.linger
+        return max(min(self.linger * 2 ** buffer.failures, MAX_RETRY_DELAY), self.linger)
+
+    def __linger_loop(self):
+        """
+        Flush buffers whose oldest row has waited longer than linger (longer after failed sends, see __wait)
+        """
+        interval = max(self.linger / 4, 0.01)
+        while not self._stop_event.wait(interval):
+            now = time.monotonic()
+            with self._lock:
+                keys = [key for key, buffer in self._buffers.items() if now - buffer.created >= self.__wait(buffer)]
+            if keys:
+                try:
+                    self._flush_keys(keys=keys)
+                except Exception:
+                    pass  # rows stay buffered (see last_error) and are retried once their backoff passed
+
+    def close(self):
+        """
+        Stop the linger thread and flush everything still buffered. If the final flush fails the rows are kept and
+        close() (or flush()) can be called again.
+        """
+        self._closed = True
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
@@ -0,0 +1,117 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # optional - pip install anylog-api[orjson]
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # optional - pip install anylog-api[ujson]
+    ujson = None
+
+
+class StdlibCodec:
+    """
+    JSON codec based on the standard library (always available)
+    """
+    name = 'json'
+
+    @staticmethod
+    def dumps(obj)->bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class UjsonCodec:
+    """
+    JSON codec based on ujson
+    """
+    name = 'ujson'
+
+    @staticmethod
+    def dumps(obj)->bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        return ujson.loads(data)
+
+
+class OrjsonCodec:
+    """
+    JSON codec based on orjson - serializes straight to bytes
+    """
+    name = 'orjson'
+
+    @staticmethod
+    def dumps(obj)->bytes:
+        return orjson.dumps(obj)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+CODECS = {
+    'json': StdlibCodec
+}
+if ujson is not None:
+    CODECS['ujson'] = UjsonCodec
+if orjson is not None:
+    CODECS['orjson'] = OrjsonCodec
+
+# order in which codecs are picked when none is requested
+PREFERENCE = ['orjson', 'ujson', 'json']
+
+
+def register_codec(codec):
+    """
+    Make a custom codec available by name
+    :args:
+        codec - object with a name attribute, dumps(obj)->bytes and loads(bytes|str) methods
+    """
+    CODECS[codec.name] = codec
+
+
+def get_codec(codec=None):
+    """
+    Resolve a codec
+    :args:
+        codec - None (fastest installed), a codec name or a codec object
+    :raise:
+        ValueError if the requested codec is not available
+    :return:
+        codec
+    """
+    if codec is None:
+        for name in PREFERENCE:
+            if name in CODECS:
+                return CODECS[name]
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise ValueError(f'JSON codec {codec} is not available. Valid options: {", ".join(sorted(CODECS))}')
+        return CODECS[codec]
+    return codec
+
+
+def encode_payload(codec, payload):
+    """
+    Serialize a put / post payload - lists and dicts are encoded, anything else (str / bytes) is sent as-is
+    :args:
+        codec - codec used to encode the payload
+        payload - data to send
+    :return:
+        payload ready to be sent
+    """
+    if isinstance(payload, (list, dict, tuple)):
+        return codec.dumps(payload)
+    return payload
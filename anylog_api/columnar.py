@@ -0,0 +1,149 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import re
+
+try:
+    import numpy
+except ImportError:  # optional - pip install anylog-api[numpy]
+    numpy = None
+
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}')
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError('numpy is required for columnar results (pip install anylog-api[numpy])')
+
+
+class ColumnBuilder:
+    def __init__(self, timestamp_columns:list=None, timestamp_unit:str='us', chunk_size:int=65536):
+        """
+        Convert `Query` rows into one NumPy array per column. Rows are appended one at a time (e.g. straight from
+        AnyLogConnector.query_iter) and converted every chunk_size rows, so only a chunk of Python objects is held
+        in memory at a time.
+            - int / float columns -> int64 / float64 (int columns with nulls become float64 with NaN)
+            - bool columns -> bool
+            - timestamp columns -> datetime64 (nulls become NaT)
+            - anything else -> object
+        :args:
+            timestamp_columns:list - columns to convert to datetime64 (None to detect them from the first value)
+            timestamp_unit:str - datetime64 unit
+            chunk_size:int - number of rows converted at a time
+        :params:
+            rows:int - number of rows appended
+            _pending:dict - column to (not yet converted) values
+            _chunks:dict - column to converted arrays
+            _kinds:dict - column to detected kind (number, bool, timestamp, object)
+        """
+        _require_numpy()
+        self.timestamp_columns = set(timestamp_columns) if timestamp_columns is not None else None
+        self.timestamp_unit = timestamp_unit
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self._pending = {}
+        self._chunks = {}
+        self._kinds = {}
+
+    def __kind(self, column:str, value)->str:
+        if isinstance(value, bool):
+            return 'bool'
+        if isinstance(value, (int, float)):
+            return 'number'
+        if isinstance(value, str):
+            if self.timestamp_columns is not None:
+                return 'timestamp' if column in self.timestamp_columns else 'object'
+            return 'timestamp' if TIMESTAMP_PATTERN.match(value) else 'object'
+        return 'object'
+
+    def __convert(self, column:str, values:list):
+        """
+        Convert a chunk of values, falling back to an object array if they do not fit the detected kind
+        """
+        kind = self._kinds.get(column)
+        try:
+            if kind == 'number':
+                array = numpy.array(values)
+                if array.dtype.kind not in 'iuf':
+                    array = numpy.array(values, dtype='float64')
+                return array
+            if kind == 'bool' and None not in values:
+                return numpy.array(values, dtype='bool')
+            if kind == 'timestamp':
+                return numpy.array(values, dtype=f'datetime64[{self.timestamp_unit}]')
+        except (TypeError, ValueError):
+            pass
+
+        array = numpy.empty(len(values), dtype='object')
+        array[:] = values
+        return array
+
+    def __flush(self):
+        for column, values in self._pending.items():
+            if values:
+                self._chunks.setdefault(column, []).append(self.__convert(column, values))
+                self._pending[column] = []
+
+    def append(self, row:dict):
+        """
+        Add a single row
+        """
+        for column in self._pending:
+            if column not in row:
+                self._pending[column].append(None)
+
+        for column, value in row.items():
+            pending = self._pending.get(column)
+            if pending is None:  # column first seen on this row - earlier rows are null
+                filled = sum(len(chunk) for chunk in self._chunks.get(column, []))
+                pending = self._pending[column] = [None] * (self.rows - filled)
+            if column not in self._kinds and value is not None:
+                self._kinds[column] = self.__kind(column, value)
+            pending.append(value)
+
+        self.rows += 1
+        if self.rows % self.chunk_size == 0:
+            self.__flush()
+
+    def extend(self, rows):
+        """
+        Add rows - a list, an iterator (such as AnyLogConnector.query_iter) or a {"Query": [...]} result
+        """
+        if isinstance(rows, dict):
+            rows = rows.get('Query', [])
+        for row in rows:
+            self.append(row)
+
+    def finish(self)->dict:
+        """
+        Convert whatever is still pending and return the columns
+        :return:
+            dict of column name to numpy.ndarray (all of length rows)
+        """
+        self.__flush()
+        columns = {}
+        for column, chunks in self._chunks.items():
+            if self._kinds.get(column, 'object') != 'object':  # chunks read before the first non-null value
+                chunks = [self.__convert(column, [None] * len(chunk))
+                          if chunk.dtype.kind == 'O' and all(value is None for value in chunk) else chunk
+                          for chunk in chunks]
+            columns[column] = chunks[0] if len(chunks) == 1 else numpy.concatenate(chunks)
+        return columns
+
+
+def to_columns(rows, timestamp_columns:list=None, timestamp_unit:str='us', chunk_size:int=65536)->dict:
+    """
+    Convert query results into column arrays
+    :args:
+        rows - list of rows, iterator of rows or {"Query": [...]} result
+        timestamp_columns:list - columns to convert to datetime64 (None to detect them)
+        timestamp_unit:str - datetime64 unit
+        chunk_size:int - number of rows converted at a time
+    :return:
+        dict of column name to numpy.ndarray
+    """
+    builder = ColumnBuilder(timestamp_columns=timestamp_columns, timestamp_unit=timestamp_unit, chunk_size=chunk_size)
+    builder.extend(rows)
+    return builder.finish()
@@ -0,0 +1,50 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import gzip
+import zlib
+
+ENCODINGS = ['gzip', 'deflate']
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def validate_encoding(encoding:str)->str:
+    """
+    Validate a request body encoding
+    :args:
+        encoding:str - gzip, deflate or None (no compression)
+    :raise:
+        ValueError if the encoding is not supported
+    :return:
+        encoding in lower case (None if not set)
+    """
+    if encoding is None:
+        return None
+    if encoding.lower() not in ENCODINGS:
+        raise ValueError(f'Invalid compression option {encoding}. Valid options: {", ".join(ENCODINGS)}')
+    return encoding.lower()
+
+
+def compress_payload(payload, encoding:str, level:int=6, threshold:int=1024):
+    """
+    Compress a request body
+    :args:
+        payload:str|bytes - request body
+        encoding:str - gzip, deflate or None (no compression)
+        level:int - compression level (1 fastest - 9 smallest)
+        threshold:int - payloads smaller than this many bytes are sent uncompressed
+    :return:
+        (body, Content-Encoding) - Content-Encoding is None when the body was not compressed
+    """
+    if encoding is None or payload is None:
+        return payload, None
+
+    data = payload.encode('utf-8') if isinstance(payload, str) else payload
+    if not isinstance(data, (bytes, bytearray, memoryview)) or len(data) < threshold:
+        return payload, None
+
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level), encoding
+    return zlib.compress(data, level), encoding
@@ -0,0 +1,218 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import itertools
+import threading
+import time
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.exceptions import AnyLogConnectError, is_node_error, is_unsent_error
+
+STRATEGIES = ['round_robin', 'least_outstanding', 'latency']
+
+
+class _Node:
+    """
+    Load balancing state of a single operator
+    """
+    __slots__ = ('anylog_conn', 'healthy', 'outstanding', 'latency', 'failed_at', 'failures', 'selected')
+
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector):
+        self.anylog_conn = anylog_conn
+        self.healthy = True
+        self.outstanding = 0
+        self.latency = 0.0
+        self.failed_at = None
+        self.failures = 0
+        self.selected = -1  # latency strategy: selection count when the node was last picked
+
+
+class ConnectorPool:
+    def __init__(self, endpoints:list, strategy:str='round_robin', recheck_interval:float=10, ewma_alpha:float=0.3,
+                 explore_every:int=20, **connector_kwargs):
+        """
+        Spread put / post calls across several operator nodes
+            - round_robin: rotate over the healthy nodes
+            - least_outstanding: node with the fewest requests in flight
+            - latency: node with the lowest latency (exponentially weighted moving average) - every explore_every
+              selections the least recently used node is picked instead, so a node that was slow once gets
+              re-sampled rather than being starved by a stale average
+        A node that fails a request (connection error, timeout, 5xx, 429) is taken out of rotation - the request
+        is re-sent to another node when it cannot have been processed (the connection could not be established, or
+        the node replied 429 / 503). Once recheck_interval seconds have passed the node is probed with check_status
+        and put back when it passes.
+        :args:
+            endpoints:list - REST connection info (ip:port) per operator
+            strategy:str - load balancing strategy
+            recheck_interval:float - seconds before an unhealthy node is probed again
+            ewma_alpha:float - weight of the latest sample in the latency average
+            explore_every:int - latency strategy: pick the least recently used node every N selections (0 disables)
+            connector_kwargs - arguments passed to every AnyLogConnector (auth, timeout, ...)
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Invalid strategy {strategy}. Valid options: {", ".join(STRATEGIES)}')
+        if not endpoints:
+            raise ValueError('At least one endpoint is required')
+
+        self.strategy = strategy
+        self.recheck_interval = recheck_interval
+        self.ewma_alpha = ewma_alpha
+        self.explore_every = explore_every
+        self.nodes = [_Node(anylog_connector.AnyLogConnector(conn=conn, **connector_kwargs)) for conn in endpoints]
+        self.__round_robin = itertools.count()
+        self.__selections = itertools.count()
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        for node in self.nodes:
+            node.anylog_conn.close()
+
+    def stats(self)->dict:
+        """
+        Per node load balancing state
+        :return:
+            dict of conn -> healthy, outstanding requests, latency (EWMA seconds) and failures
+        """
+        return {node.anylog_conn.conn: {'healthy': node.healthy, 'outstanding': node.outstanding,
+                                        'latency': node.latency, 'failures': node.failures} for node in self.nodes}
+
+    def __recheck(self, node:_Node)->bool:
+        """
+        Probe an unhealthy node with check_status and put it back in rotation if it passes
+        """
+        try:
+            status = anylog_connector.check_status(anylog_conn=node.anylog_conn)
+        except Exception:
+            status = False
+
+        with self.__lock:
+            if status is True:
+                node.healthy = True
+                node.failures = 0
+            else:
+                node.failed_at = time.monotonic()
+        return status
+
+    def check_health(self)->dict:
+        """
+        Probe every unhealthy node now
+        :return:
+            dict of conn -> healthy
+        """
+        for node in self.nodes:
+            if not node.healthy:
+                self.__recheck(node)
+        return {node.anylog_conn.conn: node.healthy for node in self.nodes}
+
+    def _select(self, exclude:set)->_Node:
+        """
+        Pick the node for the next request, re-checking unhealthy nodes whose recheck_interval has passed
+        """
+        now = time.monotonic()
+        with self.__lock:
+            stale = [node for node in self.nodes
+                     if not node.healthy and node not in exclude and now - node.failed_at >= self.recheck_interval]
+            for node in stale:  # concurrent callers do not probe the same node again
+                node.failed_at = now
+        for node in stale:
+            self.__recheck(node)
+
+        with self.__lock:
+            candidates = [node for node in self.nodes if node.healthy and node not in exclude]
+            if not candidates:
+                return None
+            if self.strategy == 'least_outstanding':
+                node = min(candidates, key=lambda candidate: candidate.outstanding)
+            elif self.strategy == 'latency':
+                node = self.__fastest(candidates)
+            else:
+                node = candidates[next(self.__round_robin) % len(candidates)]
+            node.outstanding += 1
+        return node
+
+    def __fastest(self, candidates:list)->_Node:
+        """
+        Latency strategy - the node with the lowest average, or every explore_every selections the least recently
+        used one
+        """
+        selection = next(self.__selections)
+        if self.explore_every and selection % self.explore_every == self.explore_every - 1:
+            node = min(candidates, key=lambda candidate: candidate.selected)
+        else:
+            node = min(candidates, key=lambda candidate: candidate.latency)
+        node.selected = selection
+        return node
+
+    def _release(self, node:_Node, latency:float, error:Exception=None):
+        with self.__lock:
+            node.outstanding -= 1
+            if error is None:
+                node.latency = latency if not node.latency else \
+                    self.ewma_alpha * latency + (1 - self.ewma_alpha) * node.latency
+            else:
+                node.healthy = False
+                node.failures += 1
+                node.failed_at = time.monotonic()
+
+    def _execute(self, func, **kwargs):
+        """
+        Run func(anylog_conn, **kwargs) on a selected node, failing over to the other nodes on error
+        :raise:
+            errors that do not point at the node (local errors, 4xx other than 429) - raised as-is, without
+            touching the node's health
+            node errors (connection error, timeout, 5xx, 429) - the node is taken out of rotation; the request is
+            re-sent to another node only if it cannot have been processed (connection never established, 429 /
+            503), else the error is raised - re-sending a write that may have been stored would duplicate it
+            last error if every healthy node failed, AnyLogConnectError if no node is healthy
+        """
+        tried = set()
+        last_error = None
+        while True:
+            node = self._select(exclude=tried)
+            if node is None:
+                if last_error is not None:
+                    raise last_error
+                raise AnyLogConnectError('No healthy AnyLog node available')
+
+            tried.add(node)
+            start = time.monotonic()
+            try:
+                output = func(node.anylog_conn, **kwargs)
+            except Exception as error:
+                if not is_node_error(error):  # the node is fine, the request is not - do not fail over
+                    self._release(node=node, latency=time.monotonic() - start)
+                    raise
+                self._release(node=node, latency=time.monotonic() - start, error=error)
+                if not is_unsent_error(error):
+                    raise
+                last_error = error
+            else:
+                self._release(node=node, latency=time.monotonic() - start)
+                return output
+
+    def put(self, dbms:str, table:str, payload, mode:str='streaming')->bool:
+        """
+        Execute a PUT command against one of the nodes - see AnyLogConnector.put
+        """
+        if mode.lower() not in ['streaming', 'file']:  # invalid for every node, do not fail over
+            raise ValueError(f'Invalid mode option {mode}. Valid options streaming, file')
+
+        def put(anylog_conn, **kwargs):
+            return anylog_conn.put(**kwargs)
+        return self._execute(put, dbms=dbms, table=table, payload=payload, mode=mode)
+
+    def post(self, command:str, topic:str=None, destination:str=None, payload=None)->bool:
+        """
+        Execute a POST command against one of the nodes - see AnyLogConnector.post
+        """
+        def post(anylog_conn, **kwargs):
+            return anylog_conn.post(**kwargs)
+        return self._execute(post, command=command, topic=topic, destination=destination, payload=payload)
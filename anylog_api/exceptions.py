@@ -0,0 +1,180 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import collections
+import json
+
+import requests
+
+from anylog_api.retry import UNPROCESSED_STATUSES
+
+# failed request, as returned by the connectors' _request
+#   error_type - exception class raised for it (HTTP failures are classified by status instead)
+#   error - error message (str) or HTTP status (int)
+#   status - HTTP status (None for connection errors / timeouts)
+#   body - body of the failed response
+RequestFailure = collections.namedtuple('RequestFailure', ['error_type', 'error', 'status', 'body'])
+
+
+class AnyLogError(requests.RequestException):
+    def __init__(self, message:str, cmd_type:str=None, command:str=None, err_text:str=None):
+        """
+        Base class for errors raised by the connectors - subclasses requests.RequestException so existing
+        `except requests.RequestException` handlers keep working
+        :args:
+            message:str - error message
+            cmd_type:str - GET, PUT or POST
+            command:str - command that failed
+            err_text:str - error reported for the request
+        """
+        super().__init__(message)
+        self.cmd_type = cmd_type
+        self.command = command
+        self._err_text = err_text
+
+    @property
+    def err_text(self)->str:
+        return self._err_text
+
+
+class AnyLogConnectionError(AnyLogError, requests.ConnectionError):
+    """
+    Node could not be reached (connection refused / reset, DNS failure ...)
+    """
+
+
+class AnyLogConnectError(AnyLogConnectionError):
+    """
+    Connection to the node could not be established (refused, connect timeout ...) - the request was never sent
+    """
+
+
+class AnyLogCircuitOpenError(AnyLogConnectError):
+    """
+    Request rejected without touching the network because the connector's circuit breaker is open
+    """
+
+
+class AnyLogTimeout(AnyLogError, requests.Timeout):
+    """
+    Request did not complete within the connector's timeout
+    """
+
+
+class AnyLogSpoolFullError(AnyLogError):
+    """
+    On-disk spool reached its size limit
+    """
+
+
+class AnyLogValidationError(AnyLogError):
+    def __init__(self, message:str, errors:list=None, dbms:str=None, table:str=None):
+        """
+        Rows rejected locally, before being sent, because they do not fit the table's schema
+        :args:
+            message:str - error message
+            errors:list - (row index, column, reason) for every bad value
+            dbms:str - logical database name
+            table:str - table the rows were meant for
+        """
+        super().__init__(message, cmd_type='PUT', command='data')
+        self.errors = errors or []
+        self.dbms = dbms
+        self.table = table
+
+
+class AnyLogHTTPError(AnyLogError):
+    def __init__(self, message:str, status:int, cmd_type:str=None, command:str=None, body:bytes=None):
+        """
+        Node replied with a non 2xx status
+        :args:
+            message:str - error message
+            status:int - HTTP status
+            cmd_type:str - GET, PUT or POST
+            command:str - command that failed
+            body:bytes - body of the response (AnyLog reports the reason as {"err_code": .., "err_text": ..})
+        """
+        super().__init__(message, cmd_type=cmd_type, command=command)
+        self.status = status
+        self.body = body
+        self.__parsed = False
+
+    @property
+    def err_text(self)->str:
+        """
+        Reason reported by the node - `err_text` of a JSON body, else the body as text (parsed on first access)
+        """
+        if not self.__parsed:
+            self.__parsed = True
+            body = self.body
+            if isinstance(body, bytes):
+                body = body.decode('utf-8', errors='replace')
+            if body:
+                try:
+                    content = json.loads(body)
+                except ValueError:
+                    content = None
+                if isinstance(content, dict) and 'err_text' in content:
+                    body = str(content['err_text'])
+                self._err_text = body.strip() or None
+        return self._err_text
+
+
+class AnyLogServerError(AnyLogHTTPError):
+    """
+    Node replied with a 5xx status
+    """
+
+
+def http_error_type(status:int)->type:
+    return AnyLogServerError if status >= 500 else AnyLogHTTPError
+
+
+def is_node_error(error:Exception)->bool:
+    """
+    Whether error points at the node rather than the request (connection error, timeout, 5xx, 429) - local errors
+    (bad arguments, rows rejected by a schema check ...) and other 4xx say nothing about the node's health
+    """
+    if isinstance(error, AnyLogHTTPError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (AnyLogConnectionError, AnyLogTimeout))
+
+
+def is_unsent_error(error:Exception)->bool:
+    """
+    Whether the node cannot have processed the request (no connection, or a 429 / 503 rejection) - the only
+    failures after which a write (PUT / POST) may be sent again without risking duplicate data
+    """
+    if isinstance(error, AnyLogHTTPError):
+        return error.status in UNPROCESSED_STATUSES
+    return isinstance(error, AnyLogConnectError)
+
+
+def is_client_error(error:Exception)->bool:
+    """
+    Whether error is caused by the request itself (4xx other than 429) - sending it elsewhere / again won't help
+    """
+    return isinstance(error, AnyLogHTTPError) and 400 <= error.status < 500 and error.status != 429
+
+
+def rest_exception(message:str, cmd_type:str, command:str, error)->AnyLogError:
+    """
+    Build the exception for a failed request
+    :args:
+        message:str - error message
+        cmd_type:str - GET, PUT or POST
+        command:str - command that failed
+        error - RequestFailure, HTTP status (int) or error message (str)
+    :return:
+        AnyLogError (subclass based on the failure)
+    """
+    if isinstance(error, RequestFailure):
+        if error.status is not None:
+            return http_error_type(error.status)(message, status=error.status, cmd_type=cmd_type, command=command,
+                                                 body=error.body)
+        return error.error_type(message, cmd_type=cmd_type, command=command, err_text=error.error)
+    if isinstance(error, int):
+        return http_error_type(error)(message, status=error, cmd_type=cmd_type, command=command)
+    return AnyLogError(message, cmd_type=cmd_type, command=command, err_text=error)
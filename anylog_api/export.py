@@ -0,0 +1,223 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import csv
+import os
+import queue
+import threading
+
+from anylog_api.codec import get_codec
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional - pip install anylog-api[parquet]
+    pyarrow = None
+
+
+class CsvWriter:
+    def __init__(self, path:str, columns:list=None, **kwargs):
+        """
+        Write rows as CSV - the header is taken from columns, or from the keys of the first row (keys that only
+        appear in later rows are dropped); with no rows the file holds the header when columns is given
+        :args:
+            path:str - file to write
+            columns:list - column order
+            kwargs - csv.writer format parameters (delimiter, quoting ...)
+        """
+        self.columns = columns
+        self.__file = open(path, 'w', newline='', encoding='utf-8')
+        self.__kwargs = kwargs
+        self.__writer = None
+
+    def write(self, rows:list):
+        if self.__writer is None:
+            self.__writer = csv.DictWriter(self.__file, fieldnames=self.columns or list(rows[0]),
+                                           extrasaction='ignore', **self.__kwargs)
+            self.__writer.writeheader()
+        self.__writer.writerows(rows)
+
+    def close(self):
+        if self.__writer is None and self.columns:  # no rows - the header alone
+            csv.DictWriter(self.__file, fieldnames=self.columns, **self.__kwargs).writeheader()
+        self.__file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path:str, codec=None):
+        """
+        Write rows as JSON lines
+        :args:
+            path:str - file to write
+            codec - JSON codec used to serialize the rows
+        """
+        self.codec = get_codec(codec)
+        self.__file = open(path, 'wb')
+
+    def write(self, rows:list):
+        dumps = self.codec.dumps
+        self.__file.write(b''.join(dumps(row) + b'\n' for row in rows))
+
+    def close(self):
+        self.__file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path:str, schema=None, compression:str='snappy'):
+        """
+        Write rows as Parquet, one row group per batch (requires pyarrow) - the schema is taken from schema, or
+        inferred from the first batch (a file without rows nor schema has no columns)
+        :args:
+            path:str - file to write
+            schema:pyarrow.Schema - column types
+            compression:str - Parquet compression codec
+        """
+        if pyarrow is None:
+            raise ImportError('pyarrow is required to export Parquet files (pip install anylog-api[parquet])')
+        self.path = path
+        self.schema = schema
+        self.compression = compression
+        self.__writer = None
+
+    def write(self, rows:list):
+        table = pyarrow.Table.from_pylist(rows, schema=self.schema)
+        if self.__writer is None:
+            self.schema = table.schema
+            self.__writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.__writer.write_table(table)
+
+    def close(self):
+        if self.__writer is None:  # no rows - still produce a valid (empty) file, without columns if none are known
+            if self.schema is None:
+                self.schema = pyarrow.schema([])
+            self.__writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.__writer.close()
+
+
+FORMATS = {
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter
+}
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+
+def resolve_format(path:str, format:str=None)->str:
+    """
+    Validate the export format, picking it from the file extension when not given
+    :raise:
+        ValueError if the format is not supported
+    """
+    if format is None:
+        format = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if format not in FORMATS:
+        raise ValueError(f'Invalid export format {format}. Valid options: {", ".join(FORMATS)}')
+    return format
+
+
+def open_writer(path:str, format:str=None, **writer_kwargs):
+    """
+    Create the writer for a format
+    :args:
+        path:str - file to write
+        format:str - csv || jsonl || parquet (None to pick it from the file extension)
+        writer_kwargs - format specific options
+    :raise:
+        ValueError if the format is not supported
+    """
+    return FORMATS[resolve_format(path, format)](path, **writer_kwargs)
+
+
+def export_rows(rows, path:str, format:str=None, batch_size:int=1000, queue_size:int=8, **writer_kwargs)->int:
+    """
+    Write rows to a file - the caller's thread consumes rows (e.g. parses the HTTP response) while a writer thread
+    writes the previous batches, with at most queue_size batches in between. The file is written under a temporary
+    name and only renamed to path once complete.
+    :args:
+        rows - iterable of rows (dict)
+        path:str - file to write
+        format:str - csv || jsonl || parquet (None to pick it from the file extension)
+        batch_size:int - rows handed to the writer at a time
+        queue_size:int - maximum number of batches waiting to be written
+        writer_kwargs - format specific options
+    :return:
+        number of rows written
+    """
+    part_path = f'{path}.part'
+    writer = open_writer(part_path, format=resolve_format(path, format), **writer_kwargs)
+    batches = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def write():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if not errors:  # after a failure keep draining, so the producer never blocks
+                try:
+                    writer.write(batch)
+                except Exception as error:
+                    errors.append(error)
+
+    thread = threading.Thread(target=write, name='anylog-export', daemon=True)
+    thread.start()
+
+    count = 0
+    completed = False
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                batches.put(batch)
+                count += len(batch)
+                batch = []
+                if errors:
+                    break
+        if batch:
+            batches.put(batch)
+            count += len(batch)
+        completed = True
+    finally:
+        batches.put(None)
+        thread.join()
+        try:
+            writer.close()
+        except Exception as error:
+            errors.append(error)
+        if completed and not errors:
+            os.replace(part_path, path)
+        elif os.path.exists(part_path):
+            os.remove(part_path)
+
+    if errors:
+        raise errors[0]
+    return count
+
+
+def export_query(anylog_conn, command:str, path:str, format:str=None, destination:str=None, batch_size:int=1000,
+                 queue_size:int=8, **writer_kwargs)->int:
+    """
+    Stream the rows of a `sql ... format=json` query straight into a file (constant memory) - the response is
+    parsed incrementally (AnyLogConnector.query_iter) while a writer thread writes the rows already parsed
+        export_query(anylog_conn, command=sql_cmd, path='rand_data.parquet', destination='network')
+    :args:
+        anylog_conn:AnyLogConnector - connection to AnyLog
+        command:str - query to execute
+        path:str - file to write
+        format:str - csv || jsonl || parquet (None to pick it from the file extension)
+        destination:str - Remote connection to execute against
+        batch_size:int - rows handed to the writer at a time
+        queue_size:int - maximum number of batches waiting to be written
+        writer_kwargs - format specific options (columns for csv, codec for jsonl, schema / compression for parquet)
+    :return:
+        number of rows written
+    """
+    rows = anylog_conn.query_iter(command=command, destination=destination)
+    try:
+        return export_rows(rows, path=path, format=format, batch_size=batch_size, queue_size=queue_size,
+                           **writer_kwargs)
+    finally:  # release the response when the writer failed before every row was read
+        rows.close()
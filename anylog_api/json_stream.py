@@ -0,0 +1,128 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import codecs
+import re
+
+from anylog_api.codec import get_codec
+
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+
+class QueryRowParser:
+    def __init__(self, rows_key:str='Query', codec=None):
+        """
+        Incremental parser for AnyLog `sql ... format=json` results - feed() it chunks of the response body and it
+        returns the rows of the `Query` list as soon as each one is complete. Only the row currently being read is
+        held in memory, regardless of the size of the result set.
+            - {"Query": [{...}, {...}], "Statistics": [...]} -> rows of "Query"
+            - [{...}, {...}] -> rows of the top level list
+        :args:
+            rows_key:str - key (in the top level object) holding the list of rows
+            codec - JSON codec used to decode each row
+        :params:
+            _buf:str - decoded data that has not been consumed yet
+            _pos:int - scan position within _buf
+            _depth:int - current nesting depth
+            _rows_depth:int - depth of the rows list once inside it
+            _element_start:int - start (within _buf) of the row being read
+            _last_string:str - last string seen in the top level object (candidate key)
+        """
+        self.rows_key = rows_key
+        self._loads = get_codec(codec).loads
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._depth = 0
+        self._top = None
+        self._rows_depth = None
+        self._element_start = None
+        self._last_string = None
+        self.rows_parsed = 0
+
+    def feed(self, data)->list:
+        """
+        Consume a chunk of the response body
+        :args:
+            data:bytes|str - next chunk
+        :return:
+            list of rows completed by this chunk
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = self._decoder.decode(bytes(data))
+        if not data:
+            return []
+
+        self._buf += data
+        rows = self.__scan()
+
+        # drop everything already consumed (the row currently being read is kept)
+        keep_from = self._element_start if self._element_start is not None else self._pos
+        if keep_from:
+            self._buf = self._buf[keep_from:]
+            self._pos -= keep_from
+            if self._element_start is not None:
+                self._element_start = 0
+
+        return rows
+
+    def __scan(self)->list:
+        rows = []
+        buf = self._buf
+        pos = self._pos
+        while True:
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+
+            char = match.group()
+            index = match.start()
+            if char == '"':
+                end = _STRING_BODY.match(buf, index + 1).end()
+                if end >= len(buf) or buf[end] != '"':  # string (or an escape in it) continues in the next chunk
+                    pos = index
+                    break
+                if self._depth == 1 and self._top == '{' and self._rows_depth is None:
+                    self._last_string = buf[index + 1:end]
+                pos = end + 1
+                continue
+
+            if char in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._top = char
+                    if char == '[':
+                        self._rows_depth = 1
+                elif self._rows_depth is None:
+                    if self._depth == 2 and char == '[' and self._last_string == self.rows_key:
+                        self._rows_depth = 2
+                elif self._depth == self._rows_depth + 1 and self._element_start is None:
+                    self._element_start = index
+            else:
+                if self._rows_depth is not None and self._depth == self._rows_depth + 1 \
+                        and self._element_start is not None:
+                    rows.append(self._loads(buf[self._element_start:index + 1]))
+                    self._element_start = None
+                elif self._rows_depth is not None and self._depth == self._rows_depth:
+                    self._rows_depth = None
+                    self._last_string = None
+                self._depth -= 1
+            pos = index + 1
+
+        self._pos = pos
+        self.rows_parsed += len(rows)
+        return rows
+
+    def close(self):
+        """
+        Validate the stream ended outside of the rows list
+        :raise:
+            ValueError if the response was truncated in the middle of the rows
+        """
+        self.feed(self._decoder.decode(b'', final=True))
+        if self._rows_depth is not None:
+            raise ValueError(f'Query results truncated after {self.rows_parsed} rows')
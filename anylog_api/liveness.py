@@ -0,0 +1,213 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import concurrent.futures
+import threading
+import time
+
+import anylog_api.anylog_connector as anylog_connector
+
+
+def is_running(output)->bool:
+    """
+    Whether a `get status where format=json` result reports the node as running
+    """
+    return isinstance(output, dict) and 'Status' in output and 'running' in output['Status'] \
+        and 'not running' not in output['Status']
+
+
+class NodeLiveness:
+    """
+    Last known state of a single node
+        alive:bool - whether the node answered its last probe / request (None until first checked)
+        last_seen:float - time.time() of the last successful probe / request
+        last_checked:float - time.time() of the last probe
+        latency:float - seconds taken by the last successful probe
+        failures:int - consecutive failed probes / requests
+        last_error:str - error of the last failure
+    """
+    __slots__ = ('alive', 'last_seen', 'last_checked', 'latency', 'failures', 'last_error')
+
+    def __init__(self):
+        self.alive = None
+        self.last_seen = None
+        self.last_checked = None
+        self.latency = None
+        self.failures = 0
+        self.last_error = None
+
+    def as_dict(self)->dict:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class LivenessMonitor:
+    def __init__(self, connectors:list, interval:float=10, timeout:float=None, failure_threshold:int=1):
+        """
+        Heartbeat monitor - a daemon thread polls `get status where format=json` on every connector each interval
+        seconds and keeps the result, so callers check liveness in O(1) instead of calling check_status (a network
+        round trip) before every operation
+            monitor = LivenessMonitor(connectors=[anylog_conn], interval=5).start()
+            if monitor.is_alive(anylog_conn): ...
+        Connectors report to the monitor as well: a request failing with a connection error, timeout or 5xx marks
+        the node down immediately, and any successful request marks it as seen.
+        :args:
+            connectors:list - AnyLogConnector(s) to watch
+            interval:float - seconds between probes
+            timeout:float - REST timeout of a probe (defaults to interval)
+            failure_threshold:int - consecutive failed probes before a node is considered down
+        """
+        if isinstance(connectors, anylog_connector.AnyLogConnector):
+            connectors = [connectors]
+
+        self.interval = interval
+        self.timeout = interval if timeout is None else timeout
+        self.failure_threshold = max(failure_threshold, 1)
+
+        self.__nodes = {}
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+        for anylog_conn in connectors:
+            self.add(anylog_conn)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def connectors(self)->list:
+        return list(self.__nodes)
+
+    @property
+    def running(self)->bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def add(self, anylog_conn:anylog_connector.AnyLogConnector):
+        """
+        Start watching a connector (it reports its failures / successes to the monitor from now on)
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        with self.__lock:
+            if anylog_conn not in self.__nodes:
+                self.__nodes[anylog_conn] = NodeLiveness()
+        anylog_conn.liveness = self
+
+    def remove(self, anylog_conn:anylog_connector.AnyLogConnector):
+        with self.__lock:
+            self.__nodes.pop(anylog_conn, None)
+        if anylog_conn.liveness is self:
+            anylog_conn.liveness = None
+
+    def is_alive(self, anylog_conn:anylog_connector.AnyLogConnector)->bool:
+        """
+        Whether the node was alive when last probed / used - no network I/O
+        :raise:
+            KeyError if the connector is not watched
+        """
+        return self.__nodes[anylog_conn].alive is True
+
+    def state(self, anylog_conn:anylog_connector.AnyLogConnector)->dict:
+        """
+        Last known state of a node (see NodeLiveness)
+        """
+        return self.__nodes[anylog_conn].as_dict()
+
+    def stats(self)->dict:
+        """
+        :return:
+            dict of conn -> last known state
+        """
+        return {anylog_conn.conn: node.as_dict() for anylog_conn, node in list(self.__nodes.items())}
+
+    def mark_seen(self, anylog_conn:anylog_connector.AnyLogConnector, latency:float=None):
+        """
+        Record that the node answered
+        """
+        node = self.__nodes.get(anylog_conn)
+        if node is None:
+            return
+        node.last_seen = time.time()
+        if latency is not None:
+            node.latency = latency
+        node.failures = 0
+        node.alive = True
+
+    def mark_down(self, anylog_conn:anylog_connector.AnyLogConnector, error=None):
+        """
+        Record a failed request - the node is considered down until it answers again
+        """
+        node = self.__nodes.get(anylog_conn)
+        if node is None:
+            return
+        node.failures += 1
+        node.last_error = None if error is None else str(error)
+        node.alive = False
+
+    def __probe(self, anylog_conn:anylog_connector.AnyLogConnector, node:NodeLiveness)->bool:
+        start = time.perf_counter()
+        try:
+            running = is_running(anylog_conn.ping(timeout=self.timeout).json())
+            error = None if running else 'node is not running'
+        except Exception as e:
+            running = False
+            error = e
+
+        node.last_checked = time.time()
+        if running:
+            self.mark_seen(anylog_conn, latency=time.perf_counter() - start)
+        else:
+            node.failures += 1
+            node.last_error = str(error)
+            if node.failures >= self.failure_threshold:
+                node.alive = False
+        return node.alive is True
+
+    def check(self, anylog_conn:anylog_connector.AnyLogConnector=None):
+        """
+        Probe now - either a single connector or (default) all of them concurrently, so a sweep costs about one
+        timeout however many nodes are down
+        :return:
+            bool for a single connector, else dict of conn -> alive
+        """
+        if anylog_conn is not None:
+            return self.__probe(anylog_conn, self.__nodes[anylog_conn])
+        nodes = list(self.__nodes.items())
+        if not nodes:
+            return {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(nodes),
+                                                   thread_name_prefix='anylog-liveness-probe') as executor:
+            alive = list(executor.map(lambda item: self.__probe(*item), nodes))
+        return {anylog_conn.conn: status for (anylog_conn, _), status in zip(nodes, alive)}
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """
+        Probe every node once, then keep probing in a daemon thread
+        """
+        if not self.running:
+            self.check()
+            self.__stop.clear()
+            self.__thread = threading.Thread(target=self.__run, name='anylog-liveness', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self, detach:bool=False):
+        """
+        Stop the heartbeat thread
+        :args:
+            detach:bool - also stop connectors from reporting to the monitor
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join(timeout=self.timeout + 1)
+            self.__thread = None
+        if detach is True:
+            for anylog_conn in self.connectors:
+                self.remove(anylog_conn)
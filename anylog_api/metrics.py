@@ -0,0 +1,187 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import bisect
+import threading
+
+# latency histogram bucket upper bounds (seconds) - anything slower falls in the +Inf bucket
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# commands whose verb is made of their first two words (e.g. `get status`, `blockchain get`)
+TWO_WORD_VERBS = ('get', 'blockchain', 'test', 'run', 'set', 'reset', 'exit')
+
+
+def command_verb(command:str)->str:
+    """
+    Reduce a command to the verb it is reported under
+        sql test format=json select ... -> sql
+        get status where format=json -> get status
+        blockchain get operator -> blockchain get
+    :args:
+        command:str - AnyLog command
+    :return:
+        verb (lower case)
+    """
+    words = command.strip().lower().split(None, 2)
+    if not words:
+        return ''
+    if words[0] in TWO_WORD_VERBS and len(words) > 1:
+        return f'{words[0]} {words[1]}'
+    return words[0]
+
+
+class LatencyHistogram:
+    def __init__(self, buckets:tuple=BUCKETS):
+        """
+        Fixed-bucket latency histogram (Prometheus style)
+        :args:
+            buckets:tuple - sorted bucket upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percent:float)->float:
+        """
+        Estimate a percentile, interpolating linearly within the bucket it falls in
+        :args:
+            percent:float - percentile (0 - 100)
+        :return:
+            latency in seconds (None if nothing was observed)
+        """
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):  # +Inf bucket - best guess is its lower bound
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def snapshot(self)->dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': buckets
+        }
+
+
+class _CommandMetrics:
+    __slots__ = ('calls', 'errors', 'request_bytes', 'response_bytes', 'latency')
+
+    def __init__(self, buckets:tuple):
+        self.calls = 0
+        self.errors = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = LatencyHistogram(buckets=buckets)
+
+
+class ConnectorMetrics:
+    def __init__(self, buckets:tuple=BUCKETS):
+        """
+        Per command type metrics for a connector - call counts, errors by status, request / response bytes and
+        latency histograms - grouped by HTTP method and command verb (see command_verb)
+            anylog_conn = AnyLogConnector(conn=conn, metrics=ConnectorMetrics())
+        Hooks (callables) registered with add_hook are invoked with every event, e.g. to export to Prometheus. An
+        exception raised by a hook is counted (hook_errors / last_hook_error) and never fails the request.
+        :args:
+            buckets:tuple - latency histogram bucket upper bounds in seconds
+        :params:
+            hook_errors:int - number of hook calls that raised
+            last_hook_error:Exception - last exception raised by a hook
+        """
+        self.buckets = tuple(buckets)
+        self.hooks = []
+        self.hook_errors = 0
+        self.last_hook_error = None
+        self.__commands = {}
+        self.__lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        Register a callable invoked with a dict per request: method, verb, status, latency, request_bytes,
+        response_bytes and error
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def record(self, method:str, command:str, status, latency:float, request_bytes:int=0, response_bytes:int=0,
+               error:str=None):
+        """
+        Record a single request
+        :args:
+            method:str - HTTP method
+            command:str - command executed (`data` for PUT)
+            status - HTTP status, or the exception name for connection errors / timeouts
+            latency:float - seconds taken (including retries)
+            request_bytes:int - size of the request body
+            response_bytes:int - size of the response body
+            error:str - error message (None on success)
+        """
+        verb = command_verb(command)
+        with self.__lock:
+            metrics = self.__commands.get((method, verb))
+            if metrics is None:
+                metrics = self.__commands[(method, verb)] = _CommandMetrics(buckets=self.buckets)
+            metrics.calls += 1
+            if error is not None:
+                metrics.errors[status] = metrics.errors.get(status, 0) + 1
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes
+            metrics.latency.observe(latency)
+
+        if self.hooks:
+            event = {'method': method, 'verb': verb, 'status': status, 'latency': latency,
+                     'request_bytes': request_bytes, 'response_bytes': response_bytes, 'error': error}
+            for hook in self.hooks:
+                try:
+                    hook(event)
+                except Exception as error:
+                    with self.__lock:
+                        self.hook_errors += 1
+                    self.last_hook_error = error
+
+    def snapshot(self)->dict:
+        """
+        Current metrics
+        :return:
+            {method: {verb: {calls, errors, request_bytes, response_bytes, latency}}}
+        """
+        output = {}
+        with self.__lock:
+            for (method, verb), metrics in self.__commands.items():
+                output.setdefault(method, {})[verb] = {
+                    'calls': metrics.calls,
+                    'errors': dict(metrics.errors),
+                    'request_bytes': metrics.request_bytes,
+                    'response_bytes': metrics.response_bytes,
+                    'latency': metrics.latency.snapshot()
+                }
+        return output
+
+    def reset(self):
+        with self.__lock:
+            self.__commands.clear()
@@ -0,0 +1,137 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import concurrent.futures
+import time
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.results import NodeResult
+
+
+class NodeGroup:
+    def __init__(self, connectors:list, max_workers:int=None, timeout:float=None):
+        """
+        Execute the same command against many nodes concurrently (thread pool), so a fleet-wide sweep takes as
+        long as the slowest node rather than the sum of all of them
+        :args:
+            connectors:list - AnyLogConnector per node
+            max_workers:int - number of threads (defaults to one per node)
+            timeout:float - default per-node timeout in seconds (None to wait for every node)
+        """
+        for anylog_conn in connectors:
+            anylog_connector.validate_type(anylog_conn=anylog_conn)
+
+        self.connectors = list(connectors)
+        self.timeout = timeout
+        self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or max(len(self.connectors), 1),
+                                                                thread_name_prefix='anylog-node-group')
+
+    @classmethod
+    def from_endpoints(cls, endpoints:list, max_workers:int=None, timeout:float=None, **connector_kwargs):
+        """
+        Build a group from a list of REST connections (ip:port)
+        :args:
+            endpoints:list - REST connection info per node
+            max_workers:int - number of threads
+            timeout:float - default per-node timeout
+            connector_kwargs - arguments passed to every AnyLogConnector
+        """
+        return cls(connectors=[anylog_connector.AnyLogConnector(conn=conn, **connector_kwargs) for conn in endpoints],
+                   max_workers=max_workers, timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self, close_connectors:bool=True):
+        """
+        Stop the thread pool without waiting for calls still running against unresponsive nodes, and close every
+        connector in the group
+        :args:
+            close_connectors:bool - close the connectors (False to leave them open, e.g. when shared with other code)
+        """
+        self.__executor.shutdown(wait=False)
+        if close_connectors is True:
+            for anylog_conn in self.connectors:
+                anylog_conn.close()
+
+    def run(self, func, timeout:float=None, **kwargs)->dict:
+        """
+        Execute func(anylog_conn=<connector>, **kwargs) against every node
+        :args:
+            func - callable such as anylog_connector.get_status
+            timeout:float - per-node timeout in seconds, measured from when the call starts
+            kwargs - additional arguments for func
+        :params:
+            started:dict - index of node to time its call started
+            results:list - NodeResult per node
+        :return:
+            dict of conn -> NodeResult, in the order of the connectors
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = {}
+
+        def call(index:int, anylog_conn:anylog_connector.AnyLogConnector):
+            started[index] = time.monotonic()
+            return func(anylog_conn=anylog_conn, **kwargs)
+
+        futures = {self.__executor.submit(call, index, anylog_conn): index
+                   for index, anylog_conn in enumerate(self.connectors)}
+        results = [None] * len(self.connectors)
+        pending = set(futures)
+        while pending:
+            wait_for = None
+            if timeout is not None:
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    if index in started and not future.done() and now - started[index] >= timeout:
+                        pending.discard(future)
+                        error = TimeoutError(f'{self.connectors[index].conn} did not respond within {timeout} seconds')
+                        results[index] = NodeResult(conn=self.connectors[index].conn, result=None, error=error,
+                                                    latency=now - started[index])
+                deadlines = [started[futures[future]] + timeout - now for future in pending
+                             if futures[future] in started]
+                wait_for = max(min(deadlines), 0) if deadlines else timeout
+                if not pending:
+                    break
+
+            done, pending = concurrent.futures.wait(pending, timeout=wait_for,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                latency = time.monotonic() - started.get(index, time.monotonic())
+                try:
+                    results[index] = NodeResult(conn=self.connectors[index].conn, result=future.result(), error=None,
+                                                latency=latency)
+                except Exception as error:
+                    results[index] = NodeResult(conn=self.connectors[index].conn, result=None, error=error,
+                                                latency=latency)
+
+        return {result.conn: result for result in results}
+
+    def get(self, command:str, destination:str=None, timeout:float=None)->dict:
+        """
+        Execute a GET command against every node
+        :args:
+            command:str - command to execute
+            destination:str - Remote connection to execute against
+            timeout:float - per-node timeout in seconds
+        :return:
+            dict of conn -> NodeResult
+        """
+        def get(anylog_conn):
+            return anylog_conn.get(command=command, destination=destination)
+        return self.run(func=get, timeout=timeout)
+
+    def check_status(self, timeout:float=None)->dict:
+        """
+        Health sweep - whether each node is running
+        :return:
+            dict of conn -> NodeResult (result is True / False)
+        """
+        return self.run(func=anylog_connector.check_status, timeout=timeout)
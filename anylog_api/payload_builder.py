@@ -0,0 +1,169 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import array
+import datetime
+import json
+import math
+import time
+
+try:
+    import numpy
+except ImportError:  # optional - pip install anylog-api[numpy]
+    numpy = None
+
+SECOND_FORMAT = '%Y-%m-%dT%H:%M:%S'  # timestamps are written as SECOND_FORMAT + .microseconds
+EPOCH_UNITS = {'s': 1, 'ms': 1000, 'us': 1000000, 'ns': 1000000000}
+MAX_CACHED_SECONDS = 4096
+
+
+def _is_numpy(values)->bool:
+    return numpy is not None and isinstance(values, numpy.ndarray)
+
+
+def _as_list(values)->list:
+    """
+    Python values of a column - array.array / memoryview / numpy arrays are unpacked in C
+    """
+    if isinstance(values, (memoryview, array.array)) or _is_numpy(values):
+        return values.tolist()
+    return values if isinstance(values, list) else list(values)
+
+
+def encode_values(values)->list:
+    """
+    JSON text of every value of a column - NumPy arrays are unpacked and checked for NaN / inf (written as null) in
+    bulk, anything else converted per value
+    :args:
+        values - numpy array, array.array, memoryview or sequence
+    :return:
+        sequence of str
+    """
+    if _is_numpy(values):
+        kind = values.dtype.kind
+        if kind in 'iu':
+            return list(map(str, values.tolist()))
+        if kind == 'f':
+            text = list(map(repr, values.tolist()))
+            for index in numpy.flatnonzero(~numpy.isfinite(values)).tolist():
+                text[index] = 'null'
+            return text
+        if kind == 'b':
+            return numpy.where(values, 'true', 'false').tolist()
+
+    output = []
+    append = output.append
+    for value in _as_list(values):
+        if value is None:
+            append('null')
+        elif value is True:
+            append('true')
+        elif value is False:
+            append('false')
+        elif isinstance(value, int):
+            append(str(value))
+        elif isinstance(value, float):
+            append(repr(value) if math.isfinite(value) else 'null')
+        else:
+            append(json.dumps(value if isinstance(value, str) else str(value)))
+    return output
+
+
+class PayloadBuilder:
+    def __init__(self, timestamp_column:str='timestamp', epoch_unit:str='s'):
+        """
+        Build the JSON body of put / post from column arrays rather than a list of dicts - values are converted
+        one column at a time and the rows assembled from a single row template
+            builder = PayloadBuilder()
+            payload = builder.build({'timestamp': timestamps, 'value': values}, constants={'device': 'sensor-1'})
+            anylog_conn.put(dbms='test', table='rand_data', payload=payload)
+        The timestamp column accepts numpy datetime64 arrays, epochs (seconds by default - numpy arrays,
+        array.array, memoryview or lists, formatted in UTC), datetime objects or strings. Timestamps are written as
+        %Y-%m-%dT%H:%M:%S.%f - vectorised with numpy.datetime_as_string for NumPy arrays, else with one strftime
+        per distinct second.
+        :args:
+            timestamp_column:str - column holding the timestamps (None if there is none)
+            epoch_unit:str - unit of numeric timestamps (s || ms || us || ns)
+        :params:
+            __seconds:dict - formatted second -> text, for timestamps formatted without NumPy
+        """
+        if epoch_unit not in EPOCH_UNITS:
+            raise ValueError(f'Invalid epoch unit {epoch_unit}. Valid options: {", ".join(EPOCH_UNITS)}')
+        self.timestamp_column = timestamp_column
+        self.epoch_unit = epoch_unit
+        self.__seconds = {}
+
+    def __second(self, key, value)->str:
+        text = self.__seconds.get(key)
+        if text is None:
+            if len(self.__seconds) >= MAX_CACHED_SECONDS:
+                self.__seconds.clear()
+            if isinstance(value, datetime.datetime):
+                text = value.strftime(SECOND_FORMAT)
+            else:
+                text = time.strftime(SECOND_FORMAT, time.gmtime(value))
+            self.__seconds[key] = text
+        return text
+
+    def encode_timestamps(self, values)->list:
+        """
+        JSON text (quoted) of a timestamp column
+        """
+        if _is_numpy(values) and values.dtype.kind in 'iu':
+            values = values.astype('int64').astype(f'datetime64[{self.epoch_unit}]')
+        elif _is_numpy(values) and values.dtype.kind == 'f':
+            with numpy.errstate(invalid='ignore'):
+                micros = numpy.rint(values * (1000000 / EPOCH_UNITS[self.epoch_unit])).astype('int64')
+            micros[~numpy.isfinite(values)] = numpy.iinfo('int64').min  # NaT
+            values = micros.astype('datetime64[us]')
+        if _is_numpy(values) and values.dtype.kind == 'M':
+            text = numpy.char.add(numpy.char.add('"', numpy.datetime_as_string(values, unit='us')), '"')
+            text[numpy.isnat(values)] = 'null'
+            return text.tolist()
+
+        output = []
+        append = output.append
+        scale = EPOCH_UNITS[self.epoch_unit]
+        for value in _as_list(values):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                micros = value * 1000000 // scale if isinstance(value, int) else round(value * 1000000 / scale)
+                seconds, micros = divmod(micros, 1000000)
+                append(f'"{self.__second(seconds, seconds)}.{micros:06d}"')
+            elif isinstance(value, datetime.datetime):
+                append(f'"{self.__second(value.replace(microsecond=0), value)}.{value.microsecond:06d}"')
+            elif value is None:
+                append('null')
+            else:
+                append(json.dumps(str(value)))
+        return output
+
+    def build(self, columns:dict, constants:dict=None)->bytes:
+        """
+        Serialize columns into a JSON list of rows
+        :args:
+            columns:dict - column name -> values (all columns must have the same length)
+            constants:dict - column name -> value repeated on every row (e.g. the device name)
+        :raise:
+            ValueError if the columns have different lengths
+        :return:
+            payload (bytes)
+        """
+        names = list(columns)
+        encoded = []
+        for name in names:
+            if name == self.timestamp_column:
+                encoded.append(self.encode_timestamps(columns[name]))
+            else:
+                encoded.append(encode_values(columns[name]))
+        lengths = {len(values) for values in encoded}
+        if len(lengths) > 1:
+            raise ValueError(f'Columns have different lengths ({", ".join(str(length) for length in lengths)})')
+
+        fields = [json.dumps(str(name)).replace('%', '%%') + ':%s' for name in names]
+        fields += [f'{json.dumps(str(name))}:{json.dumps(value, default=str)}'.replace('%', '%%')
+                   for name, value in (constants or {}).items()]
+        template = '{' + ','.join(fields) + '}'
+        body = ','.join(map(template.__mod__, zip(*encoded))) if names else ''
+        return f'[{body}]'.encode('utf-8')
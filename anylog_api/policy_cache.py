@@ -0,0 +1,234 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import hashlib
+import json
+import threading
+import time
+
+import anylog_api.anylog_connector as anylog_connector
+
+INDEX_KEYS = ('name', 'ip', 'company', 'table', 'cluster')
+
+
+def _normalize(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def _index_values(value)->list:
+    """
+    Values a policy attribute is indexed under - lists are indexed per element, and dict elements (such as the
+    tables of a cluster policy) under their name
+    """
+    values = value if isinstance(value, list) else [value]
+    output = []
+    for item in values:
+        if isinstance(item, dict):
+            item = item.get('name')
+        if item is not None and not isinstance(item, (dict, list)):
+            output.append(_normalize(item))
+    return output
+
+
+def policy_id(policy:dict)->str:
+    """
+    Id of a policy (a hash of its content for policies without one)
+    """
+    policy_type = next(iter(policy))
+    body = policy[policy_type]
+    if isinstance(body, dict) and body.get('id'):
+        return body['id']
+    return hashlib.md5(json.dumps(policy, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _PolicyIndex:
+    def __init__(self, keys:tuple=INDEX_KEYS):
+        """
+        In-memory index of blockchain policies: by id, by type and by (key, value) for keys
+        """
+        self.keys = tuple(keys)
+        self.last_refresh = None
+        self._policies = {}
+        self._by_type = {}
+        self._by_key = {}
+
+    def __len__(self):
+        return len(self._policies)
+
+    def __contains__(self, policy_id:str):
+        return policy_id in self._policies
+
+    def __add(self, pid:str, policy:dict):
+        policy_type = next(iter(policy))
+        body = policy[policy_type] if isinstance(policy[policy_type], dict) else {}
+        self._policies[pid] = policy
+        self._by_type.setdefault(policy_type, {})[pid] = policy
+        for key in self.keys:
+            if key in body:
+                for value in _index_values(body[key]):
+                    self._by_key.setdefault((key, value), {})[pid] = policy
+
+    def __remove(self, pid:str):
+        policy = self._policies.pop(pid)
+        policy_type = next(iter(policy))
+        body = policy[policy_type] if isinstance(policy[policy_type], dict) else {}
+        self._by_type[policy_type].pop(pid, None)
+        if not self._by_type[policy_type]:
+            del self._by_type[policy_type]
+        for key in self.keys:
+            if key in body:
+                for value in _index_values(body[key]):
+                    entries = self._by_key.get((key, value))
+                    if entries is not None:
+                        entries.pop(pid, None)
+                        if not entries:
+                            del self._by_key[(key, value)]
+
+    def _update(self, policies:list)->dict:
+        """
+        Apply a full ledger pull - only policies that are new, changed or gone are (re)indexed
+        :return:
+            dict with the number of policies added, updated and removed
+        """
+        stats = {'added': 0, 'updated': 0, 'removed': 0}
+        seen = set()
+        for policy in policies:
+            if not isinstance(policy, dict) or len(policy) != 1:
+                continue
+            pid = policy_id(policy)
+            seen.add(pid)
+            current = self._policies.get(pid)
+            if current is not None:
+                if current == policy:
+                    continue
+                self.__remove(pid)
+                stats['updated'] += 1
+            else:
+                stats['added'] += 1
+            self.__add(pid, policy)
+
+        for pid in [pid for pid in self._policies if pid not in seen]:
+            self.__remove(pid)
+            stats['removed'] += 1
+        self.last_refresh = time.time()
+        return stats
+
+    def types(self)->list:
+        return list(self._by_type)
+
+    def get(self, policy_id:str)->dict:
+        """
+        Policy by id (None if unknown)
+        """
+        return self._policies.get(policy_id)
+
+    def by_type(self, policy_type:str)->list:
+        """
+        Every policy of a type (operator, cluster, table ...)
+        """
+        return list(self._by_type.get(policy_type, {}).values())
+
+    def find(self, policy_type:str=None, **where)->list:
+        """
+        Policies matching every condition - values are compared case-insensitively; the first indexed key is looked
+        up in O(1), the other conditions filter that (small) set
+            cache.find('operator', company='anylog', cluster='9b12...')
+        :args:
+            policy_type:str - policy type (None for any type)
+            where - attribute = value conditions
+        :return:
+            list of policies
+        """
+        indexed = [key for key in where if key in self.keys]
+        if indexed:
+            candidates = self._by_key.get((indexed[0], _normalize(where[indexed[0]])), {})
+        elif policy_type is not None:
+            candidates = self._by_type.get(policy_type, {})
+        else:
+            candidates = self._policies
+
+        output = []
+        for policy in list(candidates.values()):
+            current_type = next(iter(policy))
+            if policy_type is not None and current_type != policy_type:
+                continue
+            body = policy[current_type] if isinstance(policy[current_type], dict) else {}
+            if all(key in body and _normalize(value) in _index_values(body[key]) for key, value in where.items()):
+                output.append(policy)
+        return output
+
+
+class PolicyCache(_PolicyIndex):
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, refresh_interval:float=60,
+                 destination:str=None, keys:tuple=INDEX_KEYS):
+        """
+        Client side copy of the blockchain (metadata) policies, indexed by id, type and common keys (name, ip,
+        company, table, cluster) so lookups are O(1) and never touch the network
+            cache = PolicyCache(anylog_conn, refresh_interval=30).start()
+            operators = cache.find('operator', cluster=cluster_id)
+        The ledger is pulled once (`blockchain get *`), then refreshed in a daemon thread every refresh_interval
+        seconds or on demand with refresh(). AnyLog has no "changes since" query, so a refresh re-reads the ledger,
+        but only policies that are new, changed or gone are re-indexed.
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            refresh_interval:float - seconds between refreshes of the background thread
+            destination:str - Remote connection to execute against
+            keys:tuple - policy attributes to index
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        super().__init__(keys=keys)
+        self.anylog_conn = anylog_conn
+        self.refresh_interval = refresh_interval
+        self.destination = destination
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def stale(self)->bool:
+        return self.last_refresh is None or time.time() - self.last_refresh >= self.refresh_interval
+
+    def refresh(self)->dict:
+        """
+        Pull the ledger now and apply the changes
+        :return:
+            dict with the number of policies added, updated and removed
+        """
+        response = self.anylog_conn.get(command='blockchain get *', destination=self.destination, as_response=True,
+                                        use_cache=False)  # the response cache would hand back the previous pull
+        policies = response.json()
+        with self.__lock:
+            return self._update(policies if isinstance(policies, list) else [policies])
+
+    def __run(self):
+        while not self.__stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                pass  # keep serving the last good copy, retry on the next interval
+
+    def start(self):
+        """
+        Pull the ledger (if never pulled), then keep it fresh in a daemon thread
+        """
+        if self.last_refresh is None:
+            self.refresh()
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__thread = threading.Thread(target=self.__run, name='anylog-policy-cache', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
@@ -0,0 +1,229 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import calendar
+import collections
+import concurrent.futures
+import datetime
+import functools
+import heapq
+import re
+
+import anylog_api.anylog_connector as anylog_connector
+
+# period(time-interval, units, date-time, date-column [, filter]) - date-time may be now() or a quoted timestamp
+PERIOD_PATTERN = re.compile(r"period\s*\(\s*(?P<unit>[a-z]+)\s*,\s*(?P<count>\d+(?:\.\d+)?)\s*,\s*"
+                            r"(?P<date>now\s*\(\s*\)|'[^']*'|\"[^\"]*\")\s*,\s*(?P<column>[\w.]+)\s*\)", re.IGNORECASE)
+# results of these cannot be rebuilt by concatenating the results of sub-ranges
+AGGREGATE_PATTERN = re.compile(r'\b(count|sum|avg|min|max|increments|distinct)\s*\(|\bgroup\s+by\b|\bdistinct\b',
+                               re.IGNORECASE)
+ORDER_PATTERN = re.compile(r'\border\s+by\s+(?P<columns>[\w.]+(?:\s+(?:asc|desc))?'
+                           r'(?:\s*,\s*[\w.]+(?:\s+(?:asc|desc))?)*)', re.IGNORECASE)
+LIMIT_PATTERN = re.compile(r'\blimit\s+(?P<limit>\d+)', re.IGNORECASE)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+UNITS = {
+    'second': datetime.timedelta(seconds=1),
+    'minute': datetime.timedelta(minutes=1),
+    'hour': datetime.timedelta(hours=1),
+    'day': datetime.timedelta(days=1),
+    'week': datetime.timedelta(weeks=1)
+}
+CALENDAR_UNITS = {'month': 1, 'year': 12}  # unit -> months
+
+PeriodRange = collections.namedtuple('PeriodRange', ['start', 'end', 'column', 'span'])
+
+
+def __parse_date(value:str, now:datetime.datetime)->datetime.datetime:
+    value = value.strip()
+    if value.lower().replace(' ', '').startswith('now('):
+        return now
+    value = value.strip('\'"').strip()
+    for date_format in (TIMESTAMP_FORMAT, '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                        '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f'Unsupported period() date-time {value}')
+
+
+def __subtract(end:datetime.datetime, unit:str, count:float)->datetime.datetime:
+    unit = unit.lower().rstrip('s')
+    if unit in UNITS:
+        return end - UNITS[unit] * count
+    if unit in CALENDAR_UNITS:
+        if int(count) != count:
+            raise ValueError(f'period() units for {unit} must be an integer')
+        year, month = divmod(end.year * 12 + end.month - 1 - int(count) * CALENDAR_UNITS[unit], 12)
+        return end.replace(year=year, month=month + 1, day=min(end.day, calendar.monthrange(year, month + 1)[1]))
+    raise ValueError(f'Invalid period() time-interval {unit}')
+
+
+def parse_period(command:str, now:datetime.datetime=None)->PeriodRange:
+    """
+    Extract the time range of a query's period() condition
+    :args:
+        command:str - sql command
+        now:datetime.datetime - value of now() (defaults to the current UTC time)
+    :return:
+        PeriodRange (start, end, column, span of the period() call within the command), None if there is none
+    """
+    match = PERIOD_PATTERN.search(command)
+    if match is None:
+        return None
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    end = __parse_date(match.group('date'), now=now)
+    start = __subtract(end, unit=match.group('unit'), count=float(match.group('count')))
+    return PeriodRange(start=start, end=end, column=match.group('column'), span=match.span())
+
+
+def split_ranges(start:datetime.datetime, end:datetime.datetime, parts:int)->list:
+    """
+    Split [start, end] into parts consecutive sub-ranges of (about) equal length
+    :return:
+        list of (start, end)
+    """
+    parts = max(int(parts), 1)
+    step = (end - start) / parts
+    bounds = [start + step * index for index in range(parts)] + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_order(command:str)->list:
+    """
+    Columns of a query's order by clause
+    :return:
+        list of (column, descending) - column without its table prefix, lower case
+    """
+    match = ORDER_PATTERN.search(command)
+    if match is None:
+        return []
+    order = []
+    for entry in match.group('columns').split(','):
+        words = entry.split()
+        order.append((words[0].rsplit('.', 1)[-1].lower(), len(words) > 1 and words[1].lower() == 'desc'))
+    return order
+
+
+def build_sub_queries(command:str, parts:int=4, now:datetime.datetime=None)->list:
+    """
+    Rewrite a period() query into parts queries over consecutive, non-overlapping sub-ranges
+        period(day, 30, now(), timestamp) -> (timestamp >= '...' and timestamp < '...')
+    The last sub-range includes its upper bound.
+    Note the sub-queries cover the fixed range [date-time - interval, date-time]. AnyLog's period() instead
+    anchors the interval on the latest reading at or before date-time, so when no data arrived recently the split
+    query returns fewer (older) rows than the original - pass an explicit date-time close to the latest reading
+    when that matters.
+    :args:
+        command:str - sql command with a period() condition
+        parts:int - number of sub-ranges
+        now:datetime.datetime - value of now() (defaults to the current UTC time)
+    :raise:
+        ValueError if the query has no period() condition or its results cannot be rebuilt from sub-ranges
+        (aggregates, group by, distinct)
+    :return:
+        list of sql commands, in time order
+    """
+    period = parse_period(command, now=now)
+    if period is None:
+        raise ValueError('Query has no period() condition to split')
+    if AGGREGATE_PATTERN.search(command):
+        raise ValueError('Aggregate / group by / distinct queries cannot be split into sub-ranges')
+
+    sub_queries = []
+    ranges = split_ranges(period.start, period.end, parts=parts)
+    for index, (start, end) in enumerate(ranges):
+        upper = '<=' if index == len(ranges) - 1 else '<'
+        condition = (f"({period.column} >= '{start.strftime(TIMESTAMP_FORMAT)}' and "
+                     f"{period.column} {upper} '{end.strftime(TIMESTAMP_FORMAT)}')")
+        sub_queries.append(command[:period.span[0]] + condition + command[period.span[1]:])
+    return sub_queries
+
+
+def __compare(order:list, left:tuple, right:tuple)->int:
+    """
+    Compare the order by values of two rows - NULLs sort last in ascending and first in descending order
+    """
+    for (_, descending), left_value, right_value in zip(order, left, right):
+        if left_value == right_value:
+            continue
+        if left_value is None or right_value is None:
+            result = 1 if left_value is None else -1
+        else:
+            result = 1 if left_value > right_value else -1
+        return -result if descending else result
+    return 0
+
+
+def __order_key(order:list):
+    compare = functools.cmp_to_key(functools.partial(__compare, order))
+
+    def key(row:dict):
+        values = {str(name).rsplit('.', 1)[-1].lower(): value for name, value in row.items()}
+        missing = [column for column, _ in order if column not in values]
+        if missing:
+            raise ValueError(f'Cannot merge sub-query results ordered by {", ".join(missing)} - '
+                             'the order by columns must be part of the result')
+        return compare(tuple(values[column] for column, _ in order))
+    return key
+
+
+def merge_results(command:str, results:list)->list:
+    """
+    Combine the rows of the sub-queries (given in time order) into the rows of the original query, then cut them
+    to the query's limit
+        - no order by, or ordered by the period() column first: sub-ranges follow each other in that order, so the
+          results are concatenated (in reverse for descending order)
+        - ordered by any other column: every sub-query's rows are already sorted, so they are merged (k-way) on the
+          order by columns - these must be part of the result
+    :raise:
+        ValueError if the rows lack an order by column
+    """
+    order = parse_order(command)
+    period = parse_period(command)
+    if not order or (period is not None and order[0][0] == period.column.rsplit('.', 1)[-1].lower()):
+        if order and order[0][1]:
+            results = results[::-1]
+        rows = [row for result in results for row in result]
+    else:
+        rows = list(heapq.merge(*results, key=__order_key(order)))
+
+    limit = LIMIT_PATTERN.search(command)
+    if limit is not None:
+        rows = rows[:int(limit.group('limit'))]
+    return rows
+
+
+def query_split(anylog_conn:anylog_connector.AnyLogConnector, command:str, destination:str='network', parts:int=4,
+                max_workers:int=4, now:datetime.datetime=None)->list:
+    """
+    Execute a long period() query as parts sub-queries over consecutive time ranges, at most max_workers at a
+    time, and combine their rows in the query's order (see merge_results). The range is fixed to
+    [date-time - interval, date-time] rather than anchored on the latest reading as period() is - see
+    build_sub_queries.
+        rows = query_split(anylog_conn, "sql test format=json select timestamp, value from rand_data where
+                                         period(day, 30, now(), timestamp) order by timestamp", parts=8)
+    :args:
+        anylog_conn:AnyLogConnector - connection to AnyLog
+        command:str - sql command (format=json) with a period() condition
+        destination:str - Remote connection to execute against
+        parts:int - number of sub-queries
+        max_workers:int - maximum number of sub-queries in flight
+        now:datetime.datetime - value of now() (defaults to the current UTC time)
+    :return:
+        list of rows
+    """
+    anylog_connector.validate_type(anylog_conn=anylog_conn)
+    sub_queries = build_sub_queries(command, parts=parts, now=now)
+
+    def execute(sub_query:str)->list:
+        return anylog_conn.get(command=sub_query, destination=destination, as_response=True).rows()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(min(max_workers, len(sub_queries)), 1),
+                                               thread_name_prefix='anylog-query-split') as executor:
+        results = list(executor.map(execute, sub_queries))
+    return merge_results(command, results)
@@ -0,0 +1,102 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+from anylog_api.codec import get_codec
+
+_UNSET = object()
+
+
+class AnyLogResponse:
+    def __init__(self, content:bytes, status:int=200, headers:dict=None, codec=None):
+        """
+        Result of a GET request, kept as raw bytes - text / JSON are only decoded when first accessed, and then
+        memoized, so a body is decoded at most once however many times (or ways) it is read
+            response = anylog_conn.get(command=sql_cmd, as_response=True)
+            for row in response.rows(): ...
+        :args:
+            content:bytes - response body
+            status:int - HTTP status
+            headers:dict - response headers
+            codec - JSON codec used to decode the body
+        """
+        self.content = content
+        self.status = status
+        self.headers = headers if headers is not None else {}
+        self.codec = get_codec(codec)
+        self.__text = None
+        self.__json = _UNSET
+
+    def __repr__(self):
+        return f'<AnyLogResponse [{self.status}] {len(self.content)} bytes>'
+
+    def __len__(self):
+        return len(self.content)
+
+    @property
+    def ok(self)->bool:
+        return 200 <= self.status <= 299
+
+    @property
+    def encoding(self)->str:
+        """
+        Charset declared in Content-Type (utf-8 when missing)
+        """
+        content_type = self.headers.get('Content-Type') or ''
+        for param in content_type.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'charset' and value:
+                return value.strip('"\'')
+        return 'utf-8'
+
+    @property
+    def text(self)->str:
+        if self.__text is None:
+            try:
+                self.__text = self.content.decode(self.encoding, errors='replace')
+            except LookupError:  # unknown charset
+                self.__text = self.content.decode('utf-8', errors='replace')
+        return self.__text
+
+    def json(self):
+        """
+        Body decoded as JSON
+        :raise:
+            ValueError if the body is not valid JSON (the failure is memoized as well)
+        """
+        if self.__json is _UNSET:
+            try:
+                self.__json = self.codec.loads(self.content)
+            except ValueError as error:
+                self.__json = error
+        if isinstance(self.__json, ValueError):
+            raise self.__json
+        return self.__json
+
+    def value(self):
+        """
+        Body as JSON if it is valid JSON, else as text - what AnyLogConnector.get returns by default
+        """
+        try:
+            return self.json()
+        except ValueError:
+            return self.text
+
+    def rows(self, rows_key:str='Query')->list:
+        """
+        Rows of a `sql ... format=json` result
+            - {"Query": [{...}, {...}], "Statistics": [...]} -> rows of "Query"
+            - [{...}, {...}] -> the list itself
+        :args:
+            rows_key:str - key holding the list of rows
+        :return:
+            list of rows (empty if the body holds none)
+        """
+        try:
+            output = self.json()
+        except ValueError:
+            return []
+        if isinstance(output, dict):
+            output = output.get(rows_key)
+        return output if isinstance(output, list) else []
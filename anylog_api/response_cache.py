@@ -0,0 +1,132 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import collections
+import fnmatch
+import re
+import threading
+import time
+
+# read-only commands cached by default (glob pattern -> seconds)
+DEFAULT_TTLS = {
+    'get status*': 5,
+    'get processes*': 5,
+    'get connections*': 5,
+    'test node*': 5,
+    'blockchain get *': 30
+}
+
+
+class ResponseCache:
+    def __init__(self, max_size:int=256, ttls:dict=None, default_ttl:float=None):
+        """
+        In-memory TTL + LRU cache for read-only GET commands, keyed on (command, destination). Only commands
+        matching one of the patterns in ttls (or every command, if default_ttl is set) are cached.
+        :note:
+            cached results are returned as-is (not copied) and should be treated as read-only
+        :args:
+            max_size:int - maximum number of cached responses, least recently used are evicted first
+            ttls:dict - glob pattern (case-insensitive) to time-to-live in seconds, first match wins
+            default_ttl:float - time-to-live for commands that match no pattern (None to not cache them)
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.__patterns = [(re.compile(fnmatch.translate(pattern.lower())), ttl) for pattern, ttl in self.ttls.items()]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def ttl_for(self, command:str)->float:
+        """
+        Time-to-live for command
+        :return:
+            seconds, or None if the command should not be cached
+        """
+        command = command.strip().lower()
+        for pattern, ttl in self.__patterns:
+            if pattern.match(command):
+                return ttl
+        return self.default_ttl
+
+    def get(self, command:str, destination:str=None):
+        """
+        Look up a cached response
+        :args:
+            command:str - command executed
+            destination:str - remote connection the command was executed against
+        :return:
+            cached response, None if missing / expired / not cacheable
+        """
+        if self.ttl_for(command) is None:
+            return None
+
+        key = (command.strip(), destination)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.__entries[key]
+            self.misses += 1
+        return None
+
+    def set(self, command:str, destination:str, value):
+        """
+        Store a response (ignored if the command is not cacheable or the value is None)
+        :args:
+            command:str - command executed
+            destination:str - remote connection the command was executed against
+            value - response to cache
+        """
+        ttl = self.ttl_for(command)
+        if ttl is None or ttl <= 0 or value is None:
+            return
+
+        key = (command.strip(), destination)
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, command:str=None, destination:str=None)->int:
+        """
+        Drop cached responses
+        :args:
+            command:str - command or glob pattern (case-insensitive) to drop, None for all commands
+            destination:str - only drop responses for this destination
+        :return:
+            number of entries removed
+        """
+        pattern = re.compile(fnmatch.translate(command.strip().lower())) if command else None
+        with self.__lock:
+            keys = [key for key in self.__entries
+                    if (pattern is None or pattern.match(key[0].lower()))
+                    and (destination is None or key[1] == destination)]
+            for key in keys:
+                del self.__entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self)->dict:
+        return {
+            'size': len(self.__entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,37 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import collections
+
+
+class NodeResult(collections.namedtuple('NodeResult', ['conn', 'result', 'error', 'latency'])):
+    """
+    Outcome of a command executed against a single node
+        conn:str - REST connection info of the node
+        result - value returned by the command (None on failure)
+        error:Exception - exception raised by the command (None on success)
+        latency:float - seconds taken by the command
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self)->bool:
+        return self.error is None
+
+
+class CommandResult(collections.namedtuple('CommandResult', ['index', 'command', 'result', 'error', 'latency'])):
+    """
+    Outcome of a single command of a batch (see AnyLogConnector.get_many)
+        index:int - position of the command in the batch
+        command:str - command executed
+        result - value returned by the command (None on failure)
+        error:Exception - exception raised by the command (None on success)
+        latency:float - seconds taken by the command
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self)->bool:
+        return self.error is None
@@ -0,0 +1,172 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import datetime
+import email.utils
+import random
+import threading
+import time
+
+RETRY_STATUSES = (429, 502, 503, 504)
+UNPROCESSED_STATUSES = (429, 503)  # the node rejected the request before processing it
+
+
+def parse_retry_after(value)->float:
+    """
+    Convert a Retry-After header into seconds
+    :args:
+        value:str - either a number of seconds or an HTTP date
+    :return:
+        seconds to wait, None if the header is missing / invalid
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    def __init__(self, max_retries:int=3, backoff_factor:float=0.5, max_backoff:float=30, jitter:bool=True,
+                 retry_statuses:tuple=RETRY_STATUSES, retry_methods:tuple=('GET',),
+                 respect_retry_after:bool=True):
+        """
+        When and how long to wait before re-sending a failed request
+            - methods in retry_methods (GET by default) are retried after connection errors / timeouts and
+              statuses in retry_statuses
+            - other methods (PUT / POST - not idempotent, re-sending a processed batch duplicates its rows) are only
+              retried when the node cannot have processed the request: the connection could not be established, or
+              the node replied 429 / 503
+            - the n-th retry waits backoff_factor * 2^n seconds (capped at max_backoff), randomized with full jitter
+            - a Retry-After header from the node takes precedence over the computed backoff
+        :args:
+            max_retries:int - number of retries after the initial attempt
+            backoff_factor:float - base delay in seconds
+            max_backoff:float - maximum delay in seconds
+            jitter:bool - randomize delays (0 - computed backoff) to avoid synchronized retries
+            retry_statuses:tuple - HTTP statuses that are retried
+            retry_methods:tuple - HTTP methods that are retried after any retryable failure
+            respect_retry_after:bool - honour the Retry-After header
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = tuple(retry_statuses)
+        self.retry_methods = tuple(method.upper() for method in retry_methods)
+        self.respect_retry_after = respect_retry_after
+
+    def should_retry(self, method:str, attempt:int, status:int=None, sent:bool=True)->bool:
+        """
+        Whether a failed request should be re-sent
+        :args:
+            method:str - HTTP method
+            attempt:int - number of retries already done
+            status:int - HTTP status (None for connection errors / timeouts)
+            sent:bool - whether the request may have reached the node (False if the connection was never made)
+        """
+        if attempt >= self.max_retries:
+            return False
+        if method.upper() not in self.retry_methods:
+            if status is None:
+                return not sent
+            return status in UNPROCESSED_STATUSES and status in self.retry_statuses
+        return status is None or status in self.retry_statuses
+
+    def backoff(self, attempt:int, retry_after=None)->float:
+        """
+        Seconds to wait before the next retry
+        :args:
+            attempt:int - number of retries already done
+            retry_after:str - Retry-After header of the failed response
+        """
+        if self.respect_retry_after:
+            delay = parse_retry_after(retry_after)
+            if delay is not None:
+                return min(delay, self.max_backoff)
+
+        delay = min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold:int=5, recovery_timeout:float=30, half_open_max_calls:int=1):
+        """
+        Fail fast while a node is down
+            - closed: requests flow, consecutive failures are counted
+            - open: after failure_threshold consecutive failures, requests are rejected without touching the network
+            - half-open: once recovery_timeout seconds have passed, up to half_open_max_calls probe requests are let
+              through - a success closes the circuit, a failure opens it again
+        :args:
+            failure_threshold:int - consecutive failures that open the circuit
+            recovery_timeout:float - seconds to wait before probing an open circuit
+            half_open_max_calls:int - number of concurrent probes allowed while half-open
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.failures = 0
+        self.opened_at = None
+        self.__state = self.CLOSED
+        self.__probes = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self)->str:
+        with self.__lock:
+            if self.__state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self.__state
+
+    def allow_request(self)->bool:
+        """
+        Whether a request may be sent now
+        """
+        with self.__lock:
+            if self.__state == self.CLOSED:
+                return True
+            if self.__state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                self.__state = self.HALF_OPEN
+                self.__probes = 0
+            if self.__probes < self.half_open_max_calls:
+                self.__probes += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self.__lock:
+            self.failures = 0
+            self.__probes = 0
+            self.__state = self.CLOSED
+
+    def record_failure(self):
+        with self.__lock:
+            self.failures += 1
+            if self.__state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.__state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.__probes = 0
+
+    def reset(self):
+        self.record_success()
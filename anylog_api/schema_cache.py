@@ -0,0 +1,289 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import datetime
+import threading
+import time
+
+from anylog_api.exceptions import AnyLogValidationError, is_client_error
+
+STRICTNESS = ('strict', 'drop', 'coerce')
+MAX_REPORTED_ERRORS = 20
+
+# column type (as reported by `get columns`) -> family, matched on the type's leading word
+TYPE_FAMILIES = {
+    'int': 'int', 'integer': 'int', 'bigint': 'int', 'smallint': 'int', 'serial': 'int', 'bigserial': 'int',
+    'float': 'float', 'real': 'float', 'double': 'float', 'decimal': 'float', 'numeric': 'float',
+    'bool': 'bool', 'boolean': 'bool',
+    'timestamp': 'timestamp', 'date': 'timestamp', 'time': 'timestamp',
+    'char': 'str', 'character': 'str', 'varchar': 'str', 'text': 'str', 'uuid': 'str', 'string': 'str'
+}
+# family -> python types accepted as-is (None is always accepted - the column is left null)
+ACCEPTED_TYPES = {
+    'int': {int, type(None)},
+    'float': {float, int, type(None)},
+    'bool': {bool, type(None)},
+    'timestamp': {str, type(None)},
+    'str': {str, type(None)}
+}
+
+
+def type_family(column_type:str)->str:
+    """
+    Family (int, float, bool, timestamp, str) of a column type, None for types that are not validated
+    """
+    words = str(column_type).strip().lower().replace('(', ' ').split()
+    return TYPE_FAMILIES.get(words[0]) if words else None
+
+
+def __to_int(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise ValueError
+
+
+def __to_float(value):
+    if isinstance(value, str):
+        return float(value.strip())
+    if isinstance(value, bool):
+        return float(value)
+    raise ValueError
+
+
+def __to_bool(value):
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false', '1', '0', 't', 'f'):
+        return value.strip().lower() in ('true', '1', 't')
+    raise ValueError
+
+
+def __to_timestamp(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return str(value)
+    raise ValueError
+
+
+def __to_str(value):
+    if isinstance(value, (int, float, bool, datetime.datetime, datetime.date, datetime.time)):
+        return str(value)
+    raise ValueError
+
+
+COERCE = {'int': __to_int, 'float': __to_float, 'bool': __to_bool, 'timestamp': __to_timestamp, 'str': __to_str}
+
+
+class TableSchema:
+    def __init__(self, columns:dict):
+        """
+        Columns of a table
+        :args:
+            columns:dict - column name -> column type (as reported by `get columns`)
+        """
+        self.columns = {str(name).lower(): column_type for name, column_type in columns.items()}
+        self.families = {name: type_family(column_type) for name, column_type in self.columns.items()}
+
+    def __repr__(self):
+        return f'TableSchema({self.columns})'
+
+    def validate(self, rows:list, strictness:str='strict'):
+        """
+        Check rows against the schema, one column at a time: the types present in a column are collected first,
+        and rows are only looked at individually when a column holds a type that does not fit
+            strict - any bad value / unknown column is an error
+            drop - rows with a bad value / unknown column are removed
+            coerce - values are converted to the column type, unknown columns removed, rows that cannot be
+                     converted are removed
+        Rows are never modified - a row that needs changes is copied.
+        :args:
+            rows:list - rows (dict) to check
+            strictness:str - strict || drop || coerce
+        :return:
+            (rows to send, errors, number of rows converted) - errors is a list of (row index, column, reason)
+        """
+        errors = []
+        bad = set()
+        changes = {}  # row index -> {key: new value, or ... to remove the key}
+
+        keys = set().union(*rows) if rows else set()
+        for key in keys:
+            column = str(key).lower()
+            if column not in self.families:
+                for index, row in enumerate(rows):
+                    if key in row:
+                        if strictness == 'coerce':
+                            changes.setdefault(index, {})[key] = ...
+                        else:
+                            errors.append((index, key, 'unknown column'))
+                            bad.add(index)
+                continue
+
+            family = self.families[column]
+            if family is None:
+                continue
+            values = [row.get(key) for row in rows]
+            accepted = ACCEPTED_TYPES[family]
+            if set(map(type, values)) <= accepted:
+                continue
+            for index, value in enumerate(values):
+                if type(value) in accepted:
+                    continue
+                if strictness == 'coerce':
+                    try:
+                        changes.setdefault(index, {})[key] = COERCE[family](value)
+                        continue
+                    except (ValueError, TypeError):
+                        pass
+                errors.append((index, key, f'{type(value).__name__} value {value!r} is not {self.columns[column]}'))
+                bad.add(index)
+
+        errors.sort(key=lambda error: error[0])
+        if strictness == 'strict' or not (bad or changes):
+            return rows, errors, 0
+
+        output = []
+        for index, row in enumerate(rows):
+            if index in bad:
+                continue
+            if index in changes:
+                row = dict(row)
+                for key, value in changes[index].items():
+                    if value is ...:
+                        del row[key]
+                    else:
+                        row[key] = value
+            output.append(row)
+        return output, errors, len(changes.keys() - bad)
+
+
+def rows_from_payload(codec, payload)->list:
+    """
+    Rows of a PUT payload - list of dict, a single dict or serialized JSON
+    """
+    if isinstance(payload, (str, bytes, bytearray, memoryview)):
+        payload = codec.loads(bytes(payload) if isinstance(payload, memoryview) else payload)
+    return [payload] if isinstance(payload, dict) else list(payload)
+
+
+def parse_columns(output)->TableSchema:
+    """
+    Schema from the result of `get columns ... format=json` - {column: type} or a list of {column, type} entries;
+    None if the table does not exist (yet)
+    """
+    if isinstance(output, list):
+        columns = {}
+        for entry in output:
+            if isinstance(entry, dict):
+                name = entry.get('column_name', entry.get('column', entry.get('name')))
+                if name is not None:
+                    columns[name] = entry.get('column_type', entry.get('type', entry.get('data_type')))
+        output = columns
+    if not isinstance(output, dict) or not output or 'err_code' in output:
+        return None
+    return TableSchema(output)
+
+
+class _SchemaCache:
+    def __init__(self, ttl:float=300, strictness:str='strict'):
+        if strictness not in STRICTNESS:
+            raise ValueError(f'Invalid strictness option {strictness}. Valid options: {", ".join(STRICTNESS)}')
+        self.ttl = ttl
+        self.strictness = strictness
+        self.rows_rejected = 0
+        self.rows_coerced = 0
+        self._schemas = {}  # (dbms, table) -> (expires, TableSchema or None)
+
+    @staticmethod
+    def _columns_command(dbms:str, table:str)->str:
+        return f'get columns where dbms={dbms} and table={table} and format=json'
+
+    def _cached(self, dbms:str, table:str):
+        entry = self._schemas.get((dbms.lower(), table.lower()))
+        if entry is not None and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def _store(self, dbms:str, table:str, schema:TableSchema):
+        self._schemas[(dbms.lower(), table.lower())] = (time.monotonic() + self.ttl, schema)
+
+    def invalidate(self, dbms:str=None, table:str=None):
+        """
+        Forget cached schemas - a single table, every table of dbms, or (default) everything
+        """
+        for key in list(self._schemas):
+            if (dbms is None or key[0] == dbms.lower()) and (table is None or key[1] == table.lower()):
+                self._schemas.pop(key, None)
+
+    def _check(self, schema:TableSchema, dbms:str, table:str, codec, payload):
+        """
+        Validate a payload against a schema - payload is returned as-is when it needs no change
+        """
+        if schema is None:  # table not created yet - AnyLog creates it from the first rows
+            return payload
+        rows = rows_from_payload(codec, payload)
+        output, errors, coerced = schema.validate(rows, strictness=self.strictness)
+        if errors and self.strictness == 'strict':
+            self.rows_rejected += len({index for index, _, _ in errors})
+            details = '; '.join(f'row {index} column {column}: {reason}'
+                                for index, column, reason in errors[:MAX_REPORTED_ERRORS])
+            raise AnyLogValidationError(f'{len(errors)} invalid value(s) for {dbms}.{table} - {details}',
+                                        errors=errors, dbms=dbms, table=table)
+        self.rows_rejected += len(rows) - len(output)
+        self.rows_coerced += coerced
+        return payload if output is rows else output
+
+
+class SchemaCache(_SchemaCache):
+    def __init__(self, ttl:float=300, strictness:str='strict'):
+        """
+        Column types of the tables data is PUT into (`get columns where dbms=.. and table=..`), fetched once per
+        table per ttl, used to check rows before they are sent
+            schema_cache = SchemaCache(ttl=600, strictness='coerce')
+            anylog_conn = AnyLogConnector(conn, schema_cache=schema_cache)
+        :args:
+            ttl:float - seconds a table's schema is reused before being fetched again
+            strictness:str - strict (raise AnyLogValidationError) || drop (remove bad rows) ||
+                             coerce (convert values to the column type, remove the rows that cannot be)
+        """
+        super().__init__(ttl=ttl, strictness=strictness)
+        self.__lock = threading.Lock()
+
+    def schema(self, anylog_conn, dbms:str, table:str)->TableSchema:
+        """
+        Schema of a table, None if the table does not exist (yet)
+        """
+        found, schema = self._cached(dbms, table)
+        if found:
+            return schema
+        with self.__lock:  # one lookup per table, even with many writer threads
+            found, schema = self._cached(dbms, table)
+            if not found:
+                try:
+                    output = anylog_conn.get(command=self._columns_command(dbms, table), as_response=True).value()
+                except Exception as error:
+                    if not is_client_error(error):
+                        raise
+                    output = None
+                schema = parse_columns(output)
+                self._store(dbms, table, schema)
+        return schema
+
+    def validate(self, anylog_conn, dbms:str, table:str, payload):
+        """
+        Check a PUT payload against the table's schema
+        :args:
+            anylog_conn:AnyLogConnector - connection used to fetch the schema (and decode serialized payloads)
+            dbms:str - logical database name
+            table:str - table the rows are stored in
+            payload - list / dict of rows or serialized JSON
+        :raise:
+            AnyLogValidationError if strictness is strict and a row does not fit the schema
+        :return:
+            payload to send (the original payload when it needs no change, else a list of rows)
+        """
+        return self._check(self.schema(anylog_conn, dbms, table), dbms=dbms, table=table, codec=anylog_conn.codec,
+                           payload=payload)
@@ -0,0 +1,365 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.codec import encode_payload, get_codec
+from anylog_api.exceptions import (AnyLogConnectionError, AnyLogServerError, AnyLogSpoolFullError, AnyLogTimeout,
+                                   is_client_error)
+
+# frame: metadata length, payload length, crc32 of metadata + payload - followed by the metadata (JSON) and payload
+FRAME_HEADER = struct.Struct('>III')
+SEGMENT_SUFFIX = '.spool'
+OFFSET_SUFFIX = '.offset'
+CORRUPT_SUFFIX = '.corrupt'
+ON_FULL = ['raise', 'drop_oldest']
+# failures that mean the node (not the request) is the problem - the data is spooled for later
+SPOOL_ERRORS = (AnyLogConnectionError, AnyLogTimeout, AnyLogServerError)
+
+logger = logging.getLogger(__name__)
+
+
+def _coalescible(metadata:bytes, payload:bytes)->bool:
+    """
+    Whether a frame may be merged with its neighbours - only data: PUT rows, or POST rows for a message client topic
+    (`command=data`). Any other POST (e.g. `blockchain insert`) is a single command and replayed as-is.
+    """
+    if not ((payload[:1] == b'[' and payload[-1:] == b']') or (payload[:1] == b'{' and payload[-1:] == b'}')):
+        return False
+    metadata = json.loads(metadata)
+    return metadata['method'] == 'put' or str(metadata.get('command')).strip().lower() == 'data'
+
+
+class DiskSpool:
+    def __init__(self, path:str, segment_size:int=67108864, max_bytes:int=1073741824, on_full:str='raise',
+                 fsync:bool=False, codec=None):
+        """
+        Write-ahead spool for PUT / POST payloads that could not be delivered. Frames are appended to segment files
+        (rotated at segment_size) in path; replay() memory-maps the segments oldest first, merges consecutive
+        data frames for the same table / topic into bulk requests and deletes each segment once it was delivered.
+        Progress within a segment is recorded in a side file, so an interrupted replay resumes where it stopped.
+        Frames that fail their CRC check (and a torn tail left by a crash) are moved to a `.corrupt` file next to
+        the segment rather than sent, and the frames after them are still delivered.
+            spool = DiskSpool(path='/var/spool/anylog')
+            spool.put(anylog_conn, dbms='test', table='rand_data', payload=rows)  # spooled if the node is down
+            spool.replay(anylog_conn)  # once the node is back
+        :args:
+            path:str - directory holding the segments
+            segment_size:int - bytes after which a new segment is started
+            max_bytes:int - maximum size of the spool on disk
+            on_full:str - what to do when max_bytes is reached (raise || drop_oldest segment)
+            fsync:bool - fsync every frame (durable across power loss, much slower)
+            codec - JSON codec used to serialize list / dict payloads
+        """
+        if on_full not in ON_FULL:
+            raise ValueError(f'Invalid on_full option {on_full}. Valid options: {", ".join(ON_FULL)}')
+
+        self.path = path
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.on_full = on_full
+        self.fsync = fsync
+        self.codec = get_codec(codec)
+
+        self.frames_spooled = 0
+        self.frames_replayed = 0
+        self.frames_rejected = 0
+        self.frames_corrupt = 0
+        self.bytes_dropped = 0
+        self.last_error = None
+
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self.__file = None
+        self.__sizes = {}
+        for name in os.listdir(path):
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+                self.__sizes[int(name[:-len(SEGMENT_SUFFIX)])] = os.path.getsize(os.path.join(path, name))
+        # never append to a segment left over from a previous run - it may end with a torn frame
+        self.__segment = max(self.__sizes, default=0) + 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.__close_segment()
+
+    @property
+    def size(self)->int:
+        """
+        bytes on disk (including frames of a partially replayed segment)
+        """
+        return sum(self.__sizes.values())
+
+    @property
+    def pending(self)->bool:
+        return any(self.__sizes.values())
+
+    def segments(self)->list:
+        return sorted(self.__sizes)
+
+    def _segment_path(self, segment:int)->str:
+        return os.path.join(self.path, f'{segment:016d}{SEGMENT_SUFFIX}')
+
+    def _offset_path(self, segment:int)->str:
+        return os.path.join(self.path, f'{segment:016d}{OFFSET_SUFFIX}')
+
+    def _corrupt_path(self, segment:int)->str:
+        return os.path.join(self.path, f'{segment:016d}{CORRUPT_SUFFIX}')
+
+    def __close_segment(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+            self.__segment += 1
+
+    def _remove_segment(self, segment:int):
+        for file_path in (self._segment_path(segment), self._offset_path(segment)):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        self.__sizes.pop(segment, None)
+
+    def __make_room(self, frame_size:int):
+        if frame_size > self.max_bytes:
+            raise ValueError(f'Frame of {frame_size} bytes is larger than the spool ({self.max_bytes} bytes)')
+        while self.size + frame_size > self.max_bytes:
+            if self.on_full != 'drop_oldest':
+                raise AnyLogSpoolFullError(f'Spool {self.path} is full ({self.size} of {self.max_bytes} bytes)')
+            oldest = min(self.__sizes)
+            if oldest == self.__segment:  # only the open segment is left - seal it so it can be dropped
+                self.__close_segment()
+            self.bytes_dropped += self.__sizes[oldest]
+            self._remove_segment(oldest)
+
+    def append(self, metadata:dict, payload)->int:
+        """
+        Append a single frame
+        :args:
+            metadata:dict - how to deliver the payload (see append_put / append_post)
+            payload - serialized JSON or a list / dict (encoded with the spool's codec)
+        :raise:
+            AnyLogSpoolFullError if the spool is full and on_full is raise
+        :return:
+            size of the frame in bytes
+        """
+        metadata = json.dumps(metadata, separators=(',', ':')).encode()
+        payload = encode_payload(self.codec, payload)
+        if payload is None:
+            payload = b''
+        elif isinstance(payload, str):
+            payload = payload.encode()
+        elif not isinstance(payload, bytes):
+            payload = bytes(payload)
+        frame = FRAME_HEADER.pack(len(metadata), len(payload), zlib.crc32(payload, zlib.crc32(metadata))) \
+            + metadata + payload
+
+        with self._lock:
+            self.__make_room(len(frame))
+            if self.__file is not None and self.__sizes[self.__segment] + len(frame) > self.segment_size:
+                self.__close_segment()
+            if self.__file is None:
+                self.__file = open(self._segment_path(self.__segment), 'ab')
+                self.__sizes[self.__segment] = self.__file.tell()
+            self.__file.write(frame)
+            self.__file.flush()
+            if self.fsync is True:
+                os.fsync(self.__file.fileno())
+            self.__sizes[self.__segment] += len(frame)
+            self.frames_spooled += 1
+        return len(frame)
+
+    def append_put(self, dbms:str, table:str, payload, mode:str='streaming')->int:
+        return self.append({'method': 'put', 'dbms': dbms, 'table': table, 'mode': mode}, payload)
+
+    def append_post(self, command:str, topic:str=None, destination:str=None, payload=None)->int:
+        return self.append({'method': 'post', 'command': command, 'topic': topic, 'destination': destination},
+                           payload)
+
+    def _sealed_segments(self)->list:
+        """
+        Seal the open segment (new frames go to a new one) and list every segment to replay, oldest first
+        """
+        with self._lock:
+            self.__close_segment()
+            return sorted(segment for segment in self.__sizes if segment < self.__segment)
+
+    def _read_offset(self, segment:int)->int:
+        try:
+            with open(self._offset_path(segment)) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _commit(self, segment:int, offset:int):
+        """
+        Record that every frame of segment before offset was delivered
+        """
+        tmp_path = self._offset_path(segment) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self._offset_path(segment))
+
+    def _quarantine(self, segment:int, data:bytes):
+        """
+        Keep unreadable bytes of a segment (frame failing its CRC check, torn tail) in its .corrupt file
+        """
+        with open(self._corrupt_path(segment), 'ab') as f:
+            f.write(data)
+        self.frames_corrupt += 1
+        logger.warning('Spool segment %s: %d unreadable bytes moved to %s', self._segment_path(segment), len(data),
+                       self._corrupt_path(segment))
+
+    def _batches(self, segment:int, max_batch_bytes:int):
+        """
+        Read the undelivered frames of a segment (memory-mapped) and merge consecutive data frames (PUT, POST
+        `command=data`) with the same metadata whose payloads are JSON lists / objects into a single list - any
+        other frame is its own request, with its original payload
+        :yield:
+            (metadata:dict, payload:bytes), number of frames merged, offset after the last merged frame - metadata
+            is None for unreadable bytes (payload), to be quarantined rather than sent
+        """
+        start = self._read_offset(segment)
+        with open(self._segment_path(segment), 'rb') as f:
+            if os.fstat(f.fileno()).st_size <= start:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = len(mm)
+                offset = start
+                current = None
+                parts = []
+                size = 0
+                frames = 0
+                while offset < end:
+                    header_end = offset + FRAME_HEADER.size
+                    frame_end = end + 1
+                    if header_end <= end:
+                        metadata_size, payload_size, crc = FRAME_HEADER.unpack_from(mm, offset)
+                        frame_end = header_end + metadata_size + payload_size
+                    if frame_end > end:  # torn frame (crash while writing) - nothing after it is readable
+                        frame_end = end
+                        metadata = None
+                    else:
+                        metadata = mm[header_end:header_end + metadata_size]
+                        payload = mm[header_end + metadata_size:frame_end]
+                        if zlib.crc32(payload, zlib.crc32(metadata)) != crc:  # the frames after it are still read
+                            metadata = None
+                    if metadata is None:
+                        if parts:
+                            yield self.__batch(current, parts), frames, offset
+                            parts, size, frames = [], 0, 0
+                        yield (None, mm[offset:frame_end]), 1, frame_end
+                        offset = frame_end
+                        continue
+
+                    if not _coalescible(metadata, payload):  # sent as-is, on its own
+                        if parts:
+                            yield self.__batch(current, parts), frames, offset
+                            parts, size, frames = [], 0, 0
+                        yield self.__batch(metadata, [payload]), 1, frame_end
+                    else:
+                        if parts and (metadata != current or size + payload_size > max_batch_bytes):
+                            yield self.__batch(current, parts), frames, offset
+                            parts, size, frames = [], 0, 0
+                        current = metadata
+                        parts.append(payload)
+                        size += payload_size
+                        frames += 1
+                    offset = frame_end
+
+                if parts:
+                    yield self.__batch(current, parts), frames, offset
+
+    @staticmethod
+    def __batch(metadata:bytes, parts:list)->tuple:
+        """
+        Request for frames read from a segment - a single frame keeps its original payload bytes
+        """
+        if len(parts) > 1:
+            elements = [part[1:-1].strip() if part[:1] == b'[' else part for part in parts]
+            payload = b'[' + b','.join(element for element in elements if element) + b']'
+        else:
+            payload = parts[0]
+        return json.loads(metadata), payload
+
+    def _deliver(self, anylog_conn:anylog_connector.AnyLogConnector, metadata:dict, payload:bytes):
+        if metadata['method'] == 'put':
+            return anylog_conn.put(dbms=metadata['dbms'], table=metadata['table'], payload=payload,
+                                   mode=metadata['mode'])
+        return anylog_conn.post(command=metadata['command'], topic=metadata['topic'],
+                                destination=metadata['destination'], payload=payload)
+
+    def replay(self, anylog_conn:anylog_connector.AnyLogConnector, max_batch_bytes:int=4194304)->int:
+        """
+        Deliver everything spooled so far, oldest first - stops (and raises) on the first failure; what was
+        delivered up to that point is not sent again. Batches the node rejects (4xx) are dropped rather than
+        blocking the spool forever (see frames_rejected / last_error), unreadable frames are quarantined (see
+        frames_corrupt). A segment is deleted once every frame in it was delivered, rejected or quarantined.
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            max_batch_bytes:int - maximum size of a merged request
+        :return:
+            number of frames delivered
+        """
+        anylog_connector.validate_type(anylog_conn=anylog_conn)
+        delivered = 0
+        for segment in self._sealed_segments():
+            for (metadata, payload), frames, offset in self._batches(segment, max_batch_bytes=max_batch_bytes):
+                if metadata is None:
+                    self._quarantine(segment, payload)
+                    self._commit(segment, offset)
+                    continue
+                try:
+                    self._deliver(anylog_conn, metadata, payload)
+                except Exception as error:
+                    if not is_client_error(error):
+                        raise
+                    self.frames_rejected += frames
+                    self.last_error = error
+                else:
+                    delivered += frames
+                    self.frames_replayed += frames
+                self._commit(segment, offset)
+            with self._lock:
+                self._remove_segment(segment)
+        return delivered
+
+    def put(self, anylog_conn:anylog_connector.AnyLogConnector, dbms:str, table:str, payload,
+            mode:str='streaming')->bool:
+        """
+        PUT, spooling the payload if the node is unreachable / failing (connection error, timeout, 5xx)
+        :return:
+            True if delivered, False if spooled
+        """
+        try:
+            return anylog_conn.put(dbms=dbms, table=table, payload=payload, mode=mode)
+        except SPOOL_ERRORS:
+            self.append_put(dbms=dbms, table=table, payload=payload, mode=mode)
+            return False
+
+    def post(self, anylog_conn:anylog_connector.AnyLogConnector, command:str, topic:str=None,
+             destination:str=None, payload=None)->bool:
+        """
+        POST, spooling the payload if the node is unreachable / failing (connection error, timeout, 5xx)
+        :return:
+            True if delivered, False if spooled
+        """
+        try:
+            return anylog_conn.post(command=command, topic=topic, destination=destination, payload=payload)
+        except SPOOL_ERRORS:
+            self.append_post(command=command, topic=topic, destination=destination, payload=payload)
+            return False
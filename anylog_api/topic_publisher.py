@@ -0,0 +1,171 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+"""
+import threading
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.batch_writer import BatchWriter
+
+COUNTER_COLUMNS = ['messages', 'success', 'errors']
+
+
+def parse_msg_client(output)->dict:
+    """
+    Message counters of `get msg client`, summed over all subscriptions - the counters are the row below each
+    "Messages  Success  Errors ..." header
+    :args:
+        output:str - result of `get msg client`
+    :return:
+        dict (messages, success, errors), None if the output has no counters (no message client running)
+    """
+    if not isinstance(output, str):
+        return None
+    counters = None
+    lines = output.splitlines()
+    for index, line in enumerate(lines):
+        if [word.lower() for word in line.split()[:3]] != COUNTER_COLUMNS:
+            continue
+        for row in lines[index + 1:]:
+            values = row.split()
+            if values and values[0].isdigit():
+                if counters is None:
+                    counters = dict.fromkeys(COUNTER_COLUMNS, 0)
+                for column, value in zip(COUNTER_COLUMNS, values[:3]):
+                    counters[column] += int(value) if value.isdigit() else 0
+                break
+            if values and not set(row.strip()) <= set('-| '):
+                break
+    return counters
+
+
+class _ServerCheck:
+    """
+    `get msg client` bookkeeping shared by the sync and async TopicPublisher - compares the node's message counters
+    with the rows the publisher sent (rows_sent)
+    """
+    server_counters = None
+    server_stalled = None
+    _last_check = None  # (counters, rows sent) of the last check where the message count moved
+
+    def _compare(self, counters:dict)->bool:
+        """
+        Record the node's counters - stalled when records were sent but the message count has not moved since the
+        last check where it did, or when the error count went up since the previous check
+        """
+        sent = self.rows_sent
+        previous = self.server_counters
+        self.server_counters = counters
+        if counters is None:
+            return self.server_stalled
+        if self._last_check is None:
+            self._last_check = (counters, sent)
+            return self.server_stalled
+
+        baseline, baseline_sent = self._last_check
+        waiting = sent > baseline_sent and counters['messages'] <= baseline['messages']
+        failing = previous is not None and counters['errors'] > previous['errors']
+        self.server_stalled = waiting or failing
+        if not waiting:
+            self._last_check = (counters, sent)
+        return self.server_stalled
+
+
+class TopicPublisher(_ServerCheck, BatchWriter):
+    def __init__(self, anylog_conn:anylog_connector.AnyLogConnector, max_rows:int=1000, max_bytes:int=1048576,
+                 linger:float=1.0, spool=None, monitor_interval:float=None):
+        """
+        Publish records to a REST message client (`run msg client where broker=rest ...`) - records are buffered
+        per topic and sent as a single `post(command='data', topic=...)` with a JSON list payload, once a topic
+        reaches max_rows / max_bytes or its oldest record has waited linger seconds (same rules as BatchWriter,
+        over the connector's pooled session)
+            with TopicPublisher(anylog_conn, monitor_interval=30) as publisher:
+                publisher.add('dummy-anylog', {'dbms': 'test', 'table': 'rand_data', 'value': 1.5})
+        With monitor_interval, a background thread reads `get msg client` every monitor_interval seconds and
+        checks the node's message counters advance while records are being sent (see server_counters /
+        server_stalled).
+        :args:
+            anylog_conn:AnyLogConnector - connection to AnyLog
+            max_rows:int - flush once a topic has this many records
+            max_bytes:int - flush once a topic's payload reaches this many bytes
+            linger:float - maximum seconds a record waits before being sent (None / 0 to disable)
+            spool:DiskSpool - optional on-disk spool for batches that could not be delivered
+            monitor_interval:float - seconds between `get msg client` checks (None to disable)
+        :params:
+            server_counters:dict - last message counters reported by the node (messages, success, errors)
+            server_stalled:bool - records were sent but the node's message count has not advanced since, or its
+                                  error count went up - None until two checks were made
+        """
+        super().__init__(anylog_conn=anylog_conn, max_rows=max_rows, max_bytes=max_bytes, linger=linger, spool=spool)
+        self.monitor_interval = monitor_interval
+        self.__monitor = None
+        if monitor_interval:
+            self.__monitor = threading.Thread(target=self.__monitor_loop, name='anylog-topic-monitor', daemon=True)
+            self.__monitor.start()
+
+    def _spool(self, key:str, payload:bytes):
+        self.spool.append_post(command='data', topic=key, payload=payload)
+
+    def _send(self, key:str, payload:bytes)->bool:
+        """
+        Send a single batch
+        :args:
+            key:str - topic
+            payload:bytes - serialized JSON list of records
+        """
+        return self.anylog_conn.post(command='data', topic=key, payload=payload)
+
+    def add(self, topic:str, record:dict):
+        """
+        Buffer a single record
+        :args:
+            topic:str - message client topic
+            record:dict - record to publish
+        """
+        self._add(key=topic, rows=[record])
+
+    def add_rows(self, topic:str, records:list):
+        """
+        Buffer several records for the same topic
+        :args:
+            topic:str - message client topic
+            records:list - records to publish
+        """
+        self._add(key=topic, rows=records)
+
+    def flush(self, topic:str=None):
+        """
+        Send buffered records - either for a specific topic or (default) for everything
+        :args:
+            topic:str - topic to flush
+        """
+        with self._lock:
+            keys = [key for key in self._buffers if topic is None or key == topic]
+        self._flush_keys(keys=keys)
+
+    def check_server(self)->bool:
+        """
+        Read `get msg client` now and compare its counters with the previous check
+        :return:
+            server_stalled
+        """
+        response = self.anylog_conn.get(command='get msg client', as_response=True)
+        return self._compare(parse_msg_client(response.text))
+
+    def __monitor_loop(self):
+        while not self._stop_event.wait(self.monitor_interval):
+            try:
+                self.check_server()
+            except Exception as error:
+                self.last_error = error
+
+    def close(self):
+        """
+        Stop the background threads and flush everything still buffered. If the final flush fails the records are
+        kept and close() (or flush()) can be called again.
+        """
+        super().close()
+        if self.__monitor is not None:
+            self.__monitor.join()
+            self.__monitor = None
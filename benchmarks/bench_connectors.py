@@ -0,0 +1,209 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+
+Measure ops/sec and latency percentiles of the sync vs. async connectors for GET (sql), PUT and POST at various
+payload sizes and concurrency levels, against a local fake node (or a real one via --conn)
+    python3 benchmarks/bench_connectors.py --requests 500 --rows 1 100 1000 --concurrency 1 8 32
+    python3 benchmarks/bench_connectors.py --save baseline.json
+    python3 benchmarks/bench_connectors.py --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anylog_api.anylog_connector as anylog_connector
+import anylog_api.async_anylog_connector as async_anylog_connector
+from fake_node import FakeNode
+
+OPERATIONS = ['get', 'put', 'post']
+
+
+def percentile(values:list, percent:float)->float:
+    """
+    Exact percentile (nearest rank) of a list of values
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(int(round(percent / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def build_payload(rows:int)->list:
+    return [{'timestamp': '2025-01-01 00:00:00.000000', 'value': i * 0.5} for i in range(rows)]
+
+
+def summarize(mode:str, operation:str, rows:int, concurrency:int, latencies:list, elapsed:float, errors:int)->dict:
+    return {
+        'mode': mode,
+        'operation': operation,
+        'rows': rows,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    }
+
+
+def run_sync(anylog_conn, operation:str, rows:int, requests:int, concurrency:int)->dict:
+    """
+    Execute `requests` calls with the sync connector over a thread pool of `concurrency` threads
+    """
+    payload = build_payload(rows)
+    command = f'sql test format=json select * from rand_data limit {rows}'
+    errors = []
+
+    def call(_):
+        start = time.perf_counter()
+        try:
+            if operation == 'get':
+                anylog_conn.get(command=command)
+            elif operation == 'put':
+                anylog_conn.put(dbms='test', table='rand_data', payload=payload)
+            else:
+                anylog_conn.post(command='data', topic='bench', payload=payload)
+        except Exception:
+            errors.append(1)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [call(i) for i in range(requests)]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(call, range(requests)))
+    return summarize('sync', operation, rows, concurrency, latencies, time.perf_counter() - start, len(errors))
+
+
+async def run_async(anylog_conn, operation:str, rows:int, requests:int, concurrency:int)->dict:
+    """
+    Execute `requests` calls with the async connector, at most `concurrency` in flight
+    """
+    payload = build_payload(rows)
+    command = f'sql test format=json select * from rand_data limit {rows}'
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = []
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if operation == 'get':
+                    await anylog_conn.get(command=command)
+                elif operation == 'put':
+                    await anylog_conn.put(dbms='test', table='rand_data', payload=payload)
+                else:
+                    await anylog_conn.post(command='data', topic='bench', payload=payload)
+            except Exception:
+                errors.append(1)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[call() for _ in range(requests)])
+    return summarize('async', operation, rows, concurrency, latencies, time.perf_counter() - start, len(errors))
+
+
+async def run_async_suite(conn:str, args)->list:
+    results = []
+    async with async_anylog_connector.AnyLogConnector(conn=conn, limit=max(args.concurrency)) as anylog_conn:
+        for operation in args.operations:
+            for rows in args.rows:
+                for concurrency in args.concurrency:
+                    results.append(await run_async(anylog_conn, operation, rows, args.requests, concurrency))
+    return results
+
+
+def run_sync_suite(conn:str, args)->list:
+    results = []
+    with anylog_connector.AnyLogConnector(conn=conn, pool_maxsize=max(args.concurrency)) as anylog_conn:
+        for operation in args.operations:
+            for rows in args.rows:
+                for concurrency in args.concurrency:
+                    results.append(run_sync(anylog_conn, operation, rows, args.requests, concurrency))
+    return results
+
+
+def print_results(results:list):
+    header = f'{"mode":<6} {"op":<5} {"rows":>6} {"conc":>5} {"ops/sec":>10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>7}'
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f'{result["mode"]:<6} {result["operation"]:<5} {result["rows"]:>6} {result["concurrency"]:>5} '
+              f'{result["ops_per_sec"]:>10.1f} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+              f'{result["p99_ms"]:>9.2f} {result["errors"]:>7}')
+
+
+def compare(results:list, baseline_file:str, tolerance:float)->list:
+    """
+    Compare ops/sec against a saved baseline
+    :return:
+        list of regressions (current ops/sec lower than baseline by more than tolerance)
+    """
+    with open(baseline_file) as f:
+        baseline = {(b['mode'], b['operation'], b['rows'], b['concurrency']): b for b in json.load(f)}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['mode'], result['operation'], result['rows'], result['concurrency']))
+        if previous and result['ops_per_sec'] < previous['ops_per_sec'] * (1 - tolerance):
+            regressions.append((result, previous))
+    return regressions
+
+
+def main():
+    parse = argparse.ArgumentParser(description='Benchmark the sync and async AnyLog connectors')
+    parse.add_argument('--conn', type=str, default=None, help='benchmark a real node (ip:port) instead of the fake one')
+    parse.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parse.add_argument('--rows', type=int, nargs='+', default=[1, 100, 1000], help='rows per payload / query')
+    parse.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='requests in flight')
+    parse.add_argument('--operations', type=str, nargs='+', default=OPERATIONS, choices=OPERATIONS)
+    parse.add_argument('--modes', type=str, nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    parse.add_argument('--save', type=str, default=None, help='write results (JSON) to file')
+    parse.add_argument('--compare', type=str, default=None, help='baseline results (JSON) to compare against')
+    parse.add_argument('--tolerance', type=float, default=0.2, help='allowed ops/sec drop vs. baseline (0.2 = 20%%)')
+    args = parse.parse_args()
+
+    node = None
+    conn = args.conn
+    if conn is None:
+        node = FakeNode().start()
+        conn = node.conn
+
+    try:
+        results = []
+        if 'sync' in args.modes:
+            results += run_sync_suite(conn, args)
+        if 'async' in args.modes:
+            results += asyncio.run(run_async_suite(conn, args))
+    finally:
+        if node is not None:
+            node.stop()
+
+    print_results(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for result, previous in regressions:
+            print(f'REGRESSION {result["mode"]} {result["operation"]} rows={result["rows"]} '
+                  f'concurrency={result["concurrency"]}: {result["ops_per_sec"]:.1f} ops/sec '
+                  f'(baseline {previous["ops_per_sec"]:.1f})')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/
+
+Local stand-in for an AnyLog / EdgeLake REST node, used by the benchmarks - it understands the `command`,
+`dbms` / `table` / `mode` and `topic` headers and returns canned `get status` / `sql` results. Can also be run on its
+own: python3 benchmarks/fake_node.py --port 32149
+"""
+import argparse
+import gzip
+import http.server
+import json
+import re
+import socketserver
+import threading
+import zlib
+
+LIMIT_PATTERN = re.compile(r'\blimit\s+(\d+)', re.IGNORECASE)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'AnyLogFakeNode/1.0'
+    disable_nagle_algorithm = True
+    wbufsize = 65536  # headers + body leave in a single send
+
+    def log_message(self, format, *args):
+        pass
+
+    def __send(self, status:int, body, content_type:str='application/json'):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        headers = {'Content-Type': content_type}
+        if self.server.compress_responses and len(body) >= 1024 \
+                and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __read_body(self)->bytes:
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        encoding = self.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        return body
+
+    def __count_rows(self, body:bytes)->int:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            return -1
+        return len(rows) if isinstance(rows, list) else 1
+
+    def do_GET(self):
+        self.server.record('GET')
+        command = (self.headers.get('command') or '').strip()
+        lowered = command.lower()
+        if not command:
+            self.__send(400, {'err_code': 400, 'err_text': 'Missing command'})
+        elif lowered.startswith('get status'):
+            if 'format=json' in lowered:
+                self.__send(200, {'Status': 'fake-node@127.0.0.1:32148 running'})
+            else:
+                self.__send(200, "'fake-node@127.0.0.1:32148 running'", 'text/plain')
+        elif lowered.startswith('sql'):
+            match = LIMIT_PATTERN.search(command)
+            rows = int(match.group(1)) if match else self.server.sql_rows
+            self.__send(200, self.server.sql_result(rows))
+        elif lowered.startswith('test node'):
+            self.__send(200, 'Test Node - TCP, REST and Blockchain tests passed', 'text/plain')
+        else:
+            self.__send(200, f'{command}: ok', 'text/plain')
+
+    def do_PUT(self):
+        self.server.record('PUT')
+        missing = [key for key in ('dbms', 'table', 'mode') if not self.headers.get(key)]
+        body = self.__read_body()
+        if missing:
+            self.__send(400, {'err_code': 400, 'err_text': f'Missing headers: {", ".join(missing)}'})
+        else:
+            self.server.record_rows(self.__count_rows(body))
+            self.__send(200, {'AnyLog.status': 'Success'})
+
+    def do_POST(self):
+        self.server.record('POST')
+        command = (self.headers.get('command') or '').strip()
+        body = self.__read_body()
+        if not command:
+            self.__send(400, {'err_code': 400, 'err_text': 'Missing command'})
+        elif command == 'data' and not self.headers.get('topic'):
+            self.__send(400, {'err_code': 400, 'err_text': 'Missing topic'})
+        else:
+            if command == 'data':
+                self.server.record_rows(self.__count_rows(body))
+            self.__send(200, {'AnyLog.status': 'Success'})
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeNode:
+    def __init__(self, host:str='127.0.0.1', port:int=0, sql_rows:int=10, compress_responses:bool=False):
+        """
+        Threaded HTTP server emulating an AnyLog node
+            - GET: `get status`, `sql ...` (returns `limit N` rows, sql_rows by default), `test node`, anything else
+              returns plain text
+            - PUT: requires the dbms, table and mode headers
+            - POST: requires the command header (and topic for `data`)
+        :args:
+            host:str - address to bind
+            port:int - port to bind (0 for a free port)
+            sql_rows:int - rows returned by a `sql` command without `limit`
+            compress_responses:bool - gzip responses of 1KB or more when the client accepts it
+        """
+        self.server = _Server((host, port), _Handler)
+        self.server.sql_rows = sql_rows
+        self.server.compress_responses = compress_responses
+        self.server.requests = {'GET': 0, 'PUT': 0, 'POST': 0}
+        self.server.rows = 0
+        self.server.lock = threading.Lock()
+        self.server.record = self.__record
+        self.server.record_rows = self.__record_rows
+        self.server.sql_result = self.__sql_result
+        self.__sql_cache = {}
+        self.__thread = None
+
+    @property
+    def conn(self)->str:
+        host, port = self.server.server_address[:2]
+        return f'{host}:{port}'
+
+    @property
+    def requests(self)->dict:
+        return dict(self.server.requests)
+
+    @property
+    def rows(self)->int:
+        return self.server.rows
+
+    def __record(self, method:str):
+        with self.server.lock:
+            self.server.requests[method] += 1
+
+    def __record_rows(self, rows:int):
+        with self.server.lock:
+            self.server.rows += max(rows, 0)
+
+    def __sql_result(self, rows:int)->bytes:
+        result = self.__sql_cache.get(rows)
+        if result is None:
+            result = json.dumps({
+                'Query': [{'timestamp': f'2025-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}',
+                           'value': i * 0.5} for i in range(rows)],
+                'Statistics': [{'Count': rows, 'Time': '00:00:00', 'Nodes': 1}]
+            }).encode('utf-8')
+            self.__sql_cache[rows] = result
+        return result
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.server.serve_forever, name='anylog-fake-node', daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parse = argparse.ArgumentParser(description='Local stand-in AnyLog REST node')
+    parse.add_argument('--host', type=str, default='127.0.0.1', help='address to bind')
+    parse.add_argument('--port', type=int, default=32149, help='port to bind')
+    parse.add_argument('--sql-rows', type=int, default=10, help='rows returned by sql commands without limit')
+    parse.add_argument('--compress', action='store_true', help='gzip responses when the client accepts it')
+    args = parse.parse_args()
+
+    node = FakeNode(host=args.host, port=args.port, sql_rows=args.sql_rows, compress_responses=args.compress)
+    print(f'fake AnyLog node listening on {node.conn}')
+    try:
+        node.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,13 @@ import anylog_api.async_anylog_connector as anylog_connector
 conn = '127.0.0.1:32349'
 auth = ()
 timeout = 30
-anylog_conn = anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout)
 
 async def main():
+    async with anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout) as anylog_conn:
+        await query(anylog_conn=anylog_conn)
+
+
+async def query(anylog_conn:anylog_connector.AnyLogConnector):
     if await anylog_connector.check_status(anylog_conn=anylog_conn) is True: # validate able to communicate with the node
         # validate node
         output = await anylog_connector.check_node(anylog_conn=anylog_conn)
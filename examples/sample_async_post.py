@@ -5,19 +5,17 @@ import asyncio
 
 import anylog_api.async_anylog_connector as anylog_connector
 
-# Connect to AnyLog / EdgeLake connector
-conn = '127.0.0.1:32149'
-auth = ()
-timeout = 30
-anylog_conn = anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout)
-
 async def main():
     # Connect to AnyLog / EdgeLake connector
     conn = '170.187.157.30:32149'
     auth = ()
     timeout = 30
-    anylog_conn = anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout)
 
+    async with anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout) as anylog_conn:
+        await publish(anylog_conn=anylog_conn)
+
+
+async def publish(anylog_conn:anylog_connector.AnyLogConnector):
     # Generate and serialize data
     DATA = []
     for i in range(10):
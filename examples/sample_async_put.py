@@ -10,8 +10,12 @@ async def main():
     conn = '127.0.0.1:32149'
     auth = ()
     timeout = 30
-    anylog_conn = anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout)
 
+    async with anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout) as anylog_conn:
+        await publish(anylog_conn=anylog_conn)
+
+
+async def publish(anylog_conn:anylog_connector.AnyLogConnector):
     # Generate and serialize data
     DATA = [{
         "timestamp": datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f'),
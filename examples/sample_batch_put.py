@@ -0,0 +1,26 @@
+import datetime
+import random
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.batch_writer import BatchWriter
+
+# Connect to AnyLog / EdgeLake connector
+conn = '127.0.0.1:32149'
+auth = ()
+timeout = 30
+anylog_conn = anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout)
+
+if anylog_connector.check_status(anylog_conn=anylog_conn) is True: # validate able to communicate with the node
+    # rows are buffered per table and sent once 500 rows are pending or a row has waited 1 second
+    with BatchWriter(anylog_conn=anylog_conn, max_rows=500, linger=1.0, mode='streaming') as writer:
+        for i in range(2000):
+            writer.add(dbms='test', table='rand_data', row={
+                "timestamp": datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                "value": random.random()
+            })
+    print(f'sent {writer.rows_sent} rows in {writer.batches_sent} batches')
+
+# show streaming
+output = anylog_conn.get(command='get streaming')
+print(output)
+anylog_conn.close()
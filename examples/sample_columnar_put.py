@@ -0,0 +1,28 @@
+import time
+
+import numpy
+
+import anylog_api.anylog_connector as anylog_connector
+from anylog_api.payload_builder import PayloadBuilder
+
+# Connect to AnyLog / EdgeLake connector
+conn = '127.0.0.1:32149'
+auth = ()
+timeout = 30
+anylog_conn = anylog_connector.AnyLogConnector(conn=conn, auth=auth, timeout=timeout)
+
+# Generate data as columns - one reading every 10ms (epoch seconds) rather than a list of dicts
+TIMESTAMPS = time.time() + numpy.arange(1000) * 0.01
+VALUES = numpy.random.random(1000)
+
+# Serialize all rows at once - timestamps are formatted in bulk
+builder = PayloadBuilder()
+payload = builder.build({'timestamp': TIMESTAMPS, 'value': VALUES}, constants={'device': 'sensor-1'})
+
+if anylog_connector.check_status(anylog_conn=anylog_conn) is True: # validate able to communicate with the node
+    status = anylog_conn.put(dbms='test', table='rand_data', mode='streaming', payload=payload) # publish data via PUT
+    print('success' if status is True else 'fail')
+
+# show streaming
+output = anylog_conn.get(command='get streaming')
+print(output)
@@ -23,6 +23,14 @@ PKG_AUTHOR = config['metadata'].get('author', 'AnyLog Co.')
 PKG_CONTACT = config['metadata'].get('contact', 'info@anylog.co')
 PKG_DESCRIPTION = config['metadata'].get('description', 'Tool for AnyLog / EdgeLake RESTful API')
 
+# Optional dependencies - pip install anylog-api[numpy,orjson]
+EXTRAS_REQUIRE = {
+    'numpy': ['numpy>=1.17'],
+    'orjson': ['orjson'],
+    'ujson': ['ujson'],
+    'parquet': ['pyarrow>=7'],
+}
+
 # Define the entry point for running the package (if applicable)
 ENTRY_POINTS = {
     'console_scripts': [
@@ -42,6 +50,7 @@ setuptools.setup(
     packages=setuptools.find_packages(exclude=("tests", "tests.*")),
     include_package_data=True,
     install_requires=REQUIREMENTS_LIST,  # Installs dependencies from requirements.txt
+    extras_require=EXTRAS_REQUIRE,
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Mozilla Public License 2.0 (MPL 2.0)",
@@ -0,0 +1,68 @@
+import http.server
+import socket
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def http_server():
+    """
+    Start a local HTTP server for a BaseHTTPRequestHandler subclass - returns its `host:port`
+    """
+    servers = []
+
+    def start(handler:type)->str:
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        servers.append(server)
+        return f'127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class StatusHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Reply to every request with the class' `status`, recording the method of each request received
+    """
+    protocol_version = 'HTTP/1.1'
+    status = 200
+    requests = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def __reply(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.requests.append(self.command)
+        self.send_response(self.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_PUT = do_POST = __reply
+
+
+@pytest.fixture
+def status_server(http_server):
+    """
+    Start a server replying with a fixed status - returns its `host:port` and the list of methods it received
+    """
+    def start(status:int)->tuple:
+        handler = type('Handler', (StatusHandler,), {'status': status, 'requests': []})
+        return http_server(handler), handler.requests
+
+    return start
+
+
+@pytest.fixture
+def closed_port()->str:
+    """
+    `host:port` nothing listens on - connections are refused
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'127.0.0.1:{sock.getsockname()[1]}'
@@ -0,0 +1,56 @@
+import asyncio
+import http.server
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+
+
+def test_connection_stats_counts_reused_connections(status_server):
+    conn, _ = status_server(200)
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        assert anylog_conn.connection_stats() == {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+        for index in range(3):
+            assert anylog_conn.put(dbms='test', table='t', payload=[{'value': index}]) is True
+        assert anylog_conn.connection_stats() == {'requests': 3, 'new_connections': 1, 'reused_connections': 2}
+
+
+def test_async_connector_is_reused_across_event_loops(status_server):
+    conn, requests_received = status_server(200)
+    anylog_conn = AsyncAnyLogConnector(conn=conn)
+
+    async def put(index:int):
+        return await anylog_conn.put(dbms='test', table='t', payload=[{'value': index}])
+
+    assert asyncio.run(put(0)) is True
+    assert asyncio.run(put(1)) is True
+    asyncio.run(anylog_conn.close())
+    assert anylog_conn.closed
+    assert requests_received == ['PUT', 'PUT']
+
+
+class BodyHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Record the framing headers and body of every PUT
+    """
+    protocol_version = 'HTTP/1.1'
+    received = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.received.append((self.headers.get('Content-Length'), self.headers.get('Transfer-Encoding'), body))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def test_buffer_payload_is_sent_in_one_piece(http_server):
+    handler = type('Handler', (BodyHandler,), {'received': []})
+    conn = http_server(handler)
+    body = b'[{"value": 1}]'
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        for payload in (bytearray(body), memoryview(body)):
+            assert anylog_conn.put(dbms='test', table='t', payload=payload) is True
+    assert handler.received == [(str(len(body)), None, body)] * 2
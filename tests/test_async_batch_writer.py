@@ -0,0 +1,91 @@
+import asyncio
+
+from anylog_api.async_anylog_connector import AnyLogConnector
+from anylog_api.async_batch_writer import BatchWriter
+from anylog_api.async_topic_publisher import TopicPublisher
+from anylog_api.exceptions import AnyLogServerError
+
+
+class SlowConnector(AnyLogConnector):
+    def __init__(self, delay:float):
+        super().__init__(conn='127.0.0.1:1')
+        self.delay = delay
+        self.sent = []
+
+    async def put(self, dbms:str, table:str, payload, mode:str='streaming')->bool:
+        await asyncio.sleep(self.delay)
+        self.sent.append(self.codec.loads(payload))
+        return True
+
+    async def post(self, command:str, topic:str=None, destination:str=None, payload=None)->bool:
+        await asyncio.sleep(self.delay)
+        self.sent.append(self.codec.loads(payload))
+        return True
+
+
+def test_close_during_in_flight_linger_flush():
+    async def run():
+        anylog_conn = SlowConnector(delay=0.3)
+        writer = BatchWriter(anylog_conn, linger=0.1)
+        await writer.add_rows('test', 'rand_data', [{'value': 1}, {'value': 2}])
+        await asyncio.sleep(0.2)  # the linger flush is now waiting on put
+        await writer.close()
+        return anylog_conn, writer
+
+    anylog_conn, writer = asyncio.run(run())
+    assert anylog_conn.sent == [[{'value': 1}, {'value': 2}]]
+    assert writer.rows_sent == 2
+    assert writer.pending_rows == 0
+
+
+def test_cancelled_send_keeps_rows():
+    async def run():
+        anylog_conn = SlowConnector(delay=1)
+        writer = BatchWriter(anylog_conn, linger=None)
+        await writer.add('test', 'rand_data', {'value': 1})
+        flush = asyncio.ensure_future(writer.flush())
+        await asyncio.sleep(0.1)
+        flush.cancel()
+        try:
+            await flush
+        except asyncio.CancelledError:
+            pass
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.pending_rows == 1
+    assert writer.rows_sent == 0
+
+
+def test_topic_publisher_close_during_in_flight_flush():
+    async def run():
+        anylog_conn = SlowConnector(delay=0.3)
+        publisher = TopicPublisher(anylog_conn, linger=0.1, monitor_interval=10)
+        await publisher.add('dummy-anylog', {'value': 1})
+        await asyncio.sleep(0.2)
+        await publisher.close()
+        return anylog_conn, publisher
+
+    anylog_conn, publisher = asyncio.run(run())
+    assert anylog_conn.sent == [[{'value': 1}]]
+    assert publisher.pending_rows == 0
+
+
+def test_failed_batch_backs_off_linger_retries(status_server):
+    conn, requests_received = status_server(500)
+
+    async def run():
+        async with AnyLogConnector(conn=conn) as anylog_conn:
+            writer = BatchWriter(anylog_conn, linger=0.05)
+            await writer.add('test', 'rand_data', {'value': 1})
+            await asyncio.sleep(0.6)
+            attempts = len(requests_received)
+            try:
+                await writer.close()
+            except AnyLogServerError:
+                pass
+            return attempts, writer.pending_rows
+
+    attempts, pending_rows = asyncio.run(run())
+    assert 2 <= attempts <= 4  # linger, then 0.1 / 0.2 / 0.4 seconds apart - not every linger / 4
+    assert pending_rows == 1
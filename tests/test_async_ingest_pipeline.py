@@ -0,0 +1,44 @@
+import asyncio
+
+from anylog_api.async_anylog_connector import AnyLogConnector
+from anylog_api.async_ingest_pipeline import IngestPipeline
+
+
+def test_failing_on_error_callback_does_not_stop_workers(status_server, caplog):
+    conn, requests_received = status_server(500)
+    failed = []
+
+    def on_error(item, error):
+        failed.append(item['payload'])
+        raise RuntimeError('callback failed')
+
+    async def run():
+        async with AnyLogConnector(conn=conn) as anylog_conn:
+            pipeline = IngestPipeline(anylog_conn, workers=1, on_error=on_error)
+            await pipeline.start()
+            for index in range(3):
+                await pipeline.enqueue(dbms='test', table='t', payload=[{'value': index}])
+            await asyncio.wait_for(pipeline.close(), timeout=5)
+            return pipeline.errors
+
+    assert asyncio.run(run()) == 3
+    assert failed == [[{'value': index}] for index in range(3)]
+    assert len(requests_received) == 3
+    assert [record.exc_info[1].args for record in caplog.records] == [('callback failed',)] * 3
+
+
+def test_sent_history_is_pruned_without_stats(status_server):
+    conn, _ = status_server(200)
+
+    async def run():
+        async with AnyLogConnector(conn=conn) as anylog_conn:
+            async with IngestPipeline(anylog_conn, workers=2, rate_window=0.05) as pipeline:
+                for index in range(20):
+                    await pipeline.enqueue(dbms='test', table='t', payload=[{'value': index}])
+                    await pipeline.join()
+                    await asyncio.sleep(0.01)
+                return len(pipeline._sent_history), pipeline.rows_sent
+
+    history, rows_sent = asyncio.run(run())
+    assert rows_sent == 20
+    assert history <= 6
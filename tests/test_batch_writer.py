@@ -0,0 +1,22 @@
+import time
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.batch_writer import BatchWriter
+from anylog_api.exceptions import AnyLogServerError
+
+
+def test_failed_batch_backs_off_linger_retries(status_server):
+    conn, requests_received = status_server(500)
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        writer = BatchWriter(anylog_conn, linger=0.05)
+        writer.add('test', 'rand_data', {'value': 1})
+        time.sleep(0.6)
+        attempts = len(requests_received)
+        with pytest.raises(AnyLogServerError):
+            writer.close()
+    assert 2 <= attempts <= 4  # linger, then 0.1 / 0.2 / 0.4 seconds apart - not every linger / 4
+    assert writer.pending_rows == 1
+    assert writer.last_error is not None
+
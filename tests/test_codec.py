@@ -0,0 +1,44 @@
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.codec import CODECS, StdlibCodec, encode_payload, get_codec, register_codec
+
+ROWS = [{'device': 'sensor é', 'value': 1.5, 'active': True, 'note': None}]
+
+
+@pytest.mark.parametrize('name', sorted(CODECS))
+def test_round_trip(name):
+    codec = get_codec(name)
+    data = codec.dumps(ROWS)
+    assert isinstance(data, bytes)
+    assert codec.loads(data) == ROWS
+    assert StdlibCodec.loads(data) == ROWS  # every codec writes standard JSON
+
+
+def test_get_codec():
+    assert get_codec() is CODECS[next(name for name in ('orjson', 'ujson', 'json') if name in CODECS)]
+    assert get_codec(StdlibCodec) is StdlibCodec
+    with pytest.raises(ValueError):
+        get_codec('simplejson-missing')
+
+
+def test_register_codec():
+    class UpperCodec(StdlibCodec):
+        name = 'test-upper'
+
+    register_codec(UpperCodec)
+    try:
+        assert get_codec('test-upper') is UpperCodec
+        assert AnyLogConnector(conn='127.0.0.1:32149', codec='test-upper').codec is UpperCodec
+    finally:
+        CODECS.pop('test-upper')
+
+
+def test_encode_payload():
+    codec = get_codec('json')
+    assert encode_payload(codec, ROWS) == codec.dumps(ROWS)
+    assert encode_payload(codec, ROWS[0]) == codec.dumps(ROWS[0])
+    assert encode_payload(codec, '[{"value": 1}]') == '[{"value": 1}]'
+    assert encode_payload(codec, b'[]') == b'[]'
+    assert encode_payload(codec, None) is None
+
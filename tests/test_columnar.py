@@ -0,0 +1,56 @@
+import pytest
+
+from anylog_api.columnar import ColumnBuilder, to_columns
+
+numpy = pytest.importorskip('numpy')
+
+ROWS = [
+    {'timestamp': '2024-01-01 00:00:00.000000', 'device': 'a', 'value': 1, 'ratio': 0.5, 'active': True},
+    {'timestamp': '2024-01-01 00:00:01.000000', 'device': 'b', 'value': None, 'ratio': 1, 'active': False},
+    {'timestamp': None, 'device': 'c', 'value': 3, 'ratio': 2.5, 'active': None}
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 65536])
+def test_column_types(chunk_size):
+    columns = to_columns({'Query': ROWS}, chunk_size=chunk_size)
+    assert columns['timestamp'].dtype == numpy.dtype('datetime64[us]')
+    assert numpy.isnat(columns['timestamp'][2])
+    assert columns['device'].dtype == object and list(columns['device']) == ['a', 'b', 'c']
+    assert columns['value'].dtype == numpy.float64  # int column with a null
+    assert numpy.isnan(columns['value'][1]) and columns['value'][2] == 3
+    assert columns['ratio'].tolist() == [0.5, 1.0, 2.5]
+    assert all(len(column) == 3 for column in columns.values())
+
+
+def test_int_and_bool_columns():
+    columns = to_columns([{'value': index, 'active': index % 2 == 0} for index in range(4)])
+    assert columns['value'].dtype == numpy.int64
+    assert columns['active'].dtype == bool and columns['active'].tolist() == [True, False, True, False]
+
+
+def test_columns_missing_from_some_rows():
+    builder = ColumnBuilder(chunk_size=2)
+    builder.extend(iter([{'value': 1}, {'value': 2}, {'value': 3, 'extra': 'x'}, {'value': 4}]))
+    columns = builder.finish()
+    assert builder.rows == 4
+    assert columns['value'].tolist() == [1, 2, 3, 4]
+    assert columns['extra'].tolist() == [None, None, 'x', None]
+
+
+def test_null_chunks_take_the_column_type():
+    columns = to_columns([{'value': None}, {'value': None}, {'value': 1.5}], chunk_size=2)
+    assert columns['value'].dtype == numpy.float64
+    assert numpy.isnan(columns['value'][:2]).all()
+
+
+def test_explicit_timestamp_columns():
+    rows = [{'timestamp': '2024-01-01 00:00:00', 'label': '2024-01-01 00:00:00'}]
+    columns = to_columns(rows, timestamp_columns=['timestamp'], timestamp_unit='s')
+    assert columns['timestamp'].dtype == numpy.dtype('datetime64[s]')
+    assert columns['label'].dtype == object
+
+
+def test_mixed_values_fall_back_to_objects():
+    columns = to_columns([{'value': 1}, {'value': 'n/a'}])
+    assert columns['value'].dtype == object and columns['value'].tolist() == [1, 'n/a']
@@ -0,0 +1,108 @@
+import asyncio
+import gzip
+import http.server
+import json
+import zlib
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.compression import compress_payload, validate_encoding
+
+ROWS = [{'timestamp': '2024-01-01 00:00:00', 'value': index} for index in range(100)]
+DECODERS = {'gzip': gzip.decompress, 'deflate': zlib.decompress, None: lambda body: body}
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate'])
+def test_round_trip(encoding):
+    payload = json.dumps(ROWS)
+    body, content_encoding = compress_payload(payload, encoding=encoding, threshold=0)
+    assert content_encoding == encoding
+    assert len(body) < len(payload)
+    assert DECODERS[encoding](body) == payload.encode()
+
+
+def test_small_or_disabled_payloads_are_sent_as_is():
+    assert compress_payload('[{"value": 1}]', encoding='gzip', threshold=1024) == ('[{"value": 1}]', None)
+    assert compress_payload(b'[]', encoding=None, threshold=0) == (b'[]', None)
+    assert compress_payload(None, encoding='gzip') == (None, None)
+
+
+def test_validate_encoding():
+    assert validate_encoding('GZIP') == 'gzip'
+    assert validate_encoding(None) is None
+    with pytest.raises(ValueError):
+        validate_encoding('br')
+    with pytest.raises(ValueError):
+        AnyLogConnector(conn='127.0.0.1:32149', compression='br')
+
+
+class EncodingHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Record (Content-Encoding, decoded rows) of every PUT, and the Accept-Encoding of every GET - GETs are answered
+    gzip-compressed when the client accepts it
+    """
+    protocol_version = 'HTTP/1.1'
+    received = None
+    accepted = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PUT(self):
+        encoding = self.headers.get('Content-Encoding')
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.received.append((encoding, json.loads(DECODERS[encoding](body))))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        accept_encoding = self.headers.get('Accept-Encoding', '')
+        self.accepted.append(accept_encoding)
+        body = json.dumps({'Query': ROWS}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in accept_encoding:
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def encoding_server(http_server):
+    handler = type('Handler', (EncodingHandler,), {'received': [], 'accepted': []})
+    return http_server(handler), handler
+
+
+def test_compressed_put(encoding_server):
+    conn, handler = encoding_server
+    with AnyLogConnector(conn=conn, compression='deflate', compression_threshold=256) as anylog_conn:
+        assert anylog_conn.put(dbms='test', table='t', payload=ROWS) is True
+        assert anylog_conn.put(dbms='test', table='t', payload=ROWS[:1]) is True  # below the threshold
+    assert handler.received == [('deflate', ROWS), (None, ROWS[:1])]
+
+
+def test_accept_encoding_negotiation(encoding_server):
+    conn, handler = encoding_server
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        assert anylog_conn.get(command='sql test format=json select * from t') == {'Query': ROWS}
+    with AnyLogConnector(conn=conn, decompress_responses=False) as anylog_conn:
+        assert anylog_conn.get(command='sql test format=json select * from t') == {'Query': ROWS}
+    assert handler.accepted == ['gzip, deflate', 'identity']
+
+
+def test_async_compression(encoding_server):
+    conn, handler = encoding_server
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn, compression='gzip', compression_threshold=0) as anylog_conn:
+            await anylog_conn.put(dbms='test', table='t', payload=ROWS)
+            return await anylog_conn.get(command='sql test format=json select * from t')  # as text
+
+    assert json.loads(asyncio.run(run())) == {'Query': ROWS}
+    assert handler.received == [('gzip', ROWS)]
+    assert handler.accepted == ['gzip, deflate']
@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+import pytest
+
+from anylog_api.async_connector_pool import ConnectorPool as AsyncConnectorPool
+from anylog_api.connector_pool import ConnectorPool
+from anylog_api.exceptions import (AnyLogConnectError, AnyLogConnectionError, AnyLogHTTPError, AnyLogServerError,
+                                   AnyLogValidationError)
+from anylog_api.schema_cache import SchemaCache, TableSchema
+
+ROWS = [{'value': 1}]
+
+
+def healthy(pool)->list:
+    return [node['healthy'] for node in pool.stats().values()]
+
+
+@pytest.mark.parametrize('error', [TypeError('bad argument'), AnyLogValidationError('row 0 column value: bad')])
+def test_local_error_keeps_nodes_in_rotation(status_server, error):
+    (first, _), (second, _) = status_server(200), status_server(200)
+    tried = []
+
+    def fail(anylog_conn):
+        tried.append(anylog_conn.conn)
+        raise error
+
+    with ConnectorPool([first, second], recheck_interval=60) as pool:
+        with pytest.raises(type(error)):
+            pool._execute(fail)
+        assert tried == [first]
+        assert healthy(pool) == [True, True]
+        assert pool.stats()[first]['outstanding'] == 0
+
+
+def test_schema_rejection_keeps_node_healthy(status_server):
+    conn, requests_received = status_server(200)
+    schema_cache = SchemaCache()
+    schema_cache._store('test', 't', TableSchema({'value': 'int'}))
+
+    with ConnectorPool([conn], recheck_interval=60, schema_cache=schema_cache) as pool:
+        with pytest.raises(AnyLogValidationError):
+            pool.put(dbms='test', table='t', payload=[{'value': 'text'}])
+        assert healthy(pool) == [True]
+        assert pool.put(dbms='test', table='t', payload=ROWS) is True
+    assert requests_received == ['PUT']
+
+
+def test_client_error_keeps_node_healthy(status_server):
+    conn, requests_received = status_server(400)
+    with ConnectorPool([conn], recheck_interval=60) as pool:
+        with pytest.raises(AnyLogHTTPError):
+            pool.put(dbms='test', table='t', payload=ROWS)
+        assert healthy(pool) == [True]
+
+
+def test_server_error_marks_node_down_without_resending(status_server):
+    (first, first_requests), (second, second_requests) = status_server(500), status_server(200)
+    with ConnectorPool([first, second], recheck_interval=60) as pool:
+        with pytest.raises(AnyLogServerError):
+            pool.put(dbms='test', table='t', payload=ROWS)
+        assert healthy(pool) == [False, True]
+    assert first_requests == ['PUT']
+    assert second_requests == []
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_rejected_write_fails_over(status_server, status):
+    (first, first_requests), (second, second_requests) = status_server(status), status_server(200)
+    with ConnectorPool([first, second], recheck_interval=60) as pool:
+        assert pool.put(dbms='test', table='t', payload=ROWS) is True
+        assert healthy(pool) == [False, True]
+    assert second_requests == ['PUT']
+
+
+def test_refused_connection_fails_over(status_server, closed_port):
+    conn, requests_received = status_server(200)
+    with ConnectorPool([closed_port, conn], recheck_interval=60) as pool:
+        assert pool.post(command='data', topic='test', payload=ROWS) is True
+        assert healthy(pool) == [False, True]
+    assert requests_received == ['POST']
+
+
+def test_every_node_refused(closed_port):
+    with ConnectorPool([closed_port], recheck_interval=60) as pool:
+        with pytest.raises(AnyLogConnectError):
+            pool.put(dbms='test', table='t', payload=ROWS)
+
+
+def take_down(pool):
+    for node in pool.nodes:
+        node.healthy = False
+        node.failed_at = time.monotonic()
+
+
+def test_no_healthy_node_is_a_connect_error(status_server):
+    conn, requests_received = status_server(200)
+    with ConnectorPool([conn], recheck_interval=60) as pool:
+        take_down(pool)
+        with pytest.raises(AnyLogConnectionError) as error:
+            pool.put(dbms='test', table='t', payload=ROWS)
+    assert isinstance(error.value, AnyLogConnectError)
+    assert requests_received == []
+
+
+def test_latency_strategy_resamples_slow_nodes(status_server):
+    (fast, fast_requests), (slow, slow_requests) = status_server(200), status_server(200)
+    with ConnectorPool([fast, slow], strategy='latency', explore_every=4, recheck_interval=60) as pool:
+        pool.nodes[1].latency = 10.0  # one slow sample
+        for index in range(8):
+            assert pool.put(dbms='test', table='t', payload=[{'value': index}]) is True
+        assert pool.stats()[slow]['latency'] < 10.0
+    assert len(slow_requests) == 2
+    assert len(fast_requests) == 6
+
+
+def test_latency_strategy_without_exploration(status_server):
+    (fast, _), (slow, slow_requests) = status_server(200), status_server(200)
+    with ConnectorPool([fast, slow], strategy='latency', explore_every=0, recheck_interval=60) as pool:
+        pool.nodes[1].latency = 10.0
+        for index in range(8):
+            pool.put(dbms='test', table='t', payload=[{'value': index}])
+    assert slow_requests == []
+
+
+def test_async_local_error_keeps_nodes_in_rotation(status_server):
+    (first, _), (second, _) = status_server(200), status_server(200)
+
+    async def run():
+        async def fail(anylog_conn):
+            raise TypeError('bad argument')
+
+        async with AsyncConnectorPool([first, second], recheck_interval=60) as pool:
+            with pytest.raises(TypeError):
+                await pool._execute(fail)
+            return healthy(pool)
+
+    assert asyncio.run(run()) == [True, True]
+
+
+def test_async_server_error_marks_node_down_without_resending(status_server):
+    (first, _), (second, second_requests) = status_server(500), status_server(200)
+
+    async def run():
+        async with AsyncConnectorPool([first, second], recheck_interval=60) as pool:
+            with pytest.raises(AnyLogServerError):
+                await pool.put(dbms='test', table='t', payload=ROWS)
+            return healthy(pool)
+
+    assert asyncio.run(run()) == [False, True]
+    assert second_requests == []
+
+
+def test_async_refused_connection_fails_over(status_server, closed_port):
+    conn, requests_received = status_server(200)
+
+    async def run():
+        async with AsyncConnectorPool([closed_port, conn], recheck_interval=60) as pool:
+            return await pool.put(dbms='test', table='t', payload=ROWS), healthy(pool)
+
+    assert asyncio.run(run()) == (True, [False, True])
+    assert requests_received == ['PUT']
+
+
+def test_async_no_healthy_node_is_a_connect_error(status_server):
+    conn, requests_received = status_server(200)
+
+    async def run():
+        async with AsyncConnectorPool([conn], recheck_interval=60) as pool:
+            take_down(pool)
+            await pool.put(dbms='test', table='t', payload=ROWS)
+
+    with pytest.raises(AnyLogConnectError):
+        asyncio.run(run())
+    assert requests_received == []
+
+
+def test_async_latency_strategy_resamples_slow_nodes(status_server):
+    (fast, _), (slow, slow_requests) = status_server(200), status_server(200)
+
+    async def run():
+        async with AsyncConnectorPool([fast, slow], strategy='latency', explore_every=4, recheck_interval=60) as pool:
+            pool.nodes[1].latency = 10.0
+            for index in range(8):
+                await pool.put(dbms='test', table='t', payload=[{'value': index}])
+
+    asyncio.run(run())
+    assert len(slow_requests) == 2
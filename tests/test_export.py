@@ -0,0 +1,154 @@
+import asyncio
+import csv
+import http.server
+import json
+import os
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.async_export import export_query as async_export_query
+from anylog_api.export import export_query, export_rows
+
+ROWS = [{'timestamp': f'2024-01-01 00:00:0{index}', 'value': index} for index in range(5)]
+
+
+class QueryHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = json.dumps({'Query': ROWS}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def read_csv(path:str)->list:
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 1000])
+def test_csv(tmp_path, batch_size):
+    path = str(tmp_path / 'rows.csv')
+    assert export_rows(iter(ROWS), path=path, batch_size=batch_size) == 5
+    assert read_csv(path) == [['timestamp', 'value']] + [[row['timestamp'], str(row['value'])] for row in ROWS]
+    assert os.listdir(tmp_path) == ['rows.csv']
+
+
+def test_csv_columns(tmp_path):
+    path = str(tmp_path / 'rows.csv')
+    export_rows(ROWS[:2], path=path, columns=['value'], delimiter=';')
+    assert read_csv(path) == [['value'], ['0'], ['1']]
+
+
+def test_jsonl(tmp_path):
+    path = str(tmp_path / 'rows.ndjson')
+    assert export_rows(ROWS, path=path, batch_size=2) == 5
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == ROWS
+
+
+def test_parquet(tmp_path):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'rows.parquet')
+    assert export_rows(ROWS, path=path, batch_size=2) == 5
+    parquet_file = pyarrow_parquet.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.read().to_pylist() == ROWS
+
+
+def test_empty_result(tmp_path):
+    assert export_rows([], path=str(tmp_path / 'empty.csv'), columns=['timestamp', 'value']) == 0
+    assert read_csv(str(tmp_path / 'empty.csv')) == [['timestamp', 'value']]
+    assert export_rows([], path=str(tmp_path / 'empty.jsonl')) == 0
+    assert os.path.getsize(tmp_path / 'empty.jsonl') == 0
+
+
+def test_empty_parquet(tmp_path):
+    pyarrow = pytest.importorskip('pyarrow')
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+
+    path = str(tmp_path / 'empty.parquet')
+    assert export_rows([], path=path) == 0
+    assert pyarrow_parquet.read_table(path).num_rows == 0
+
+    schema = pyarrow.schema([('timestamp', pyarrow.string()), ('value', pyarrow.int64())])
+    assert export_rows([], path=path, schema=schema) == 0
+    assert pyarrow_parquet.read_table(path).schema.equals(schema)
+
+
+def test_invalid_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_rows(ROWS, path=str(tmp_path / 'rows.txt'))
+
+
+class Rows:
+    """
+    Stand-in connector whose query returns unserializable rows forever - records whether the rows were released
+    """
+    def __init__(self):
+        self.closed = False
+
+    def query_iter(self, command:str, destination:str=None):
+        try:
+            while True:
+                yield {'value': object()}
+        finally:
+            self.closed = True
+
+    async def query_stream(self, command:str, destination:str=None):
+        try:
+            while True:
+                yield {'value': object()}
+        finally:
+            self.closed = True
+
+
+def test_failed_export_releases_the_query(tmp_path):
+    anylog_conn = Rows()
+    with pytest.raises(TypeError):
+        export_query(anylog_conn, command='sql test format=json select value from t',
+                     path=str(tmp_path / 'rows.jsonl'), batch_size=10, queue_size=1)
+    assert anylog_conn.closed
+    assert os.listdir(tmp_path) == []
+
+
+def test_async_failed_export_releases_the_query(tmp_path):
+    anylog_conn = Rows()
+
+    async def run():
+        await async_export_query(anylog_conn, command='sql test format=json select value from t',
+                                 path=str(tmp_path / 'rows.jsonl'), batch_size=10, queue_size=1)
+
+    with pytest.raises(TypeError):
+        asyncio.run(run())
+    assert anylog_conn.closed
+    assert os.listdir(tmp_path) == []
+
+
+def test_export_query(tmp_path, http_server):
+    path = str(tmp_path / 'rows.csv')
+    with AnyLogConnector(conn=http_server(QueryHandler)) as anylog_conn:
+        assert export_query(anylog_conn, command='sql test format=json select * from t', path=path, batch_size=2) == 5
+    assert len(read_csv(path)) == 6
+
+
+def test_async_export_query(tmp_path, http_server):
+    conn = http_server(QueryHandler)
+    path = str(tmp_path / 'rows.jsonl')
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            return await async_export_query(anylog_conn, command='sql test format=json select * from t', path=path,
+                                            batch_size=2)
+
+    assert asyncio.run(run()) == 5
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == ROWS
@@ -0,0 +1,106 @@
+import asyncio
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.exceptions import AnyLogHTTPError
+
+# (command, seconds the node takes to answer it) - answered in the reverse order they are sent
+COMMANDS = [('get status', 0.3), ('get processes', 0.2), ('get bad command', 0.1), ('get streaming', 0.05)]
+
+
+class DelayHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answer each command after its delay (400 for `get bad command`), tracking the number of requests in flight
+    """
+    protocol_version = 'HTTP/1.1'
+    in_flight = 0
+    max_in_flight = 0
+    lock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        command = self.headers['command']
+        time.sleep(dict(COMMANDS)[command])
+        with cls.lock:
+            cls.in_flight -= 1
+
+        status = 400 if command == 'get bad command' else 200
+        body = json.dumps({'command': command}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def delay_server(http_server):
+    handler = type('Handler', (DelayHandler,), {'in_flight': 0, 'max_in_flight': 0, 'lock': threading.Lock()})
+    return http_server(handler), handler
+
+
+def check(results:list):
+    """
+    Results are in command order, and the failed command does not affect the others
+    """
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert [result.command for result in results] == [command for command, _ in COMMANDS]
+    assert [result.ok for result in results] == [True, True, False, True]
+    assert isinstance(results[2].error, AnyLogHTTPError) and results[2].error.status == 400
+    assert results[2].result is None
+    assert results[0].latency >= 0.3
+
+
+def test_get_many(delay_server):
+    conn, handler = delay_server
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        results = anylog_conn.get_many([command for command, _ in COMMANDS])
+    check(results)
+    assert results[0].result == {'command': 'get status'}
+    assert handler.max_in_flight == 4
+
+
+def test_iter_many_yields_as_completed(delay_server):
+    conn, handler = delay_server
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        results = list(anylog_conn.iter_many([command for command, _ in COMMANDS], max_concurrency=2))
+    assert results[0].index == 1  # 0.2 seconds, while `get status` takes 0.3
+    assert handler.max_in_flight == 2
+    check(sorted(results, key=lambda result: result.index))
+
+
+def test_async_get_many(delay_server):
+    conn, handler = delay_server
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            return await anylog_conn.get_many([command for command, _ in COMMANDS], max_concurrency=3)
+
+    results = asyncio.run(run())
+    check(results)
+    assert json.loads(results[3].result) == {'command': 'get streaming'}
+    assert handler.max_in_flight == 3
+
+
+def test_async_iter_many_yields_as_completed(delay_server):
+    conn, _ = delay_server
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            return [result async for result in anylog_conn.iter_many([command for command, _ in COMMANDS])]
+
+    results = asyncio.run(run())
+    assert [result.index for result in results] == [3, 2, 1, 0]
+    check(sorted(results, key=lambda result: result.index))
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from anylog_api.json_stream import QueryRowParser
+
+ROWS = [{'v': 'a\\'}, {'v': 'b\\"c'}, {'v': '\\\\"', 'w': [1, {'x': '}]'}]}, {'v': 'dé'}]
+BODY = json.dumps({'Query': ROWS, 'Statistics': [{'Count': len(ROWS)}]}, ensure_ascii=False).encode('utf-8')
+
+
+def parse(chunks:list)->list:
+    parser = QueryRowParser()
+    rows = []
+    for chunk in chunks:
+        rows.extend(parser.feed(chunk))
+    parser.close()
+    return rows
+
+
+@pytest.mark.parametrize('offset', range(1, len(BODY)))
+def test_every_split_offset(offset):
+    assert parse([BODY[:offset], BODY[offset:]]) == ROWS
+
+
+def test_byte_at_a_time():
+    assert parse([BODY[index:index + 1] for index in range(len(BODY))]) == ROWS
+
+
+def test_escaped_quote_at_chunk_end():
+    body = b'{"Query":[{"v":"a\\\\"},{"v":"b"}]}'
+    assert parse([body[:20], body[20:]]) == [{'v': 'a\\'}, {'v': 'b'}]
+
+
+def test_top_level_list():
+    assert parse([b'[{"a":1},', b'{"a":2}]']) == [{'a': 1}, {'a': 2}]
+
+
+def test_truncated():
+    parser = QueryRowParser()
+    parser.feed(b'{"Query":[{"a":1},{"a"')
+    with pytest.raises(ValueError):
+        parser.close()
@@ -0,0 +1,82 @@
+import http.server
+import time
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.liveness import LivenessMonitor
+
+
+class HeartbeatHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answer `get status where format=json` after `delay` seconds - with `running` False the node reports not running
+    """
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    running = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b'{"Status": "node is running"}' if self.running else b'{"Status": "node is not running"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def heartbeat_server(http_server):
+    def start(delay:float=0)->tuple:
+        handler = type('Handler', (HeartbeatHandler,), {'delay': delay, 'running': True})
+        return http_server(handler), handler
+
+    return start
+
+
+def test_mark_down_until_the_node_answers(heartbeat_server):
+    conn, _ = heartbeat_server()
+    anylog_conn = AnyLogConnector(conn=conn)
+    monitor = LivenessMonitor(connectors=[anylog_conn], interval=60)
+    assert monitor.is_alive(anylog_conn) is False  # not checked yet
+
+    assert monitor.check() == {conn: True}
+    monitor.mark_down(anylog_conn, error='connection refused')
+    assert monitor.is_alive(anylog_conn) is False
+    assert monitor.state(anylog_conn)['last_error'] == 'connection refused'
+
+    assert monitor.check(anylog_conn) is True
+    assert monitor.state(anylog_conn)['failures'] == 0
+    anylog_conn.close()
+
+
+def test_failure_threshold(heartbeat_server):
+    conn, handler = heartbeat_server()
+    anylog_conn = AnyLogConnector(conn=conn)
+    monitor = LivenessMonitor(connectors=[anylog_conn], interval=60, failure_threshold=2)
+    assert monitor.check(anylog_conn) is True
+
+    handler.running = False
+    assert monitor.check(anylog_conn) is True  # one failed probe is below the threshold
+    assert monitor.check(anylog_conn) is False
+    assert monitor.state(anylog_conn)['last_error'] == 'node is not running'
+
+    handler.running = True
+    assert monitor.check(anylog_conn) is True
+    anylog_conn.close()
+
+
+def test_check_probes_nodes_concurrently(heartbeat_server, closed_port):
+    conns = [heartbeat_server(delay=0.5)[0] for _ in range(4)]
+    connectors = [AnyLogConnector(conn=conn) for conn in conns + [closed_port]]
+    monitor = LivenessMonitor(connectors=connectors, interval=60, timeout=5)
+
+    start = time.perf_counter()
+    alive = monitor.check()
+    assert time.perf_counter() - start < 1.5
+    assert alive == {**{conn: True for conn in conns}, closed_port: False}
+    for anylog_conn in connectors:
+        anylog_conn.close()
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.async_node_group import NodeGroup as AsyncNodeGroup
+from anylog_api.node_group import NodeGroup
+
+
+@pytest.mark.parametrize('close_connectors, closed', [((), True), ((False,), False)])
+def test_close_connectors(close_connectors, closed):
+    connectors = [AnyLogConnector(conn='127.0.0.1:32149'), AnyLogConnector(conn='127.0.0.1:32148')]
+    NodeGroup(connectors).close(*close_connectors)
+    assert [anylog_conn.closed for anylog_conn in connectors] == [closed, closed]
+
+
+@pytest.mark.parametrize('close_connectors, closed', [((), True), ((False,), False)])
+def test_async_close_connectors(close_connectors, closed):
+    async def run():
+        connectors = [AsyncAnyLogConnector(conn='127.0.0.1:32149'), AsyncAnyLogConnector(conn='127.0.0.1:32148')]
+        for anylog_conn in connectors:
+            await anylog_conn._get_session()
+        await AsyncNodeGroup(connectors).close(*close_connectors)
+        output = [anylog_conn.closed for anylog_conn in connectors]
+        for anylog_conn in connectors:
+            await anylog_conn.close()
+        return output
+
+    assert asyncio.run(run()) == [closed, closed]
+
+
+def test_context_manager_closes_connectors():
+    with NodeGroup.from_endpoints(['127.0.0.1:32149']) as group:
+        pass
+    assert group.connectors[0].closed
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from anylog_api.payload_builder import PayloadBuilder
+
+
+def test_payloads_do_not_alias():
+    builder = PayloadBuilder()
+    first = builder.build({'timestamp': [0, 1], 'value': [1.5, 2.5]}, constants={'device': 'a'})
+    expected = bytes(first)
+    second = builder.build({'timestamp': [86400] * 50, 'value': list(range(50))})
+    assert isinstance(first, bytes)
+    assert first == expected
+    assert json.loads(first) == [{'timestamp': '1970-01-01T00:00:00.000000', 'value': 1.5, 'device': 'a'},
+                                 {'timestamp': '1970-01-01T00:00:01.000000', 'value': 2.5, 'device': 'a'}]
+    assert len(json.loads(second)) == 50
+
+
+def test_numpy_columns():
+    numpy = pytest.importorskip('numpy')
+    builder = PayloadBuilder(epoch_unit='ms')
+    payloads = [builder.build({'timestamp': numpy.array([1000, 2000]), 'value': numpy.array([1.0, numpy.nan])}),
+                builder.build({'timestamp': numpy.array([3000]), 'value': numpy.array([True])})]
+    assert [json.loads(payload) for payload in payloads] == [
+        [{'timestamp': '1970-01-01T00:00:01.000000', 'value': 1.0},
+         {'timestamp': '1970-01-01T00:00:02.000000', 'value': None}],
+        [{'timestamp': '1970-01-01T00:00:03.000000', 'value': True}]
+    ]
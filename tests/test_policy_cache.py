@@ -0,0 +1,68 @@
+import asyncio
+import http.server
+import json
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.async_policy_cache import PolicyCache as AsyncPolicyCache
+from anylog_api.policy_cache import PolicyCache
+from anylog_api.response_cache import ResponseCache
+
+
+class LedgerHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Reply to `blockchain get *` with the class' `policies`, counting the pulls
+    """
+    protocol_version = 'HTTP/1.1'
+    policies = None
+    pulls = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).pulls += 1
+        body = json.dumps(self.policies).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def policy(name:str)->dict:
+    return {'operator': {'id': f'id-{name}', 'name': name, 'ip': '10.0.0.1', 'port': 32148}}
+
+
+@pytest.fixture
+def ledger(http_server):
+    handler = type('Handler', (LedgerHandler,), {'policies': [policy('op1')], 'pulls': 0})
+    return http_server(handler), handler
+
+
+def test_refresh_bypasses_response_cache(ledger):
+    conn, handler = ledger
+    with AnyLogConnector(conn=conn, cache=ResponseCache()) as anylog_conn:
+        policy_cache = PolicyCache(anylog_conn, refresh_interval=60)
+        assert policy_cache.refresh() == {'added': 1, 'updated': 0, 'removed': 0}
+        handler.policies = [policy('op1'), policy('op2')]
+        assert policy_cache.refresh() == {'added': 1, 'updated': 0, 'removed': 0}
+        assert handler.pulls == 2
+        anylog_conn.get(command='blockchain get *')  # other readers still get the cached (latest) pull
+        assert handler.pulls == 2
+
+
+def test_async_refresh_bypasses_response_cache(ledger):
+    conn, handler = ledger
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn, cache=ResponseCache()) as anylog_conn:
+            policy_cache = AsyncPolicyCache(anylog_conn, refresh_interval=60)
+            first = await policy_cache.refresh()
+            handler.policies = []
+            return first, await policy_cache.refresh()
+
+    assert asyncio.run(run()) == ({'added': 1, 'updated': 0, 'removed': 0}, {'added': 0, 'updated': 0, 'removed': 1})
+    assert handler.pulls == 2
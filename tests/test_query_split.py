@@ -0,0 +1,76 @@
+import datetime
+import random
+
+import pytest
+
+from anylog_api.query_split import build_sub_queries, merge_results, parse_order
+
+NOW = datetime.datetime(2024, 1, 31, 12, 0, 0)
+SELECT = "sql test format=json select timestamp, device, value from rand_data where period(day, 30, now(), timestamp)"
+
+
+def sub_results(rows:list, parts:int, key)->list:
+    """
+    Rows split by time into parts consecutive ranges, each sorted the way a sub-query would return it
+    """
+    rows = sorted(rows, key=lambda row: row['timestamp'])
+    size = -(-len(rows) // parts)
+    return [sorted(rows[index:index + size], key=key) for index in range(0, len(rows), size)]
+
+
+@pytest.fixture
+def rows()->list:
+    generator = random.Random(7)
+    return [{'timestamp': f'2024-01-{day:02d} 00:00:00.000000', 'device': generator.choice('abc'),
+             'value': generator.randint(0, 50)} for day in range(1, 31)]
+
+
+def test_parse_order():
+    assert parse_order(SELECT + ' order by rand_data.value desc, timestamp limit 5') == [('value', True),
+                                                                                         ('timestamp', False)]
+    assert parse_order(SELECT) == []
+
+
+def test_merge_ordered_by_other_column(rows):
+    command = SELECT + ' order by value limit 10'
+    results = sub_results(rows, parts=4, key=lambda row: row['value'])
+    merged = merge_results(command, results)
+    assert [row['value'] for row in merged] == sorted(row['value'] for row in rows)[:10]
+
+
+def test_merge_mixed_directions(rows):
+    command = SELECT + ' order by device desc, value'
+
+    def key(row):
+        return -ord(row['device']), row['value']
+    merged = merge_results(command, sub_results(rows, parts=3, key=key))
+    assert [(row['device'], row['value']) for row in merged] == [(row['device'], row['value'])
+                                                                 for row in sorted(rows, key=key)]
+
+
+def test_merge_nulls_sort_last_ascending():
+    command = SELECT + ' order by value'
+    merged = merge_results(command, [[{'value': 1}, {'value': None}], [{'value': 0}, {'value': 3}]])
+    assert [row['value'] for row in merged] == [0, 1, 3, None]
+
+
+def test_merge_ordered_by_time_descending(rows):
+    command = SELECT + ' order by timestamp desc limit 3'
+    results = sub_results(rows, parts=4, key=lambda row: row['timestamp'])
+    results = [result[::-1] for result in results]
+    merged = merge_results(command, results)
+    assert merged == sorted(rows, key=lambda row: row['timestamp'], reverse=True)[:3]
+
+
+def test_merge_requires_order_column():
+    with pytest.raises(ValueError):
+        merge_results(SELECT + ' order by value', [[{'device': 'a'}], [{'device': 'b'}]])
+
+
+def test_build_sub_queries_cover_period():
+    sub_queries = build_sub_queries(SELECT + ' order by value', parts=3, now=NOW)
+    assert len(sub_queries) == 3
+    assert "timestamp >= '2024-01-01 12:00:00.000000' and timestamp < '2024-01-11 12:00:00.000000'" \
+           in sub_queries[0]
+    assert "timestamp <= '2024-01-31 12:00:00.000000'" in sub_queries[-1]
+    assert all(query.endswith(' order by value') for query in sub_queries)
@@ -0,0 +1,142 @@
+import asyncio
+import http.server
+import json
+import time
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.exceptions import AnyLogHTTPError
+from anylog_api.metrics import ConnectorMetrics
+from anylog_api.retry import RetryPolicy
+
+ROWS = [{'value': index} for index in range(5)]
+
+
+class SlowRowsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0.3
+
+    def log_message(self, format, *args):
+        pass
+
+    def __chunk(self, data:bytes):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.__chunk(b'{"Query":[')
+        for index, row in enumerate(ROWS):
+            time.sleep(self.delay)
+            self.__chunk((',' if index else '').encode() + json.dumps(row).encode())
+        self.__chunk(b']}')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def test_sync_query_iter_outlives_timeout(http_server):
+    conn = http_server(SlowRowsHandler)
+    with AnyLogConnector(conn=conn, timeout=1) as anylog_conn:
+        assert list(anylog_conn.query_iter('sql test format=json select value from t')) == ROWS
+
+
+def test_async_query_stream_outlives_timeout(http_server):
+    conn = http_server(SlowRowsHandler)
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn, timeout=1) as anylog_conn:
+            return [row async for row in anylog_conn.query_stream('sql test format=json select value from t')]
+
+    assert asyncio.run(run()) == ROWS
+
+
+class UnavailableHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Reply 503 to the first request, then stream the rows
+    """
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests += 1
+        if type(self).requests == 1:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'Query': ROWS}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_async_query_stream_goes_through_request(http_server):
+    handler = type('Handler', (UnavailableHandler,), {'requests': 0})
+    conn = http_server(handler)
+    metrics = ConnectorMetrics()
+    retry_policy = RetryPolicy(max_retries=1, backoff_factor=0, jitter=False)
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn, metrics=metrics, retry_policy=retry_policy) as anylog_conn:
+            return [row async for row in anylog_conn.query_stream('sql test format=json select value from t')]
+
+    assert asyncio.run(run()) == ROWS
+    assert handler.requests == 2
+    stats = metrics.snapshot()['GET']['sql']
+    assert stats['calls'] == 1
+    assert stats['response_bytes'] > 0
+
+
+def test_async_query_stream_error(status_server):
+    conn, _ = status_server(400)
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            return [row async for row in anylog_conn.query_stream('sql test format=json select value from t')]
+
+    with pytest.raises(AnyLogHTTPError):
+        asyncio.run(run())
+
+
+def failing_hook(event):
+    raise RuntimeError('exporter down')
+
+
+def test_metrics_hook_error_does_not_fail_request(status_server):
+    conn, _ = status_server(200)
+    metrics = ConnectorMetrics()
+    metrics.add_hook(failing_hook)
+    with AnyLogConnector(conn=conn, metrics=metrics) as anylog_conn:
+        assert anylog_conn.put(dbms='test', table='t', payload=ROWS) is True
+    assert metrics.hook_errors == 1
+    assert str(metrics.last_hook_error) == 'exporter down'
+    assert metrics.snapshot()['PUT']['data']['calls'] == 1
+
+
+def test_failing_metrics_object_does_not_fail_request(status_server):
+    conn, _ = status_server(200)
+
+    class BrokenMetrics:
+        def record(self, **kwargs):
+            raise RuntimeError('exporter down')
+
+    with AnyLogConnector(conn=conn, metrics=BrokenMetrics()) as anylog_conn:
+        assert anylog_conn.put(dbms='test', table='t', payload=ROWS) is True
+        assert str(anylog_conn.metrics_error) == 'exporter down'
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn, metrics=BrokenMetrics()) as anylog_conn:
+            return await anylog_conn.put(dbms='test', table='t', payload=ROWS), anylog_conn.metrics_error
+
+    status, error = asyncio.run(run())
+    assert status is True
+    assert str(error) == 'exporter down'
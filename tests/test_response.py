@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.response import AnyLogResponse
+
+
+class CountingCodec:
+    name = 'counting'
+    calls = 0
+
+    @classmethod
+    def loads(cls, data):
+        cls.calls += 1
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj)->bytes:
+        raise NotImplementedError
+
+
+def test_json_is_decoded_once():
+    CountingCodec.calls = 0
+    response = AnyLogResponse(content=b'{"Query": [{"value": 1}, {"value": 2}]}', codec=CountingCodec)
+    assert response.rows() == [{'value': 1}, {'value': 2}]
+    assert response.value() == {'Query': [{'value': 1}, {'value': 2}]}
+    assert response.json() is response.json()
+    assert CountingCodec.calls == 1
+
+
+def test_invalid_json_falls_back_to_text():
+    CountingCodec.calls = 0
+    response = AnyLogResponse(content=b'Node is running', codec=CountingCodec)
+    assert response.value() == 'Node is running'
+    with pytest.raises(ValueError):
+        response.json()
+    assert response.rows() == []
+    assert CountingCodec.calls == 1  # the failure is memoized too
+
+
+def test_rows_of_a_list():
+    assert AnyLogResponse(content=b'[{"value": 1}]').rows() == [{'value': 1}]
+    assert AnyLogResponse(content=b'{"Statistics": []}').rows() == []
+
+
+def test_text_uses_declared_charset():
+    body = 'température'.encode('latin-1')
+    assert AnyLogResponse(content=body, headers={'Content-Type': 'text/plain; charset="ISO-8859-1"'}).text \
+        == 'température'
+    assert AnyLogResponse(content=b'ok', headers={'Content-Type': 'text/plain; charset=unknown'}).text == 'ok'
+    assert AnyLogResponse(content=body).encoding == 'utf-8'
+
+
+def test_status():
+    response = AnyLogResponse(content=b'', status=204)
+    assert response.ok and len(response) == 0
+    assert not AnyLogResponse(content=b'', status=404).ok
+
+
+def test_connector_returns_a_response(status_server):
+    conn, _ = status_server(200)
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        response = anylog_conn.get(command='get status', as_response=True)
+    assert isinstance(response, AnyLogResponse)
+    assert response.status == 200 and response.content == b''
@@ -0,0 +1,96 @@
+import http.server
+
+import pytest
+
+import anylog_api.response_cache as response_cache
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self)->float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch)->Clock:
+    clock = Clock()
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+
+def test_ttl_per_pattern():
+    cache = ResponseCache(ttls={'get status*': 5, 'blockchain get *': 30})
+    assert cache.ttl_for('  GET STATUS where format=json') == 5
+    assert cache.ttl_for('blockchain get operator') == 30
+    assert cache.ttl_for('sql test select * from t') is None
+    assert ResponseCache(ttls={}, default_ttl=2).ttl_for('sql test select * from t') == 2
+
+
+def test_entries_expire(clock):
+    cache = ResponseCache()
+    cache.set('get status', None, {'Status': 'running'})
+    cache.set('sql test select * from t', None, [{'value': 1}])  # not cacheable
+    assert len(cache) == 1
+    assert cache.get('get status') == {'Status': 'running'}
+    assert cache.get('get status', destination='network') is None
+
+    clock.now += 5
+    assert cache.get('get status') is None
+    assert len(cache) == 0
+    assert cache.stats() == {'size': 0, 'hits': 1, 'misses': 2, 'evictions': 0}
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = ResponseCache(max_size=2)
+    cache.set('get status', None, 'status')
+    cache.set('get processes', None, 'processes')
+    assert cache.get('get status') == 'status'  # processes is now the least recently used
+    cache.set('get connections', None, 'connections')
+
+    assert cache.get('get processes') is None
+    assert cache.get('get status') == 'status'
+    assert cache.get('get connections') == 'connections'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_patterns(clock):
+    cache = ResponseCache()
+    for command in ('blockchain get operator', 'blockchain get cluster', 'get status'):
+        cache.set(command, None, command)
+    cache.set('blockchain get operator', '10.0.0.1:32148', 'remote')
+
+    assert cache.invalidate('Blockchain get op*', destination='10.0.0.1:32148') == 1
+    assert cache.invalidate('blockchain get *') == 2
+    assert cache.get('get status') == 'get status'
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+
+
+class StatusJsonHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.headers['command'])
+        body = b'{"Status": "node is running"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_connector_serves_cached_commands(http_server):
+    handler = type('Handler', (StatusJsonHandler,), {'requests': []})
+    with AnyLogConnector(conn=http_server(handler), cache=ResponseCache()) as anylog_conn:
+        for _ in range(3):
+            assert anylog_conn.get(command='get status where format=json') == {'Status': 'node is running'}
+            anylog_conn.get(command='get streaming')
+    assert handler.requests == ['get status where format=json'] + ['get streaming'] * 3
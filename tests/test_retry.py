@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+import requests
+
+from anylog_api.anylog_connector import AnyLogConnector, _connect_failed
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.exceptions import AnyLogConnectError, AnyLogError, AnyLogServerError, is_unsent_error
+from anylog_api.retry import RetryPolicy
+
+
+def policy()->RetryPolicy:
+    return RetryPolicy(max_retries=2, backoff_factor=0, jitter=False)
+
+
+def test_default_retries_writes_only_when_unprocessed():
+    retry_policy = RetryPolicy()
+    assert retry_policy.retry_methods == ('GET',)
+    for method in ('PUT', 'POST'):
+        assert retry_policy.should_retry(method=method, attempt=0, status=None, sent=False)
+        assert not retry_policy.should_retry(method=method, attempt=0, status=None, sent=True)
+        assert retry_policy.should_retry(method=method, attempt=0, status=429)
+        assert retry_policy.should_retry(method=method, attempt=0, status=503)
+        assert not retry_policy.should_retry(method=method, attempt=0, status=502)
+        assert not retry_policy.should_retry(method=method, attempt=0, status=504)
+    assert retry_policy.should_retry(method='GET', attempt=0, status=None, sent=True)
+    assert retry_policy.should_retry(method='GET', attempt=0, status=504)
+    assert not retry_policy.should_retry(method='GET', attempt=3, status=None)
+
+
+@pytest.mark.parametrize('status, attempts', [(500, 1), (504, 1), (503, 3), (429, 3)])
+def test_put_is_resent_only_when_not_processed(status_server, status, attempts):
+    conn, requests_received = status_server(status)
+    with AnyLogConnector(conn=conn, retry_policy=policy()) as anylog_conn:
+        with pytest.raises(AnyLogError):
+            anylog_conn.put(dbms='test', table='t', payload=[{'value': 1}])
+    assert requests_received == ['PUT'] * attempts
+
+
+def test_get_is_resent_after_server_error(status_server):
+    conn, requests_received = status_server(504)
+    with AnyLogConnector(conn=conn, retry_policy=policy()) as anylog_conn:
+        with pytest.raises(AnyLogServerError):
+            anylog_conn.get(command='get status')
+    assert requests_received == ['GET'] * 3
+
+
+def test_refused_connection_is_a_connect_error(closed_port):
+    retry_policy = policy()
+    calls = []
+    should_retry = retry_policy.should_retry
+    retry_policy.should_retry = lambda **kwargs: calls.append(kwargs) or should_retry(**kwargs)
+
+    with AnyLogConnector(conn=closed_port, retry_policy=retry_policy) as anylog_conn:
+        with pytest.raises(AnyLogConnectError) as error:
+            anylog_conn.put(dbms='test', table='t', payload=[{'value': 1}])
+    assert is_unsent_error(error.value)
+    assert [call['sent'] for call in calls] == [False] * 3
+
+
+def test_async_refused_connection_is_a_connect_error(closed_port):
+    async def put():
+        async with AsyncAnyLogConnector(conn=closed_port, retry_policy=policy()) as anylog_conn:
+            await anylog_conn.put(dbms='test', table='t', payload=[{'value': 1}])
+
+    with pytest.raises(AnyLogConnectError):
+        asyncio.run(put())
+
+
+@pytest.mark.parametrize('status, attempts', [(500, 1), (503, 3)])
+def test_async_put_is_resent_only_when_not_processed(status_server, status, attempts):
+    conn, requests_received = status_server(status)
+
+    async def put(conn):
+        async with AsyncAnyLogConnector(conn=conn, retry_policy=policy()) as anylog_conn:
+            await anylog_conn.put(dbms='test', table='t', payload=[{'value': 1}])
+
+    with pytest.raises(AnyLogError):
+        asyncio.run(put(conn))
+    assert requests_received == ['PUT'] * attempts
+
+
+def test_connect_failed_ignores_errors_after_sending():
+    assert not _connect_failed(requests.ConnectionError('Connection reset by peer'))
+    assert not _connect_failed(requests.ReadTimeout('read timed out'))
+    assert _connect_failed(requests.ConnectTimeout('connect timed out'))
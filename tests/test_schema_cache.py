@@ -0,0 +1,162 @@
+import asyncio
+import http.server
+import json
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.async_schema_cache import SchemaCache as AsyncSchemaCache
+from anylog_api.exceptions import AnyLogValidationError
+from anylog_api.schema_cache import SchemaCache, TableSchema, parse_columns, type_family
+
+COLUMNS = {'timestamp': 'timestamp without time zone', 'device': 'varchar(32)', 'value': 'int', 'ratio': 'float',
+           'active': 'boolean'}
+ROWS = [
+    {'timestamp': '2024-01-01 00:00:00', 'device': 'a', 'value': 1, 'ratio': 0.5, 'active': True},
+    {'timestamp': '2024-01-01 00:00:01', 'device': 7, 'value': '2', 'ratio': 1, 'active': 'false'},
+    {'timestamp': '2024-01-01 00:00:02', 'device': 'c', 'value': 'three', 'ratio': None, 'active': 1},
+    {'timestamp': '2024-01-01 00:00:03', 'device': 'd', 'value': 4, 'color': 'red'}
+]
+
+
+def test_type_family():
+    assert type_family('timestamp without time zone') == 'timestamp'
+    assert type_family('VARCHAR(32)') == 'str'
+    assert type_family('double precision') == 'float'
+    assert type_family('geometry') is None
+
+
+def test_parse_columns():
+    assert parse_columns(COLUMNS).columns == COLUMNS
+    listed = [{'column_name': name, 'column_type': column_type} for name, column_type in COLUMNS.items()]
+    assert parse_columns(listed).families == parse_columns(COLUMNS).families
+    assert parse_columns({'err_code': 1, 'err_text': 'Table not found'}) is None
+    assert parse_columns('Table not found') is None
+
+
+def test_strict():
+    output, errors, coerced = TableSchema(COLUMNS).validate(ROWS, strictness='strict')
+    assert output is ROWS
+    assert coerced == 0
+    assert sorted((index, column) for index, column, _ in errors) == [(1, 'active'), (1, 'device'), (1, 'value'),
+                                                                     (2, 'active'), (2, 'value'), (3, 'color')]
+
+
+def test_drop():
+    output, errors, _ = TableSchema(COLUMNS).validate(ROWS, strictness='drop')
+    assert output == ROWS[:1]
+    assert {index for index, _, _ in errors} == {1, 2, 3}
+
+
+def test_coerce():
+    originals = [dict(row) for row in ROWS]
+    output, errors, coerced = TableSchema(COLUMNS).validate(ROWS, strictness='coerce')
+    assert output == [
+        ROWS[0],
+        {'timestamp': '2024-01-01 00:00:01', 'device': '7', 'value': 2, 'ratio': 1, 'active': False},
+        {'timestamp': '2024-01-01 00:00:03', 'device': 'd', 'value': 4}
+    ]
+    assert errors == [(2, 'value', "str value 'three' is not int")]
+    assert coerced == 2
+    assert output[0] is ROWS[0]
+    assert ROWS == originals  # rows that change are copied
+
+
+def test_valid_rows_are_returned_as_is():
+    rows = [ROWS[0]]
+    for strictness in ('strict', 'drop', 'coerce'):
+        output, errors, coerced = TableSchema(COLUMNS).validate(rows, strictness=strictness)
+        assert output is rows and errors == [] and coerced == 0
+
+
+def test_invalid_strictness():
+    with pytest.raises(ValueError):
+        SchemaCache(strictness='lenient')
+
+
+class TableHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answer `get columns` for table t (400 for any other table), recording the lookups and the rows PUT
+    """
+    protocol_version = 'HTTP/1.1'
+    lookups = None
+    received = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def __reply(self, status:int, body:bytes=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        command = self.headers['command']
+        self.lookups.append(command)
+        if 'table=t ' in command:
+            self.__reply(200, json.dumps(COLUMNS).encode())
+        else:
+            self.__reply(400, b'{"err_code": 1, "err_text": "Table not found"}')
+
+    def do_PUT(self):
+        self.received.append(json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0)))))
+        self.__reply(200)
+
+
+@pytest.fixture
+def table_server(http_server):
+    handler = type('Handler', (TableHandler,), {'lookups': [], 'received': []})
+    return http_server(handler), handler
+
+
+def test_strict_rejects_before_sending(table_server):
+    conn, handler = table_server
+    schema_cache = SchemaCache()
+    with AnyLogConnector(conn=conn, schema_cache=schema_cache) as anylog_conn:
+        with pytest.raises(AnyLogValidationError) as error:
+            anylog_conn.put(dbms='test', table='t', payload=ROWS)
+        assert anylog_conn.put(dbms='test', table='t', payload=json.dumps(ROWS[:1])) is True
+    assert {index for index, _, _ in error.value.errors} == {1, 2, 3}
+    assert schema_cache.rows_rejected == 3
+    assert handler.received == [ROWS[:1]]
+    assert len(handler.lookups) == 1  # the schema is cached
+
+
+def test_coerce_sends_converted_rows(table_server):
+    conn, handler = table_server
+    schema_cache = SchemaCache(strictness='coerce')
+    with AnyLogConnector(conn=conn, schema_cache=schema_cache) as anylog_conn:
+        assert anylog_conn.put(dbms='test', table='t', payload=ROWS) is True
+    assert [row['value'] for row in handler.received[0]] == [1, 2, 4]
+    assert schema_cache.rows_coerced == 2
+    assert schema_cache.rows_rejected == 1
+
+
+def test_unknown_table_is_not_checked(table_server):
+    conn, handler = table_server
+    schema_cache = SchemaCache()
+    with AnyLogConnector(conn=conn, schema_cache=schema_cache) as anylog_conn:
+        for _ in range(2):
+            assert anylog_conn.put(dbms='test', table='new_table', payload=ROWS) is True
+    assert handler.received == [ROWS, ROWS]
+    assert len(handler.lookups) == 1
+
+    schema_cache.invalidate(dbms='test')
+    assert schema_cache._cached('test', 'new_table') == (False, None)
+
+
+def test_async_schema_is_fetched_once(table_server):
+    conn, handler = table_server
+    schema_cache = AsyncSchemaCache(strictness='drop')
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn, schema_cache=schema_cache) as anylog_conn:
+            return await asyncio.gather(*[anylog_conn.put(dbms='test', table='t', payload=ROWS) for _ in range(5)])
+
+    assert asyncio.run(run()) == [True] * 5
+    assert len(handler.lookups) == 1
+    assert handler.received == [ROWS[:1]] * 5
+    assert schema_cache.rows_rejected == 15
@@ -0,0 +1,154 @@
+import asyncio
+import http.server
+import json
+import os
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.async_spool import DiskSpool as AsyncDiskSpool
+from anylog_api.spool import FRAME_HEADER, DiskSpool
+
+
+class RecordingHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Accept every PUT / POST, recording (table, rows) per PUT and (command, topic, raw body) per POST
+    """
+    protocol_version = 'HTTP/1.1'
+    received = None
+    posted = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def __reply(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.received.append((self.headers['table'], json.loads(body)))
+        self.__reply()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.posted.append((self.headers['command'], self.headers.get('topic'), body))
+        self.__reply()
+
+
+@pytest.fixture
+def recording_server(http_server):
+    handler = type('Handler', (RecordingHandler,), {'received': [], 'posted': []})
+    return http_server(handler), handler.received
+
+
+@pytest.fixture
+def posting_server(http_server):
+    handler = type('Handler', (RecordingHandler,), {'received': [], 'posted': []})
+    return http_server(handler), handler.received, handler.posted
+
+
+def fill(spool_path:str)->tuple:
+    """
+    Spool one frame per table (t0, t1, t2) into segment 1 - returns the segment path and the offset of each frame
+    """
+    offsets = []
+    with DiskSpool(path=spool_path) as spool:
+        for index in range(3):
+            offsets.append(spool.size)
+            spool.append_put(dbms='test', table=f't{index}', payload=[{'value': index}])
+        segment = spool._segment_path(spool.segments()[0])
+    return segment, offsets
+
+
+def corrupt_middle_frame(segment:str, offsets:list):
+    with open(segment, 'r+b') as f:
+        f.seek(offsets[2] - 2)  # inside the payload of the second frame
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xff]))
+
+
+def test_crc_mismatch_skips_only_the_bad_frame(tmp_path, recording_server):
+    conn, received = recording_server
+    segment, offsets = fill(str(tmp_path))
+    corrupt_middle_frame(segment, offsets)
+
+    spool = DiskSpool(path=str(tmp_path))
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        assert spool.replay(anylog_conn) == 2
+    assert received == [('t0', [{'value': 0}]), ('t2', [{'value': 2}])]
+    assert spool.frames_corrupt == 1
+    assert not os.path.exists(segment)
+    with open(spool._corrupt_path(1), 'rb') as f:
+        quarantined = f.read()
+    assert len(quarantined) == offsets[2] - offsets[1]
+    assert FRAME_HEADER.unpack_from(quarantined)[1] == len(b'[{"value":1}]')
+
+
+def test_torn_tail_is_quarantined(tmp_path, recording_server):
+    conn, received = recording_server
+    segment, offsets = fill(str(tmp_path))
+    with open(segment, 'r+b') as f:
+        f.truncate(offsets[2] + 5)
+
+    spool = DiskSpool(path=str(tmp_path))
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        assert spool.replay(anylog_conn) == 2
+    assert [table for table, _ in received] == ['t0', 't1']
+    assert spool.frames_corrupt == 1
+    assert os.path.getsize(spool._corrupt_path(1)) == 5
+    assert not spool.pending
+
+
+def test_async_crc_mismatch_skips_only_the_bad_frame(tmp_path, recording_server):
+    conn, received = recording_server
+    segment, offsets = fill(str(tmp_path))
+    corrupt_middle_frame(segment, offsets)
+
+    async def run():
+        spool = AsyncDiskSpool(path=str(tmp_path))
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            return await spool.replay(anylog_conn), spool.frames_corrupt
+
+    assert asyncio.run(run()) == (2, 1)
+    assert [table for table, _ in received] == ['t0', 't2']
+
+
+POLICIES = [b'{"operator": {"name": "op1"}}', b'{"operator": {"name": "op2"}}']
+
+
+def spool_policies_and_data(spool):
+    for policy in POLICIES:
+        spool.append_post(command='blockchain insert where policy=!new_policy and local=true', payload=policy)
+    spool.append_post(command='data', topic='sensors', payload=[{'value': 1}])
+    spool.append_post(command='data', topic='sensors', payload=[{'value': 2}])
+    spool.append_put(dbms='test', table='t', payload=b'{"value": 3}')
+
+
+def test_only_data_frames_are_merged(tmp_path, posting_server):
+    conn, received, posted = posting_server
+    spool = DiskSpool(path=str(tmp_path))
+    spool_policies_and_data(spool)
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        assert spool.replay(anylog_conn) == 5
+
+    command = 'blockchain insert where policy=!new_policy and local=true'
+    assert posted == [(command, None, POLICIES[0]), (command, None, POLICIES[1]),
+                      ('data', 'sensors', b'[{"value":1},{"value":2}]')]
+    assert received == [('t', {'value': 3})]  # a single frame keeps its original payload
+
+
+def test_async_only_data_frames_are_merged(tmp_path, posting_server):
+    conn, _, posted = posting_server
+
+    async def run():
+        spool = AsyncDiskSpool(path=str(tmp_path))
+        spool_policies_and_data(spool)
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            return await spool.replay(anylog_conn)
+
+    assert asyncio.run(run()) == 5
+    assert [body for _, _, body in posted] == POLICIES + [b'[{"value":1},{"value":2}]']
@@ -0,0 +1,133 @@
+import asyncio
+import http.server
+import json
+
+import pytest
+
+from anylog_api.anylog_connector import AnyLogConnector
+from anylog_api.async_anylog_connector import AnyLogConnector as AsyncAnyLogConnector
+from anylog_api.async_topic_publisher import TopicPublisher as AsyncTopicPublisher
+from anylog_api.topic_publisher import TopicPublisher, parse_msg_client
+
+MSG_CLIENT = '''
+Subscription: 0001
+User:         unused
+Broker:       rest
+
+Messages    Success     Errors      Last message time
+----------  ----------  ----------  -------------------
+%d          %d          %d          2024-01-01 00:00:00
+
+Subscribed Topics:
+Topic        QOS DBMS Table
+------------|---|----|-----|
+dummy-anylog|  0|test|rand_data|
+'''
+
+
+def msg_client(messages:int, errors:int=0)->str:
+    return MSG_CLIENT % (messages, messages - errors, errors)
+
+
+class MsgClientHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answer `get msg client` with the class' counters, counting every record POSTed on `data`
+    """
+    protocol_version = 'HTTP/1.1'
+    messages = 0
+    errors = 0
+    count_posts = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def __reply(self, body:bytes=b''):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.__reply(msg_client(type(self).messages, type(self).errors).encode())
+
+    def do_POST(self):
+        records = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        if self.count_posts:
+            type(self).messages += len(records)
+        self.__reply()
+
+
+@pytest.fixture
+def msg_client_server(http_server):
+    def start(count_posts:bool=True)->tuple:
+        handler = type('Handler', (MsgClientHandler,), {'messages': 0, 'errors': 0, 'count_posts': count_posts})
+        return http_server(handler), handler
+
+    return start
+
+
+def test_parse_msg_client():
+    assert parse_msg_client(msg_client(12, errors=2)) == {'messages': 12, 'success': 10, 'errors': 2}
+    assert parse_msg_client(msg_client(3) + msg_client(4)) == {'messages': 7, 'success': 7, 'errors': 0}
+    assert parse_msg_client('No message client subscriptions') is None
+    assert parse_msg_client(None) is None
+
+
+def counters(messages:int, errors:int=0)->dict:
+    return {'messages': messages, 'success': messages - errors, 'errors': errors}
+
+
+def test_compare(status_server):
+    conn, _ = status_server(200)
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        publisher = TopicPublisher(anylog_conn, linger=None)
+        assert publisher._compare(counters(0)) is None  # baseline
+        publisher.rows_sent = 5
+        assert publisher._compare(counters(0)) is True  # records sent, message count did not move
+        assert publisher._compare(counters(0)) is True
+        assert publisher._compare(counters(5)) is False
+        assert publisher._compare(counters(5)) is False  # nothing new sent
+        assert publisher._compare(counters(5, errors=1)) is True  # error count went up
+        assert publisher._compare(counters(5, errors=1)) is False
+        assert publisher._compare(None) is False  # no message client - keeps the last state
+        assert publisher.server_counters is None
+        publisher.close()
+
+
+def test_check_server(msg_client_server):
+    conn, _ = msg_client_server()
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        with TopicPublisher(anylog_conn, linger=None) as publisher:
+            assert publisher.check_server() is None
+            publisher.add_rows('dummy-anylog', [{'value': 1}, {'value': 2}])
+            publisher.flush()
+            assert publisher.check_server() is False
+            assert publisher.server_counters == counters(2)
+
+
+def test_check_server_stalled(msg_client_server):
+    conn, _ = msg_client_server(count_posts=False)
+    with AnyLogConnector(conn=conn) as anylog_conn:
+        with TopicPublisher(anylog_conn, linger=None) as publisher:
+            publisher.check_server()
+            publisher.add('dummy-anylog', {'value': 1})
+            publisher.flush()
+            assert publisher.check_server() is True
+
+
+def test_async_check_server(msg_client_server):
+    conn, handler = msg_client_server(count_posts=False)
+
+    async def run():
+        async with AsyncAnyLogConnector(conn=conn) as anylog_conn:
+            async with AsyncTopicPublisher(anylog_conn, linger=None) as publisher:
+                stalled = [await publisher.check_server()]
+                await publisher.add('dummy-anylog', {'value': 1})
+                await publisher.flush()
+                stalled.append(await publisher.check_server())
+                handler.messages = 1
+                stalled.append(await publisher.check_server())
+                return stalled
+
+    assert asyncio.run(run()) == [None, True, False]